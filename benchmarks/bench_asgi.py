@@ -0,0 +1,145 @@
+# benchmarks/bench_asgi.py
+"""
+Slow-client benchmark: gunicorn WSGI (gthread workers) vs gunicorn with uvicorn
+workers (ASGI).
+
+Each server is started against the configured database. --slow-clients connections
+download --slow-path at --slow-rate bytes/s (mobile clients on a poor link) while
+ordinary clients fetch --path, and the ordinary clients' latency and throughput are
+reported. Under WSGI every slow download holds a worker thread until the last byte
+is read; under ASGI the event loop buffers the body and moves on.
+
+    python benchmarks/bench_asgi.py
+    python benchmarks/bench_asgi.py --slow-clients 200 --workers 2 --threads 8 \\
+        --path "/routes/vendors/?search=guitar"
+
+Needs gunicorn and uvicorn (requirements.txt) and a populated database
+(`manage.py import_tsv_data`).
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HOST = "127.0.0.1"
+
+SERVERS = {
+    "wsgi": lambda args: ["core.wsgi", "-k", "gthread", "--threads", str(args.threads)],
+    "asgi": lambda args: ["core.asgi", "-k", "uvicorn.workers.UvicornWorker"],
+}
+
+
+def start_server(mode, args):
+    env = {**os.environ, "DJANGO_SECURE_SSL_REDIRECT": "False", "DJANGO_LOG_LEVEL": "WARNING"}
+    command = [
+        sys.executable, "-m", "gunicorn", *SERVERS[mode](args),
+        "-b", f"{HOST}:{args.port}", "-w", str(args.workers), "--log-level", "warning",
+    ]
+    server = subprocess.Popen(command, cwd=ROOT, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://{HOST}:{args.port}/healthz", timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"{mode} server did not come up on port {args.port}")
+
+
+async def fetch(port, path, rate=None):
+    """GET `path`; with `rate`, read the body at about `rate` bytes/s. Returns bytes read."""
+    reader, writer = await asyncio.open_connection(HOST, port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    total = 0
+    try:
+        while True:
+            data = await reader.read(1024 if rate else 65536)
+            if not data:
+                return total
+            total += len(data)
+            if rate:
+                await asyncio.sleep(len(data) / rate)
+    finally:
+        writer.close()
+
+
+async def measure(args):
+    slow = [
+        asyncio.create_task(fetch(args.port, args.slow_path, rate=args.slow_rate))
+        for _ in range(args.slow_clients)
+    ]
+    await asyncio.sleep(1)  # let the slow downloads occupy the server first
+
+    latencies, failures = [], 0
+    pending = iter(range(args.requests))
+
+    async def client():
+        nonlocal failures
+        for _ in pending:
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(fetch(args.port, args.path), args.timeout)
+                latencies.append(time.perf_counter() - started)
+            except (asyncio.TimeoutError, OSError):
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    for task in slow:
+        task.cancel()
+    await asyncio.gather(*slow, return_exceptions=True)
+    return latencies, failures, elapsed
+
+
+def report(mode, latencies, failures, elapsed):
+    if latencies:
+        ordered = sorted(latencies)
+        p50 = statistics.median(ordered) * 1000
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000
+    else:
+        p50 = p95 = float("nan")
+    print(
+        f"{mode:<5} {len(latencies) / elapsed:>9.1f} {p50:>9.1f} {p95:>9.1f} {failures:>8}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modes", nargs="+", choices=SERVERS, default=list(SERVERS))
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4, help="gthread threads per WSGI worker")
+    parser.add_argument("--slow-clients", type=int, default=50)
+    parser.add_argument("--slow-rate", type=int, default=16_384, help="bytes/s per slow client")
+    parser.add_argument("--slow-path", default="/routes/vendors/")
+    parser.add_argument("--path", default="/routes/vendors/?search=guitar")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    print(f"{args.slow_clients} slow clients at {args.slow_rate} B/s on {args.slow_path}; "
+          f"{args.requests} x {args.path} from {args.concurrency} clients")
+    print(f"{'mode':<5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'failures':>8}")
+    for mode in args.modes:
+        server = start_server(mode, args)
+        try:
+            report(mode, *asyncio.run(measure(args)))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
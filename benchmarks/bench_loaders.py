@@ -0,0 +1,101 @@
+# benchmarks/bench_loaders.py
+"""
+Compare the import loader backends (per-row ORM, bulk_create, COPY/executemany).
+
+Runs against a throwaway test database created from the configured DATABASES["default"],
+so it never touches real data:
+
+    python benchmarks/bench_loaders.py                      # 10k / 100k / 1M rows
+    python benchmarks/bench_loaders.py --rows 10000 --loaders bulk copy
+
+The per-row loader is skipped above --max-row-loader-rows (default 100k); at 1M rows it
+takes hours and tells us nothing new.
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django
+
+django.setup()
+
+from django.db import connection
+
+from cmsa.loaders import ImportRow, get_loader
+from cmsa.models import Vendor, Supplier, Category, Tombstone
+
+
+def synthetic_rows(n, suppliers=400, categories=40):
+    """~n rows shaped like CMT.tsv: each vendor carried by 1-3 suppliers, one category."""
+    for i in range(n):
+        supplier_names = tuple(
+            f"Supplier {(i * 7 + k * 13) % suppliers:04d}" for k in range(1 + i % 3)
+        )
+        yield ImportRow(f"Vendor {i:07d}", supplier_names, (f"Category {i % categories:02d}",))
+
+
+def reset_tables():
+    """
+    Empty the catalogue with raw SQL. QuerySet.delete() can't fast-delete models with
+    delete signal receivers (tombstones, name indexes), so at 1M rows it would load
+    every row and dominate the run.
+    """
+    models = [
+        Vendor.suppliers.through,
+        Vendor.categories.through,
+        Supplier.contacts.through,
+        Vendor,
+        Supplier,
+        Category,
+        Tombstone,
+    ]
+    tables = [connection.ops.quote_name(model._meta.db_table) for model in models]
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            # CASCADE: anything else pointing at these tables is throwaway here too.
+            cursor.execute(f"TRUNCATE {', '.join(tables)} CASCADE")
+        else:
+            for table in tables:
+                cursor.execute(f"DELETE FROM {table}")
+
+
+def run(loader_name, n):
+    reset_tables()
+    loader = get_loader(loader_name)
+    started = time.perf_counter()
+    loader.load(synthetic_rows(n))
+    elapsed = time.perf_counter() - started
+    links = Vendor.suppliers.through.objects.count() + Vendor.categories.through.objects.count()
+    return loader.__class__.__name__, elapsed, links
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--loaders", nargs="+", default=["row", "bulk", "copy"])
+    parser.add_argument("--max-row-loader-rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        print(f"backend: {connection.vendor}")
+        print(f"{'rows':>9}  {'loader':<20} {'seconds':>9} {'rows/s':>10} {'links':>9}")
+        for n in args.rows:
+            for loader_name in args.loaders:
+                if loader_name == "row" and n > args.max_row_loader_rows:
+                    print(f"{n:>9}  {'RowLoader':<20} {'skipped':>9}")
+                    continue
+                name, elapsed, links = run(loader_name, n)
+                print(f"{n:>9}  {name:<20} {elapsed:>9.2f} {n / elapsed:>10.0f} {links:>9}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
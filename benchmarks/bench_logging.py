@@ -0,0 +1,129 @@
+# benchmarks/bench_logging.py
+"""
+Per-request cost of request logging: a synchronous StreamHandler vs the queue pipeline
+(core.logging.QueueingHandler), with and without sampling.
+
+Requests are pushed through RequestLogMiddleware from --threads threads (gthread
+workers) with a trivial view, so the timings are the logging overhead itself. The sink
+stands in for stdout: each write sleeps --sink-latency microseconds, as when the log
+collector applies backpressure.
+
+    python benchmarks/bench_logging.py
+    python benchmarks/bench_logging.py --requests 50000 --sink-latency 200 --sample-rate 20
+
+No database needed.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django
+
+django.setup()
+
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from core.logging import QueueingHandler, RequestContextFilter, dropped_records
+from core.request_logging import RequestLogMiddleware, req_logger
+
+
+class SlowSink:
+    """A stream whose writes take `latency` seconds."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def flush(self):
+        pass
+
+
+def sync_handler(sink, args):
+    handler = logging.StreamHandler(sink)
+    handler.addFilter(RequestContextFilter())
+    return handler
+
+
+def queue_handler(sink, args):
+    target = logging.StreamHandler(sink)
+    target.name = "bench-sink"  # registers it for lookup by name, as dictConfig does
+    handler = QueueingHandler(handlers=["bench-sink"], queue_size=args.queue_size)
+    handler.addFilter(RequestContextFilter())
+    return handler
+
+
+MODES = {
+    "sync": (sync_handler, 1),
+    "queue": (queue_handler, 1),
+    "queue+sampling": (queue_handler, None),  # None: --sample-rate
+}
+
+
+def run(mode, args):
+    make_handler, sample_rate = MODES[mode]
+    sink = SlowSink(args.sink_latency / 1e6)
+    handler = make_handler(sink, args)
+    req_logger.handlers[:] = [handler]
+    req_logger.propagate = False
+    req_logger.setLevel(logging.INFO)
+
+    middleware = RequestLogMiddleware(lambda request: HttpResponse("ok"))
+    factory = RequestFactory()
+    per_thread = args.requests // args.threads
+    dropped_before = dropped_records.value()
+
+    def worker():
+        for _ in range(per_thread):
+            middleware(factory.get("/routes/vendors/"))
+
+    with override_settings(LOG_SAMPLE_RATE=sample_rate or args.sample_rate, LOG_SLOW_REQUEST_MS=10_000):
+        threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+    if isinstance(handler, QueueingHandler):
+        handler.close()  # drains the queue
+    total = per_thread * args.threads
+    dropped = dropped_records.value() - dropped_before
+    print(
+        f"{mode:<15} {elapsed / total * 1e6:>10.1f} {total / elapsed:>10.0f} "
+        f"{sink.writes:>8} {dropped:>8g}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--sink-latency", type=float, default=50.0, help="microseconds per write")
+    parser.add_argument("--queue-size", type=int, default=10_000)
+    parser.add_argument("--sample-rate", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests from {args.threads} threads, sink {args.sink_latency:g} us/write")
+    print(f"{'mode':<15} {'us/req':>10} {'req/s':>10} {'written':>8} {'dropped':>8}")
+    for mode in args.modes:
+        run(mode, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@
 
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Vendor, Supplier, Category, Contact
+from .models import Vendor, Supplier, Category, Contact, SlowQuery
 
 
 class ContactAdmin(admin.ModelAdmin):
@@ -27,6 +27,10 @@ class VendorAdmin(admin.ModelAdmin):
     inlines = [VendorSupplierInline]
     exclude = ("suppliers",)
 
+    def get_queryset(self, request):
+        # display_suppliers reads every row's suppliers; one query instead of one per row.
+        return super().get_queryset(request).prefetch_related("suppliers")
+
     def display_suppliers(self, obj):
         return ", ".join([supplier.name for supplier in obj.suppliers.all()])
 
@@ -107,7 +111,43 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ("name",)
 
 
+class SlowQueryAdmin(admin.ModelAdmin):
+    """Top slow statements by total time; rows are written by core/sql.py only."""
+
+    list_display = ("short_sql", "calls", "total_ms", "display_mean_ms", "max_ms", "last_view", "last_seen")
+    list_filter = ("last_view",)
+    search_fields = ("sql", "fingerprint", "last_view")
+    ordering = ("-total_ms",)
+    list_per_page = 50
+    readonly_fields = [field.name for field in SlowQuery._meta.fields if field.name != "explain"] + [
+        "display_mean_ms",
+        "display_explain",
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def short_sql(self, obj):
+        return obj.sql if len(obj.sql) <= 120 else obj.sql[:117] + "..."
+
+    short_sql.short_description = "SQL"
+
+    def display_mean_ms(self, obj):
+        return f"{obj.mean_ms:.1f}"
+
+    display_mean_ms.short_description = "Mean ms"
+
+    def display_explain(self, obj):
+        return format_html("<pre>{}</pre>", obj.explain or "-")
+
+    display_explain.short_description = "EXPLAIN (first occurrence)"
+
+
 admin.site.register(Contact, ContactAdmin)
 admin.site.register(Vendor, VendorAdmin)
 admin.site.register(Supplier, SupplierAdmin)
 admin.site.register(Category, CategoryAdmin)
+admin.site.register(SlowQuery, SlowQueryAdmin)
@@ -0,0 +1,122 @@
+# cmsa/autocomplete.py
+
+import threading
+from bisect import bisect_left, insort
+
+from .indexes import INDEXED_MODELS, WorkerIndex, iter_names
+from .text import normalize, search_key
+
+
+class PrefixIndex:
+    """
+    Sorted arrays of normalized name keys, searched with bisect.
+
+    Every word start of a name gets its own key ("coast music" is reachable as
+    "coast..." and "music..."). Keys are (suffix, pk) tuples kept in one array per
+    (kind, rank); rank 0 holds matches at the start of the name, which are returned
+    ahead of mid-name matches. Splitting by kind and rank means a `kinds` filter or a
+    crowd of mid-name matches never hides a hit further along a shared array.
+    """
+
+    def __init__(self):
+        self._arrays = {}  # (kind, rank) -> sorted [(suffix, pk)]
+        self._entries = {}  # (kind, pk) -> (name, [((kind, rank), key)])
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _keys_for(kind, pk, name):
+        text = search_key(name)
+        starts = [0] + [i + 1 for i, ch in enumerate(text) if ch == " "]
+        return [
+            ((kind, 0 if start == 0 else 1), (text[start:], pk)) for start in starts if text[start:]
+        ]
+
+    def add(self, kind, pk, name):
+        keys = self._keys_for(kind, pk, name)
+        with self._lock:
+            self._discard((kind, pk))
+            for array, key in keys:
+                insort(self._arrays.setdefault(array, []), key)
+            self._entries[(kind, pk)] = (name, keys)
+
+    def remove(self, kind, pk):
+        with self._lock:
+            self._discard((kind, pk))
+
+    def _discard(self, ident):
+        entry = self._entries.pop(ident, None)
+        if entry is None:
+            return
+        for array, key in entry[1]:
+            keys = self._arrays[array]
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+
+    @classmethod
+    def build(cls, items):
+        """Bulk-load (kind, pk, name) triples with one sort per array instead of repeated insort."""
+        index = cls()
+        for kind, pk, name in items:
+            keys = cls._keys_for(kind, pk, name)
+            for array, key in keys:
+                index._arrays.setdefault(array, []).append(key)
+            index._entries[(kind, pk)] = (name, keys)
+        for keys in index._arrays.values():
+            keys.sort()
+        return index
+
+    def search(self, query, limit=10, kinds=None):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+
+        results, seen = [], set()
+        with self._lock:
+            for rank in (0, 1):
+                hits = []
+                for kind in sorted({kind for kind, _ in self._arrays}):
+                    if kinds and kind not in kinds:
+                        continue
+                    keys = self._arrays.get((kind, rank), [])
+                    found = 0
+                    # At most `limit` distinct names per array can make the cut.
+                    for i in range(bisect_left(keys, (prefix,)), len(keys)):
+                        key, pk = keys[i]
+                        if not key.startswith(prefix) or found == limit:
+                            break
+                        if (kind, pk) in seen:
+                            continue
+                        seen.add((kind, pk))
+                        hits.append((key, kind, pk))
+                        found += 1
+                hits.sort()
+                results.extend(
+                    {"type": kind, "id": pk, "name": self._entries[(kind, pk)][0]}
+                    for _, kind, pk in hits
+                )
+                if len(results) >= limit:
+                    break
+        return results[:limit]
+
+
+prefix_index = WorkerIndex(lambda: PrefixIndex.build(iter_names()))
+
+
+def get_index():
+    return prefix_index.get()
+
+
+def reset():
+    prefix_index.reset()
+
+
+def update(kind, pk, name=None):
+    """Apply one change to the index if it has been built; name=None removes the entry."""
+    if name is None:
+        prefix_index.apply(PrefixIndex.remove, kind, pk)
+    else:
+        prefix_index.apply(PrefixIndex.add, kind, pk, name)
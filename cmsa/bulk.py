@@ -0,0 +1,234 @@
+# cmsa/bulk.py
+"""
+Set-based bulk writes: vendors (POST/PATCH /routes/vendors/bulk/) and supplier
+contact rosters (PUT /routes/suppliers/{id}/contacts/).
+
+A request of any size costs a fixed number of queries: one lookup per related model
+to resolve ids and names, one read of the existing through rows per relation, and
+batched INSERT/UPDATE/DELETE statements for the difference. Per-object signals don't
+fire; catalogue_changed is sent for what changed instead.
+"""
+
+from django.db import transaction
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+from .models import Vendor, Supplier, Category, Contact
+from .signals import catalogue_changed
+
+# payload key -> (related model, column on the through table, through model)
+RELATIONS = {
+    "suppliers": (Supplier, "supplier_id", Vendor.suppliers.through),
+    "categories": (Category, "category_id", Vendor.categories.through),
+}
+
+BATCH_SIZE = 500
+
+
+def _batches(items, size=BATCH_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def resolve_references(items):
+    """
+    Map every supplier/category reference (an int id or a name) in `items` to an id,
+    with one query per related model. Unknown references, and names shared by several
+    rows (supplier names aren't unique; refer to those by id), raise ValidationError.
+    """
+    resolved = {}
+    for key, (model, _, _) in RELATIONS.items():
+        refs = {ref for item in items for ref in item.get(key) or ()}
+        ids = {ref for ref in refs if isinstance(ref, int)}
+        names = refs - ids
+        by_id, by_name = set(), {}
+        if refs:
+            rows = model.objects.filter(Q(pk__in=ids) | Q(name__in=names)).values_list("pk", "name")
+            for pk, name in rows:
+                by_id.add(pk)
+                if name in names:
+                    by_name.setdefault(name, set()).add(pk)
+        missing = sorted((ids - by_id) | (names - set(by_name)), key=str)
+        if missing:
+            raise ValidationError({key: f"Unknown {key}: {', '.join(map(str, missing))}."})
+        ambiguous = sorted(name for name, pks in by_name.items() if len(pks) > 1)
+        if ambiguous:
+            raise ValidationError({key: f"Ambiguous {key} (use ids): {', '.join(ambiguous)}."})
+        by_name = {name: pks.pop() for name, pks in by_name.items()}
+        resolved[key] = {**{pk: pk for pk in ids}, **{name: by_name[name] for name in names}}
+    return resolved
+
+
+def _sync_links(wanted, using):
+    """
+    Make each vendor's links match `wanted` ({key: {vendor_id: set(ids)}}) with one
+    read and batched inserts/deletes per through table.
+    """
+    for key, targets in wanted.items():
+        if not targets:
+            continue
+        _, column, through = RELATIONS[key]
+        existing = {}
+        for batch in _batches(targets):
+            rows = through.objects.using(using).filter(vendor_id__in=batch)
+            for pk, vendor_id, other_id in rows.values_list("pk", "vendor_id", column):
+                existing[(vendor_id, other_id)] = pk
+
+        wanted_pairs = {(vendor_id, other) for vendor_id, ids in targets.items() for other in ids}
+        stale = [pk for pair, pk in existing.items() if pair not in wanted_pairs]
+        for batch in _batches(stale):
+            through.objects.using(using).filter(pk__in=batch).delete()
+        through.objects.using(using).bulk_create(
+            [
+                through(vendor_id=vendor_id, **{column: other})
+                for vendor_id, other in wanted_pairs - set(existing)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+
+def create_vendors(items, using="default"):
+    """Create vendors with their links; returns the new ids in payload order."""
+    with transaction.atomic(using=using):
+        refs = resolve_references(items)
+        vendors = Vendor.objects.using(using).bulk_create(
+            [Vendor(name=item["name"]) for item in items], batch_size=BATCH_SIZE
+        )
+        wanted = {
+            key: {
+                vendor.pk: {refs[key][ref] for ref in item.get(key) or ()}
+                for vendor, item in zip(vendors, items)
+            }
+            for key in RELATIONS
+        }
+        _sync_links(wanted, using)
+        pks = [vendor.pk for vendor in vendors]
+        catalogue_changed.send(sender=Vendor, pks=pks, using=using)
+    return pks
+
+
+def update_vendors(items, using="default"):
+    """
+    Apply partial updates: `name` if given, and each relation given is replaced in
+    full. Returns the ids in payload order.
+    """
+    pks = [item["id"] for item in items]
+    if len(set(pks)) != len(pks):
+        raise ValidationError({"id": "Each vendor may appear only once."})
+
+    with transaction.atomic(using=using):
+        refs = resolve_references(items)
+        vendors = Vendor.objects.using(using).in_bulk(pks)
+        missing = sorted(set(pks) - set(vendors))
+        if missing:
+            raise ValidationError({"id": f"Unknown vendors: {', '.join(map(str, missing))}."})
+
+        renamed = []
+        for item in items:
+            if "name" in item and vendors[item["id"]].name != item["name"]:
+                vendors[item["id"]].name = item["name"]
+                renamed.append(vendors[item["id"]])
+        if renamed:
+            Vendor.objects.using(using).bulk_update(renamed, ["name"], batch_size=BATCH_SIZE)
+
+        wanted = {
+            key: {
+                item["id"]: {refs[key][ref] for ref in item[key]} for item in items if key in item
+            }
+            for key in RELATIONS
+        }
+        _sync_links(wanted, using)
+        # bulk_update() stamped the renamed rows; relation-only edits still change the
+        # vendors' representation.
+        relinked = {pk for targets in wanted.values() for pk in targets}
+        Vendor.objects.using(using).touch(relinked - {vendor.pk for vendor in renamed})
+        catalogue_changed.send(sender=Vendor, pks=pks, using=using)
+    return pks
+
+
+ACCOUNTING_ROLE = "Accounting Contact"
+CONTACT_FIELDS = ("name", "email", "role", "primary_contact")
+
+
+def validate_roster(items):
+    """A roster needs exactly one primary contact and exactly one accounting contact."""
+    primaries = sum(1 for item in items if item.get("primary_contact"))
+    accounting = sum(1 for item in items if item.get("role") == ACCOUNTING_ROLE)
+    errors = {}
+    if primaries != 1:
+        errors["primary_contact"] = f"Expected exactly one primary contact, got {primaries}."
+    if accounting != 1:
+        errors["role"] = f'Expected exactly one "{ACCOUNTING_ROLE}", got {accounting}.'
+    if errors:
+        raise ValidationError(errors)
+
+
+def replace_contacts(supplier, items, using="default"):
+    """
+    Make `supplier`'s contacts exactly `items`, writing only the difference.
+
+    Items match current contacts by id, else by email (case-insensitive), so a CRM
+    export without our ids still updates in place. Matched contacts are updated only
+    when a field changed, the rest are inserted, and contacts left out are unlinked
+    (and deleted unless another supplier still lists them). Contact.save() and its
+    primary-contact UPDATE are bypassed: validate_roster() already guarantees one
+    primary. Returns the roster in payload order.
+    """
+    validate_roster(items)
+    through = Supplier.contacts.through
+
+    with transaction.atomic(using=using):
+        current = list(supplier.contacts.using(using).all())
+        by_id = {contact.pk: contact for contact in current}
+        by_email = {contact.email.lower(): contact for contact in current if contact.email}
+
+        roster, changed, created = [], [], []
+        for item in items:
+            contact = by_id.get(item.get("id"))
+            if contact is None and item.get("id") is not None:
+                raise ValidationError(
+                    {"id": f"Contact {item['id']} is not one of this supplier's contacts."}
+                )
+            if contact is None and item.get("email"):
+                contact = by_email.get(item["email"].lower())
+            if contact is not None and contact in roster:
+                raise ValidationError({"id": f"Contact {contact.pk} appears more than once."})
+
+            values = {
+                field: item.get(field, Contact._meta.get_field(field).get_default())
+                for field in CONTACT_FIELDS
+            }
+            if contact is None:
+                contact = Contact(**values)
+                created.append(contact)
+            elif any(getattr(contact, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(contact, field, value)
+                changed.append(contact)
+            roster.append(contact)
+
+        if changed:
+            Contact.objects.using(using).bulk_update(changed, CONTACT_FIELDS, batch_size=BATCH_SIZE)
+        if created:
+            Contact.objects.using(using).bulk_create(created, batch_size=BATCH_SIZE)
+            through.objects.using(using).bulk_create(
+                [through(supplier_id=supplier.pk, contact_id=contact.pk) for contact in created],
+                batch_size=BATCH_SIZE,
+            )
+
+        removed = [contact.pk for contact in current if contact not in roster]
+        if removed:
+            through.objects.using(using).filter(supplier_id=supplier.pk, contact_id__in=removed).delete()
+            shared = set(
+                through.objects.using(using)
+                .filter(contact_id__in=removed)
+                .values_list("contact_id", flat=True)
+            )
+            Contact.objects.using(using).filter(pk__in=set(removed) - shared).delete()
+
+        if changed or created or removed:
+            Supplier.objects.using(using).touch([supplier.pk])
+            # The roster is part of the supplier's representation (and its vendors').
+            catalogue_changed.send(sender=Supplier, pks=[supplier.pk], using=using)
+    return roster
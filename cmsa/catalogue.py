@@ -0,0 +1,146 @@
+# cmsa/catalogue.py
+"""
+The flattened catalogue: one row per vendor x supplier x category carrying each
+name's stored search_key (lowercase, unaccented), so a vendor search is one scan of
+an indexed table instead of a five-way join with DISTINCT.
+
+On Postgres `cmsa_catalogue` is a materialized view refreshed CONCURRENTLY (readers
+are never blocked); elsewhere it is a table repopulated in one transaction.
+
+Writes don't touch it: every catalogue write already records a ChangeEvent in its
+transaction (cmsa/events.py), and a refresh stores the newest event id it covers, so
+the catalogue is stale while a vendor, supplier or category event newer than that
+exists. While it is stale, searches fall back to the live joins, so they never serve
+stale results. Refreshing is left to a worker, `manage.py refresh_catalogue --every
+SECONDS`, so requests never wait on a rebuild; run it once by hand after a migration.
+"""
+
+import time
+
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.metrics import counter, gauge
+
+from . import events
+from .models import CatalogueEntry, CatalogueState, ChangeEvent
+from .text import search_key
+
+SQLITE_REFRESH = """
+INSERT INTO cmsa_catalogue (
+    vendor_id, vendor_name, vendor_key, supplier_id, supplier_name, supplier_key,
+    category_id, category_name, category_key
+)
+SELECT v.id, v.name, v.search_key,
+       COALESCE(s.id, 0), COALESCE(s.name, ''), COALESCE(s.search_key, ''),
+       COALESCE(c.id, 0), COALESCE(c.name, ''), COALESCE(c.search_key, '')
+FROM cmsa_vendor v
+LEFT JOIN cmsa_vendor_suppliers vs ON vs.vendor_id = v.id
+LEFT JOIN cmsa_supplier s ON s.id = vs.supplier_id
+LEFT JOIN cmsa_vendor_categories vc ON vc.vendor_id = v.id
+LEFT JOIN cmsa_category c ON c.id = vc.category_id
+"""
+
+refreshes = counter("cmsa_catalogue_refreshes_total", "Flattened catalogue refreshes run by this worker.")
+fallbacks = counter(
+    "cmsa_catalogue_fallbacks_total", "Vendor searches answered by live joins while the catalogue was stale."
+)
+
+
+# ChangeEvent.model values of the rows the catalogue is built from.
+SOURCES = ("vendor", "supplier", "category")
+
+
+def get_state(using="default"):
+    return CatalogueState.objects.using(using).filter(pk=1).first()
+
+
+def pending_changes(state, using="default"):
+    """Catalogue events the last refresh doesn't cover."""
+    changes = ChangeEvent.objects.using(using).filter(model__in=SOURCES)
+    return changes.filter(pk__gt=state.refreshed_event) if state is not None else changes
+
+
+def is_fresh(using="default"):
+    state = get_state(using)
+    if state is None or state.refreshed_at is None:
+        return False
+    if state.refreshed_at < timezone.now() - events.RETENTION:
+        return False  # events it would be compared against may have been pruned
+    return not pending_changes(state, using).exists()
+
+
+def refresh(using="default"):
+    """Rebuild the catalogue and record the newest event it covers. Returns the seconds taken."""
+    connection = connections[using]
+    started = time.monotonic()
+    # Read before the rebuild takes its snapshot, and only up to ids with no transaction
+    # still in flight below them: whatever commits later stays pending.
+    covered = events.settled_id(using)
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY cmsa_catalogue")
+            else:
+                cursor.execute("DELETE FROM cmsa_catalogue")
+                cursor.execute(SQLITE_REFRESH)
+    elapsed = time.monotonic() - started
+
+    CatalogueState.objects.using(using).update_or_create(
+        pk=1, defaults={"refreshed_event": covered, "refreshed_at": timezone.now(), "refresh_seconds": elapsed}
+    )
+    refreshes.inc()
+    return elapsed
+
+
+def refresh_if_stale(using="default"):
+    """Refresh when writes happened since the last refresh; the seconds taken, or None."""
+    if is_fresh(using):
+        return None
+    return refresh(using)
+
+
+def search_vendors(terms, category=None, supplier=None, using="default"):
+    """
+    Vendor ids (a values() subquery) whose own, a supplier's or a category's name
+    contains any of `terms`, optionally within `category` and carried by `supplier`.
+    Matching ignores case and accents.
+    """
+    condition = Q()
+    for term in terms:
+        key = search_key(term)
+        condition |= (
+            Q(vendor_key__contains=key) | Q(supplier_key__contains=key) | Q(category_key__contains=key)
+        )
+    rows = CatalogueEntry.objects.using(using).filter(condition)
+    # Each vendor has a row per (supplier, category) pair, so these narrow the same row.
+    if category is not None:
+        rows = rows.filter(category_id=category)
+    if supplier is not None:
+        rows = rows.filter(supplier_id=supplier)
+    return rows.values("vendor_id")
+
+
+def _stale_seconds():
+    first = pending_changes(get_state()).order_by("pk").values_list("created_at", flat=True).first()
+    if first is None:
+        return 0
+    return (timezone.now() - first).total_seconds()
+
+
+def _last_refresh_seconds():
+    state = get_state()
+    return state.refresh_seconds if state is not None else None
+
+
+gauge(
+    "cmsa_catalogue_stale_seconds",
+    "Seconds since the flattened catalogue first fell behind a write (0 when fresh).",
+    callback=_stale_seconds,
+)
+gauge(
+    "cmsa_catalogue_last_refresh_duration_seconds",
+    "Duration of the last flattened catalogue refresh.",
+    callback=_last_refresh_seconds,
+)
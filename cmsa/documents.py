@@ -0,0 +1,106 @@
+# cmsa/documents.py
+"""
+Precomputed vendor documents.
+
+Each vendor's public and private representations are rendered once, stored in
+VendorDocument and rebuilt after commit for just the vendors a change reaches (see
+the receivers in cmsa/signals.py). The plain vendor list then joins the stored JSON
+instead of running the serializers. Backfill with `manage.py rebuild_vendor_documents`.
+"""
+
+import json
+
+from cryptography.fernet import Fernet
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from core import tracing
+
+from .models import Vendor, Supplier, VendorDocument
+from .serializers import VendorPublicSerializer, VendorSerializer
+
+BATCH_SIZE = 500
+
+_renderer = JSONRenderer()
+
+
+def render(data):
+    """The exact bytes DRF's JSONRenderer would send, as text."""
+    return _renderer.render(data).decode()
+
+
+def _vendors(using):
+    suppliers = Supplier.objects.using(using).prefetch_related("contacts")
+    return Vendor.objects.using(using).prefetch_related(
+        Prefetch("suppliers", queryset=suppliers), "categories"
+    )
+
+
+def build_documents(vendor_ids=None, using="default"):
+    """
+    Re-render the documents of `vendor_ids` (None: every vendor) in batches of
+    BATCH_SIZE. Returns the number of documents written.
+    """
+    if vendor_ids is None:
+        vendor_ids = list(Vendor.objects.using(using).values_list("pk", flat=True))
+    vendor_ids = sorted(set(vendor_ids))
+
+    written = 0
+    for i in range(0, len(vendor_ids), BATCH_SIZE):
+        batch = vendor_ids[i:i + BATCH_SIZE]
+        context = {"encrypted_passwords": True}
+        documents = [
+            VendorDocument(
+                vendor=vendor,
+                public=render(VendorPublicSerializer(vendor).data),
+                private=render(VendorSerializer(vendor, context=context).data),
+            )
+            for vendor in _vendors(using).filter(pk__in=batch)
+        ]
+        # No upsert before Django 4.1: replace the batch's rows in one transaction.
+        with transaction.atomic(using=using):
+            VendorDocument.objects.using(using).filter(vendor_id__in=batch).delete()
+            VendorDocument.objects.using(using).bulk_create(documents)
+        written += len(documents)
+    return written
+
+
+def rebuild_on_commit(vendor_ids=None, using="default"):
+    """Rebuild after the current transaction commits (immediately outside one)."""
+    if vendor_ids is not None:
+        vendor_ids = list(vendor_ids)
+        if not vendor_ids:
+            return
+    transaction.on_commit(lambda: build_documents(vendor_ids, using=using), using=using)
+
+
+def public_list(queryset):
+    """
+    JSON array of the stored public documents for `queryset`, in its order, or None
+    when any vendor has no document yet (the caller serializes as usual).
+    """
+    documents = list(queryset.values_list("document__public", flat=True))
+    if None in documents:
+        return None
+    return "[" + ",".join(documents) + "]"
+
+
+def private_list(queryset):
+    """As public_list(), with website passwords decrypted for signed-in users."""
+    documents = list(queryset.values_list("document__private", flat=True))
+    if None in documents:
+        return None
+    cipher = Fernet(settings.PASSWORD_ENCRYPTION_KEY)
+    vendors = [json.loads(document) for document in documents]
+    suppliers = [
+        supplier
+        for vendor in vendors
+        for supplier in vendor.get("suppliers", ())
+        if supplier.get("website_password")
+    ]
+    with tracing.span("fernet.decrypt", {"count": len(suppliers)}):
+        for supplier in suppliers:
+            supplier["website_password"] = cipher.decrypt(supplier["website_password"].encode()).decode()
+    return render(vendors)
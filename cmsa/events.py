@@ -0,0 +1,257 @@
+# cmsa/events.py
+"""
+Server-Sent Events stream of catalogue changes at /routes/events/.
+
+Writes record ChangeEvent rows in their own transaction (see the receivers in
+cmsa/signals.py), so an event exists exactly when its change committed. Under ASGI,
+core/asgi.py routes /routes/events/ to `stream()`: each worker runs one relay task
+that reads new rows from the table (the relay between workers) and fans them out to
+its open connections (the in-process broadcast). A commit in the same worker wakes
+the relay at once; other workers' commits arrive within POLL_INTERVAL.
+
+Clients resume with the standard Last-Event-ID header. Under WSGI the same URL is
+served by `cmsa.views.events`, which sends the backlog and closes with a `retry:`
+hint, so EventSource degrades to polling.
+"""
+
+import asyncio
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import ChangeEvent
+
+POLL_INTERVAL = 1.0  # seconds between relay reads when nothing woke it
+GAP_WAIT = 2.0  # how long a missing id may belong to a transaction still in flight
+HEARTBEAT = 15.0  # comment line keeping idle connections (and proxies) open
+RETRY_MS = 5000  # EventSource reconnect delay
+BACKLOG_LIMIT = 500
+QUEUE_SIZE = 1000
+RETENTION = timedelta(days=1)
+PRUNE_EVERY = 1000  # prune old events whenever an id crosses a multiple of this
+
+
+# --- Recording ---------------------------------------------------------------------
+
+
+def record(model, action, pks=(None,), using="default"):
+    """Add events for `pks` of `model` (a model class) to the current transaction."""
+    events = ChangeEvent.objects.using(using).bulk_create(
+        [ChangeEvent(model=model._meta.model_name, object_id=pk, action=action) for pk in pks]
+    )
+    if any(event.pk and event.pk % PRUNE_EVERY == 0 for event in events):
+        ChangeEvent.objects.using(using).filter(created_at__lt=timezone.now() - RETENTION).delete()
+    transaction.on_commit(broadcaster.wake, using=using)
+
+
+# --- Wire format -------------------------------------------------------------------
+
+
+def format_event(event):
+    data = json.dumps(
+        {"model": event.model, "id": event.object_id, "action": event.action},
+        separators=(",", ":"),
+    )
+    return f"id: {event.pk}\nevent: change\ndata: {data}\n\n".encode()
+
+
+def format_ready(last_id):
+    """First message of a fresh connection: sets the client's Last-Event-ID."""
+    return f"retry: {RETRY_MS}\nid: {last_id}\nevent: ready\ndata: {{}}\n\n".encode()
+
+
+def parse_last_event_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def latest_id():
+    return ChangeEvent.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+
+
+def events_after(last_id, limit=BACKLOG_LIMIT):
+    return list(ChangeEvent.objects.filter(pk__gt=last_id).order_by("pk")[:limit])
+
+
+def settled(last_id, events):
+    """
+    (events, last_id): `events` up to the first one with a missing id below it that is
+    younger than GAP_WAIT. Ids are handed out before commit, so a lower id may belong
+    to a transaction still in flight; once its successor is GAP_WAIT old, it was rolled
+    back (or pruned). Cursors only ever move past ids settled this way.
+    """
+    cutoff = timezone.now() - timedelta(seconds=GAP_WAIT)
+    ready = []
+    for event in events:
+        if event.pk != last_id + 1 and event.created_at > cutoff:
+            break
+        ready.append(event)
+        last_id = event.pk
+    return ready, last_id
+
+
+def settled_id(using="default"):
+    """Where a fresh cursor starts: the newest id with no unsettled gap below it."""
+    cutoff = timezone.now() - timedelta(seconds=GAP_WAIT)
+    changes = ChangeEvent.objects.using(using)
+    old = changes.filter(created_at__lte=cutoff).order_by("-pk").values_list("pk", flat=True)
+    last_id = old.first() or 0
+    recent = changes.filter(pk__gt=last_id).order_by("pk")
+    return settled(last_id, recent)[1]
+
+
+# --- In-process broadcast ----------------------------------------------------------
+
+
+class Broadcaster:
+    """Fans ChangeEvent rows out to this worker's SSE connections, in id order."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._loop = None
+        self._wakeup = None
+        self._relay = None
+        self.cursor = None
+
+    async def subscribe(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._wakeup, self._relay = loop, asyncio.Event(), None
+        if self._relay is None or self._relay.done():
+            # Start reading after the newest event; the connection's own backlog
+            # (from its Last-Event-ID) covers anything older.
+            self.cursor = await sync_to_async(settled_id)()
+            self._relay = loop.create_task(self._run())
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    def wake(self):
+        """Thread-safe: called after a commit in any thread of this process."""
+        loop, wakeup = self._loop, self._wakeup
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wakeup.set)
+
+    def _fetch(self):
+        close_old_connections()
+        ready, self.cursor = settled(self.cursor, events_after(self.cursor))
+        return ready
+
+    def _publish(self, event):
+        for queue in list(self._subscribers):
+            if queue.full():
+                # Too slow to keep up: end its stream; the client resumes by Last-Event-ID.
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+            else:
+                queue.put_nowait(event)
+
+    async def _run(self):
+        while self._subscribers:
+            for event in await sync_to_async(self._fetch)():
+                self._publish(event)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+
+broadcaster = Broadcaster()
+
+
+# --- ASGI endpoint -----------------------------------------------------------------
+
+
+def backlog(last_id):
+    """
+    (messages, last_id) for a reconnecting client: the events it missed, or a single
+    "reset" telling it to reload when it missed more than BACKLOG_LIMIT.
+    """
+    if last_id is None:
+        last_id = settled_id()
+        return [format_ready(last_id)], last_id
+    events = events_after(last_id, limit=BACKLOG_LIMIT + 1)
+    if len(events) > BACKLOG_LIMIT:
+        last_id = settled_id()
+        return [f"id: {last_id}\nevent: reset\ndata: {{}}\n\n".encode()], last_id
+    events, last_id = settled(last_id, events)
+    return [format_event(event) for event in events], last_id
+
+
+def _cors_headers(origin):
+    # This app bypasses Django's middleware, so it applies the corsheaders allow-list itself.
+    if origin and origin.decode() in settings.CORS_ALLOWED_ORIGINS:
+        return [(b"access-control-allow-origin", origin), (b"access-control-allow-credentials", b"true")]
+    return []
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def stream(scope, receive, send):
+    """Raw ASGI app: Django 4.0 buffers a whole streaming response under ASGI."""
+    if scope["method"] != "GET":
+        await send({"type": "http.response.start", "status": 405, "headers": [(b"allow", b"GET")]})
+        await send({"type": "http.response.body", "body": b""})
+        return
+
+    async def write(body):
+        await send({"type": "http.response.body", "body": body, "more_body": True})
+
+    headers = dict(scope["headers"])
+    last_id = parse_last_event_id(headers.get(b"last-event-id", b"").decode())
+    queue = await broadcaster.subscribe()
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                    *_cors_headers(headers.get(b"origin")),
+                ],
+            }
+        )
+        messages, last_id = await sync_to_async(backlog)(last_id)
+        for message in messages:
+            await write(message)
+
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {getter, disconnected}, timeout=HEARTBEAT, return_when=asyncio.FIRST_COMPLETED
+            )
+            if disconnected in done:
+                getter.cancel()
+                return
+            if getter not in done:
+                getter.cancel()
+                await write(b": keepalive\n\n")
+                continue
+            event = getter.result()
+            if event is None:
+                break
+            if event.pk > last_id:  # the backlog may already have sent it
+                await write(format_event(event))
+                last_id = event.pk
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        broadcaster.unsubscribe(queue)
+        disconnected.cancel()
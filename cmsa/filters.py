@@ -0,0 +1,127 @@
+# cmsa/filters.py
+"""
+Structured list filters.
+
+Relation filters compile to correlated EXISTS subqueries on the through tables, so
+they never multiply rows and need no DISTINCT; each probe is answered by the through
+table's unique (vendor_id, x_id) index.
+"""
+
+from django.db.models import Exists, OuterRef, Q
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework.exceptions import ValidationError
+
+from .models import Vendor, Supplier, Contact
+from .text import search_key
+
+TRUE_VALUES = ("1", "true", "yes")
+FALSE_VALUES = ("0", "false", "no")
+
+
+def id_param(params, name):
+    raw = params.get(name)
+    if raw in (None, ""):
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        raise ValidationError({name: "Expected an integer id."})
+
+
+def bool_param(params, name):
+    raw = params.get(name)
+    if raw in (None, ""):
+        return None
+    if raw.lower() in TRUE_VALUES:
+        return True
+    if raw.lower() in FALSE_VALUES:
+        return False
+    raise ValidationError({name: "Expected true or false."})
+
+
+def vendor_in_category(category_id):
+    return Exists(
+        Vendor.categories.through.objects.filter(vendor_id=OuterRef("pk"), category_id=category_id)
+    )
+
+
+def vendor_carried_by(supplier_id):
+    return Exists(
+        Vendor.suppliers.through.objects.filter(vendor_id=OuterRef("pk"), supplier_id=supplier_id)
+    )
+
+
+def supplier_carries(vendor_id):
+    return Exists(
+        Vendor.suppliers.through.objects.filter(supplier_id=OuterRef("pk"), vendor_id=vendor_id)
+    )
+
+
+def supplier_has_contacts():
+    return Exists(Supplier.contacts.through.objects.filter(supplier_id=OuterRef("pk")))
+
+
+def filter_vendors(queryset, params):
+    """Apply ?category= and ?supplier=."""
+    category = id_param(params, "category")
+    if category is not None:
+        queryset = queryset.filter(vendor_in_category(category))
+    supplier = id_param(params, "supplier")
+    if supplier is not None:
+        queryset = queryset.filter(vendor_carried_by(supplier))
+    return queryset
+
+
+def filter_suppliers(queryset, params):
+    """Apply ?account_active=, ?has_contacts= and ?vendor=."""
+    account_active = bool_param(params, "account_active")
+    if account_active is not None:
+        queryset = queryset.filter(account_active=account_active)
+    has_contacts = bool_param(params, "has_contacts")
+    if has_contacts is not None:
+        queryset = queryset.filter(supplier_has_contacts() if has_contacts else ~supplier_has_contacts())
+    vendor = id_param(params, "vendor")
+    if vendor is not None:
+        queryset = queryset.filter(supplier_carries(vendor))
+    return queryset
+
+
+def search_suppliers(queryset, term, private=False):
+    """
+    Suppliers whose name (ignoring case and accents) or website contains `term`; with
+    `private`, also those with a matching contact name/email (one EXISTS, no join
+    fan-out).
+    """
+    condition = Q(search_key__contains=search_key(term)) | Q(website__icontains=term)
+    if private:
+        contacts = Contact.objects.filter(supplier=OuterRef("pk")).filter(
+            Q(name__icontains=term) | Q(email__icontains=term)
+        )
+        condition |= (
+            Q(contact_name__icontains=term) | Q(contact_email__icontains=term) | Exists(contacts)
+        )
+    return queryset.filter(condition)
+
+
+def _param(name, description, type_):
+    return OpenApiParameter(
+        name=name, description=description, required=False, type=type_,
+        location=OpenApiParameter.QUERY,
+    )
+
+
+VENDOR_FILTER_PARAMETERS = [
+    _param("category", "Only vendors in this category (id).", int),
+    _param("supplier", "Only vendors carried by this supplier (id).", int),
+]
+
+SUPPLIER_FILTER_PARAMETERS = [
+    _param(
+        "search",
+        "Search supplier name and website; signed-in users also match contact names and emails.",
+        str,
+    ),
+    _param("account_active", "Only suppliers with (true) or without (false) an active account.", bool),
+    _param("has_contacts", "Only suppliers with (true) or without (false) contacts.", bool),
+    _param("vendor", "Only suppliers carrying this vendor (id).", int),
+]
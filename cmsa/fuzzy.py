@@ -0,0 +1,157 @@
+# cmsa/fuzzy.py
+
+import re
+import threading
+from collections import Counter, defaultdict
+
+from .indexes import WorkerIndex, iter_names
+from .text import normalize, repair
+
+_word = re.compile(r"\w+")
+
+
+def tokenize(name):
+    """[(normalized, original)] word pairs: "Larrivée Guitars" -> [("larrivee", "Larrivée"), ...]."""
+    return [(normalize(token), token) for token in _word.findall(repair(name) or "")]
+
+
+def edit_distance(a, b, limit):
+    """Optimal-string-alignment distance (adjacent transpositions count as 1), capped at limit + 1."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = ca != cb
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SymSpellIndex:
+    """
+    Symmetric-delete spelling correction over the words of vendor, supplier and
+    category names.
+
+    Every dictionary word is stored under all strings reachable by deleting up to
+    `max_distance` characters from its first `prefix_length` characters. A query word
+    generates its own deletes; dictionary words sharing one are candidates, verified
+    with a real edit distance. Lookups therefore cost a few dozen dict probes, with no
+    database access and no scan of the vocabulary.
+    """
+
+    def __init__(self, max_distance=2, prefix_length=7):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self._deletes = defaultdict(set)  # delete string -> words
+        self._counts = Counter()  # word -> number of names containing it
+        self._display = {}  # word -> original spelling, e.g. "larrivee" -> "Larrivée"
+        self._names = {}  # (kind, pk) -> set of words
+        self._lock = threading.Lock()
+
+    def _edits(self, word):
+        word = word[: self.prefix_length]
+        edits, frontier = {word}, {word}
+        for _ in range(self.max_distance):
+            frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))} - edits
+            edits |= frontier
+        return edits
+
+    @classmethod
+    def build(cls, items, **kwargs):
+        index = cls(**kwargs)
+        for kind, pk, name in items:
+            index._add(kind, pk, name)
+        return index
+
+    def add(self, kind, pk, name):
+        with self._lock:
+            self._remove((kind, pk))
+            self._add(kind, pk, name)
+
+    def remove(self, kind, pk):
+        with self._lock:
+            self._remove((kind, pk))
+
+    def _add(self, kind, pk, name):
+        words = set()
+        for word, original in tokenize(name):
+            if word in words:
+                continue
+            words.add(word)
+            if not self._counts[word]:
+                self._display[word] = original
+                for edit in self._edits(word):
+                    self._deletes[edit].add(word)
+            self._counts[word] += 1
+        self._names[(kind, pk)] = words
+
+    def _remove(self, ident):
+        for word in self._names.pop(ident, ()):
+            self._counts[word] -= 1
+            if self._counts[word] <= 0:
+                del self._counts[word]
+                del self._display[word]
+                for edit in self._edits(word):
+                    self._deletes[edit].discard(word)
+                    if not self._deletes[edit]:
+                        del self._deletes[edit]
+
+    def lookup(self, word):
+        """Best dictionary word within max_distance of `word` (normalized), or None."""
+        if word in self._counts:
+            return word
+        # Very short words correct to almost anything; allow one edit below 5 characters.
+        limit = min(self.max_distance, 1 if len(word) < 5 else self.max_distance)
+        best = None
+        with self._lock:
+            candidates = set()
+            for edit in self._edits(word):
+                candidates |= self._deletes.get(edit, set())
+            for candidate in candidates:
+                distance = edit_distance(word, candidate, limit)
+                if distance > limit:
+                    continue
+                rank = (distance, -self._counts[candidate], candidate)
+                if best is None or rank < best[0]:
+                    best = (rank, candidate)
+        return best[1] if best else None
+
+    def correct(self, query):
+        """
+        Corrected form of a free-text query, or None when every word is already known
+        (or nothing close enough exists). Known words keep the user's spelling.
+        """
+        corrected, changed = [], False
+        for word, original in tokenize(query):
+            match = self.lookup(word)
+            if match is None or match == word:
+                corrected.append(original)
+            else:
+                corrected.append(self._display[match])
+                changed = True
+        return " ".join(corrected) if changed else None
+
+
+fuzzy_index = WorkerIndex(lambda: SymSpellIndex.build(iter_names()))
+
+
+def get_index():
+    return fuzzy_index.get()
+
+
+def reset():
+    fuzzy_index.reset()
+
+
+def update(kind, pk, name=None):
+    """Apply one change to the index if it has been built; name=None removes the entry."""
+    if name is None:
+        fuzzy_index.apply(SymSpellIndex.remove, kind, pk)
+    else:
+        fuzzy_index.apply(SymSpellIndex.add, kind, pk, name)
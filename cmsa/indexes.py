@@ -0,0 +1,64 @@
+# cmsa/indexes.py
+
+import threading
+import time
+
+from django.conf import settings
+
+from .models import Vendor, Supplier, Category
+
+INDEXED_MODELS = {"vendor": Vendor, "supplier": Supplier, "category": Category}
+
+
+def iter_names():
+    """(kind, pk, name) for every vendor, supplier and category: three queries."""
+    for kind, model in INDEXED_MODELS.items():
+        for pk, name in model.objects.values_list("pk", "name"):
+            yield kind, pk, name
+
+
+class WorkerIndex:
+    """
+    Holds one in-memory index per worker process, built on first use.
+
+    Model signals apply this worker's own writes through `apply()`; NAME_INDEX_MAX_AGE
+    bounds how stale writes made by other workers can leave it. Indexes that must not
+    lag other workers pass `version`, a cheap callable whose result changes whenever
+    the underlying rows do; it is checked on every `get()`.
+    """
+
+    def __init__(self, build, version=None):
+        self._build = build
+        self._version = version
+        self._index = None
+        self._built_at = 0.0
+        self._built_version = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        index = self._index
+        version = self._version() if self._version is not None else None
+        if (
+            index is not None
+            and version == self._built_version
+            and time.monotonic() - self._built_at < settings.NAME_INDEX_MAX_AGE
+        ):
+            return index
+        with self._lock:
+            if self._index is index:  # nobody rebuilt it while we waited
+                # `version` was read before building, so writes racing the build
+                # trigger another rebuild on the next get().
+                self._index = self._build()
+                self._built_at = time.monotonic()
+                self._built_version = version
+            return self._index
+
+    def reset(self):
+        """Drop the index; the next lookup rebuilds it."""
+        self._index = None
+
+    def apply(self, func, *args):
+        """Call func(index, *args) if the index has been built; otherwise there is nothing to update."""
+        index = self._index
+        if index is not None:
+            func(index, *args)
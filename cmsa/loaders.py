@@ -0,0 +1,367 @@
+# cmsa/loaders.py
+
+import csv
+import io
+import uuid
+from collections import namedtuple
+from functools import lru_cache
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import NAME_KEY_FIELDS, Vendor, Supplier, Category
+from .signals import catalogue_changed
+from .text import search_key, sort_key
+
+
+ImportRow = namedtuple("ImportRow", ["vendor", "suppliers", "categories"])
+
+
+def read_tsv_rows(file):
+    """
+    Parse the CMT-style TSV (Vendor / Supplier / Category) into ImportRow tuples.
+
+    The Supplier column may hold a comma-separated list; blank names are dropped.
+    """
+    reader = csv.DictReader(file, delimiter="\t")
+    for row in reader:
+        vendor_name = (row.get("Vendor") or "").strip()
+        if not vendor_name:
+            continue
+        supplier_names = tuple(
+            name.strip() for name in (row.get("Supplier") or "").split(",") if name.strip()
+        )
+        category_name = (row.get("Category") or "").strip()
+        yield ImportRow(vendor_name, supplier_names, (category_name,) if category_name else ())
+
+
+class BaseLoader:
+    """
+    Loads vendor/supplier/category rows and the Vendor.suppliers / Vendor.categories links.
+
+    Every loader has the same semantics as the original per-row import: entities are
+    matched by exact name and created when missing, and links are only ever added.
+    Vendor and supplier names aren't unique; a repeated name resolves to its oldest row.
+    `load()` returns a dict of created-row counts. Vendors that gain a link get their
+    `updated_at` bumped, as m2m_changed would have done on the per-row path.
+    """
+
+    name = None
+
+    def __init__(self, using="default"):
+        self.using = using
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def load(self, rows):
+        with transaction.atomic(using=self.using):
+            counts = self._load(rows)
+            for model in (Vendor, Supplier, Category):
+                catalogue_changed.send(sender=model, pks=None, using=self.using)
+        return counts
+
+    def _load(self, rows):
+        raise NotImplementedError
+
+
+class RowLoader(BaseLoader):
+    """The legacy path: a lookup or create() and .add() per row. Kept as a baseline."""
+
+    name = "row"
+
+    def _get_or_create(self, model, name):
+        manager = model.objects.using(self.using)
+        existing = manager.filter(name=name).order_by("pk").first()
+        if existing is not None:
+            return existing, False
+        return manager.create(name=name), True
+
+    def _load(self, rows):
+        counts = dict.fromkeys(("vendors", "suppliers", "categories"), 0)
+        for row in rows:
+            vendor, created = self._get_or_create(Vendor, row.vendor)
+            counts["vendors"] += created
+
+            for supplier_name in row.suppliers:
+                supplier, created = self._get_or_create(Supplier, supplier_name)
+                counts["suppliers"] += created
+                vendor.suppliers.add(supplier)
+
+            for category_name in row.categories:
+                category, created = self._get_or_create(Category, category_name)
+                counts["categories"] += created
+                vendor.categories.add(category)
+        return counts
+
+
+class _CollectingLoader(BaseLoader):
+    """Shared first pass: dedupe names and (vendor, supplier)/(vendor, category) pairs."""
+
+    @staticmethod
+    def _collect(rows):
+        vendor_suppliers, vendor_categories = set(), set()
+        vendors, suppliers, categories = set(), set(), set()
+        for row in rows:
+            vendors.add(row.vendor)
+            for name in row.suppliers:
+                suppliers.add(name)
+                vendor_suppliers.add((row.vendor, name))
+            for name in row.categories:
+                categories.add(name)
+                vendor_categories.add((row.vendor, name))
+        return (vendors, suppliers, categories), (vendor_suppliers, vendor_categories)
+
+
+class BulkCreateLoader(_CollectingLoader):
+    """ORM bulk_create() for entities and through rows (ignore_conflicts on the links)."""
+
+    name = "bulk"
+    batch_size = 5000
+
+    def _ensure(self, model, names, **defaults):
+        # Whole-table reads instead of name__in: large IN lists blow SQLite's variable limit.
+        manager = model.objects.using(self.using)
+        # Newest first, so the oldest row of a repeated name is the one kept.
+        pairs = manager.order_by("-id").values_list("name", "id")
+        ids = dict(pairs)
+        missing = [name for name in names if name not in ids]
+        if missing:
+            manager.bulk_create(
+                [model(name=name, **defaults) for name in missing], batch_size=self.batch_size
+            )
+            ids = dict(pairs.all())
+        return ids, len(missing)
+
+    def _load(self, rows):
+        (vendors, suppliers, categories), (vendor_suppliers, vendor_categories) = self._collect(rows)
+
+        vendor_ids, vendors_created = self._ensure(Vendor, vendors)
+        supplier_ids, suppliers_created = self._ensure(Supplier, suppliers)
+        category_ids, categories_created = self._ensure(Category, categories)
+
+        linked = set()
+        for through, column, pairs, ids in (
+            (Vendor.suppliers.through, "supplier_id", vendor_suppliers, supplier_ids),
+            (Vendor.categories.through, "category_id", vendor_categories, category_ids),
+        ):
+            manager = through.objects.using(self.using)
+            existing = set(manager.values_list("vendor_id", column))
+            new_links = {(vendor_ids[v], ids[o]) for v, o in pairs} - existing
+            manager.bulk_create(
+                [through(vendor_id=v, **{column: o}) for v, o in new_links],
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+            linked.update(v for v, _ in new_links)
+
+        Vendor.objects.using(self.using).touch(linked)
+
+        return {
+            "vendors": vendors_created,
+            "suppliers": suppliers_created,
+            "categories": categories_created,
+        }
+
+
+class ExecutemanyLoader(_CollectingLoader):
+    """
+    Raw cursor.executemany() for backends without COPY (SQLite in dev/tests).
+
+    Names are resolved against one SELECT per table; links rely on the through
+    tables' unique (vendor_id, <other>_id) constraint to ignore duplicates.
+    """
+
+    name = "copy"
+
+    def _q(self, name):
+        return self.connection.ops.quote_name(name)
+
+    def _entity_columns(self, model):
+        """Extra NOT NULL columns (and their values) the entity INSERT has to supply."""
+        columns = {"updated_at": timezone.now()}
+        if model is Supplier:
+            columns["account_active"] = False
+        return columns
+
+    def _ensure(self, cursor, model, names):
+        table = self._q(model._meta.db_table)
+        cursor.execute(f"SELECT name, MIN(id) FROM {table} GROUP BY name")
+        ids = dict(cursor.fetchall())
+        missing = sorted(name for name in names if name not in ids)
+        if not missing:
+            return ids, 0
+
+        extra = self._entity_columns(model)
+        columns = ", ".join(self._q(c) for c in ["name", *NAME_KEY_FIELDS, *extra])
+        placeholders = ", ".join(["%s"] * (1 + len(NAME_KEY_FIELDS) + len(extra)))
+        cursor.executemany(
+            f"INSERT INTO {table} ({columns}) VALUES ({placeholders})",
+            [(name, sort_key(name), search_key(name), *extra.values()) for name in missing],
+        )
+        cursor.execute(f"SELECT name, MIN(id) FROM {table} GROUP BY name")
+        return dict(cursor.fetchall()), len(missing)
+
+    def _link(self, cursor, through, column, pairs, vendor_ids, other_ids):
+        """Insert the missing links; returns the ids of vendors that gained one."""
+        ops = self.connection.ops
+        table = self._q(through._meta.db_table)
+        cursor.execute(f"SELECT {self._q('vendor_id')}, {self._q(column)} FROM {table}")
+        new_links = {(vendor_ids[v], other_ids[o]) for v, o in pairs} - set(cursor.fetchall())
+        cursor.executemany(
+            f"{ops.insert_statement(ignore_conflicts=True)} {table} "
+            f"({self._q('vendor_id')}, {self._q(column)}) VALUES (%s, %s) "
+            f"{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}",
+            sorted(new_links),
+        )
+        return {v for v, _ in new_links}
+
+    def _load(self, rows):
+        (vendors, suppliers, categories), (vendor_suppliers, vendor_categories) = self._collect(rows)
+
+        with self.connection.cursor() as cursor:
+            vendor_ids, vendors_created = self._ensure(cursor, Vendor, vendors)
+            supplier_ids, suppliers_created = self._ensure(cursor, Supplier, suppliers)
+            category_ids, categories_created = self._ensure(cursor, Category, categories)
+
+            linked = self._link(cursor, Vendor.suppliers.through, "supplier_id",
+                                vendor_suppliers, vendor_ids, supplier_ids)
+            linked |= self._link(cursor, Vendor.categories.through, "category_id",
+                                 vendor_categories, vendor_ids, category_ids)
+
+        Vendor.objects.using(self.using).touch(linked)
+        return {
+            "vendors": vendors_created,
+            "suppliers": suppliers_created,
+            "categories": categories_created,
+        }
+
+
+class PostgresCopyLoader(ExecutemanyLoader):
+    """
+    COPY the raw rows into an UNLOGGED staging table, then move them with set-based
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING into the entity and through tables.
+
+    Nothing is deduplicated in Python, so memory stays flat at 1M+ rows. Each name is
+    copied with its sort/search keys, computed through a bounded cache since the same
+    supplier and category names repeat on most rows.
+    """
+
+    copy_chunk_rows = 100_000
+    key_cache_size = 65_536
+
+    STAGING_COLUMNS = ", ".join(
+        f"{column}{suffix}"
+        for column in ("vendor", "supplier", "category")
+        for suffix in ("", "_sort", "_search")
+    )
+
+    def _copy(self, cursor, staging, rows):
+        sql = f"COPY {staging} ({self.STAGING_COLUMNS}) FROM STDIN WITH (FORMAT csv)"
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        blank = (None, None, None)
+
+        @lru_cache(maxsize=self.key_cache_size)
+        def named(name):
+            return name, sort_key(name), search_key(name)
+
+        pending = 0
+        for row in rows:
+            vendor = named(row.vendor)
+            for name in row.suppliers:
+                writer.writerow((*vendor, *named(name), *blank))
+            for name in row.categories:
+                writer.writerow((*vendor, *blank, *named(name)))
+            if not row.suppliers and not row.categories:
+                writer.writerow((*vendor, *blank, *blank))
+            pending += 1
+            if pending >= self.copy_chunk_rows:
+                buf.seek(0)
+                cursor.copy_expert(sql, buf)
+                buf.seek(0)
+                buf.truncate()
+                pending = 0
+        if pending:
+            buf.seek(0)
+            cursor.copy_expert(sql, buf)
+
+    def _insert_names(self, cursor, staging, model, column):
+        table = self._q(model._meta.db_table)
+        extra = self._entity_columns(model)
+        columns = ", ".join(self._q(c) for c in ["name", *NAME_KEY_FIELDS, *extra])
+        values = ", %s" * len(extra)
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) "
+            f"SELECT DISTINCT s.{column}, s.{column}_sort, s.{column}_search{values} "
+            f"FROM {staging} s "
+            f"WHERE s.{column} IS NOT NULL "
+            f"AND NOT EXISTS (SELECT 1 FROM {table} t WHERE t.name = s.{column}) "
+            f"ON CONFLICT DO NOTHING",
+            list(extra.values()),
+        )
+        return cursor.rowcount
+
+    def _insert_links(self, cursor, staging, through, model, column, staging_column):
+        """Insert the missing links and bump updated_at on the vendors that gained one."""
+        table = self._q(through._meta.db_table)
+        other = self._q(model._meta.db_table)
+        vendors = self._q(Vendor._meta.db_table)
+        cursor.execute(
+            f"WITH inserted AS ("
+            f"INSERT INTO {table} ({self._q('vendor_id')}, {self._q(column)}) "
+            f"SELECT DISTINCT v.id, o.id FROM {staging} s "
+            f"JOIN (SELECT name, MIN(id) AS id FROM {vendors} GROUP BY name) v ON v.name = s.vendor "
+            f"JOIN (SELECT name, MIN(id) AS id FROM {other} GROUP BY name) o "
+            f"ON o.name = s.{staging_column} "
+            f"ON CONFLICT DO NOTHING RETURNING {self._q('vendor_id')}) "
+            f"UPDATE {vendors} SET updated_at = %s "
+            f"WHERE id IN (SELECT {self._q('vendor_id')} FROM inserted)",
+            [timezone.now()],
+        )
+
+    def _load(self, rows):
+        staging = self._q(f"cmsa_import_staging_{uuid.uuid4().hex[:12]}")
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE UNLOGGED TABLE {staging} ("
+                f"vendor text NOT NULL, vendor_sort text, vendor_search text, "
+                f"supplier text, supplier_sort text, supplier_search text, "
+                f"category text, category_sort text, category_search text)"
+            )
+            self._copy(cursor, staging, rows)
+            cursor.execute(f"ANALYZE {staging}")
+
+            counts = {
+                "vendors": self._insert_names(cursor, staging, Vendor, "vendor"),
+                "suppliers": self._insert_names(cursor, staging, Supplier, "supplier"),
+                "categories": self._insert_names(cursor, staging, Category, "category"),
+            }
+            self._insert_links(cursor, staging, Vendor.suppliers.through,
+                               Supplier, "supplier_id", "supplier")
+            self._insert_links(cursor, staging, Vendor.categories.through,
+                               Category, "category_id", "category")
+
+            # DDL is transactional, so a failed load never leaves the staging table behind.
+            cursor.execute(f"DROP TABLE {staging}")
+        return counts
+
+
+LOADERS = ("row", "bulk", "copy")
+
+
+def get_loader(name="copy", using="default"):
+    """
+    Pick a loader backend. "copy" means the fastest raw path the database supports:
+    COPY + set-based inserts on Postgres, executemany() everywhere else.
+    """
+    if name == "row":
+        return RowLoader(using)
+    if name == "bulk":
+        return BulkCreateLoader(using)
+    if name == "copy":
+        if connections[using].vendor == "postgresql":
+            return PostgresCopyLoader(using)
+        return ExecutemanyLoader(using)
+    raise ValueError(f"Unknown loader {name!r}; expected one of {', '.join(LOADERS)}")
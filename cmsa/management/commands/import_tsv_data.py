@@ -1,8 +1,7 @@
 # cmsa/management/commands/import_tsv_data.py
 
 from django.core.management.base import BaseCommand
-from cmsa.models import Vendor, Supplier, Category
-import csv
+from cmsa.loaders import LOADERS, get_loader, read_tsv_rows
 
 
 class Command(BaseCommand):
@@ -10,33 +9,30 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("tsv_file", type=str, help="Path to the TSV file")
+        parser.add_argument(
+            "--loader",
+            choices=LOADERS,
+            default="copy",
+            help=(
+                "Load strategy: 'row' (get_or_create per row), 'bulk' (bulk_create) "
+                "or 'copy' (COPY on Postgres, executemany elsewhere). Default: copy."
+            ),
+        )
+        parser.add_argument(
+            "--database", default="default", help="Database alias to load into"
+        )
 
     def handle(self, *args, **kwargs):
         tsv_file_path = kwargs["tsv_file"]
+        loader = get_loader(kwargs["loader"], using=kwargs["database"])
 
         with open(tsv_file_path, "r", newline="") as file:
-            reader = csv.DictReader(file, delimiter="\t")
-
-            for row in reader:
-                vendor_name = row["Vendor"].strip()
-                supplier_names = [name.strip() for name in row["Supplier"].split(",")]
-                category_name = row[
-                    "Category"
-                ].strip()  # Since each row has only one category
-
-                # Get or create the vendor
-                vendor, created = Vendor.objects.get_or_create(name=vendor_name)
-
-                # Get or create each supplier and add to the vendor
-                for supplier_name in supplier_names:
-                    supplier, created = Supplier.objects.get_or_create(
-                        name=supplier_name
-                    )
-                    vendor.suppliers.add(supplier)
+            counts = loader.load(read_tsv_rows(file))
 
-                # Get or create the category and add to the vendor
-                category, created = Category.objects.get_or_create(name=category_name)
-                vendor.categories.add(category)
         self.stdout.write(
-            self.style.SUCCESS("Successfully imported data from the TSV file!")
+            self.style.SUCCESS(
+                "Successfully imported data from the TSV file! "
+                f"({loader.__class__.__name__}: {counts['vendors']} vendors, "
+                f"{counts['suppliers']} suppliers, {counts['categories']} categories created)"
+            )
         )
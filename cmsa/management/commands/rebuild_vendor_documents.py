@@ -0,0 +1,18 @@
+# cmsa/management/commands/rebuild_vendor_documents.py
+
+from django.core.management.base import BaseCommand
+from cmsa.documents import build_documents
+
+
+class Command(BaseCommand):
+    help = "Render and store the public/private JSON document of every vendor (or the given ids)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("vendor_ids", nargs="*", type=int, help="Only these vendors")
+        parser.add_argument(
+            "--database", default="default", help="Database alias to rebuild in"
+        )
+
+    def handle(self, *args, **kwargs):
+        written = build_documents(kwargs["vendor_ids"] or None, using=kwargs["database"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} vendor documents."))
@@ -0,0 +1,40 @@
+# cmsa/management/commands/refresh_catalogue.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from cmsa.catalogue import refresh, refresh_if_stale
+
+
+class Command(BaseCommand):
+    help = "Rebuild the flattened vendor x supplier x category catalogue used by search"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database", default="default", help="Database alias to refresh in"
+        )
+        parser.add_argument(
+            "--every",
+            type=float,
+            metavar="SECONDS",
+            help="Keep running, refreshing whenever the catalogue is stale, checking this often",
+        )
+
+    def handle(self, *args, **kwargs):
+        using = kwargs["database"]
+        if kwargs["every"] is None:
+            elapsed = refresh(using=using)
+            self.stdout.write(self.style.SUCCESS(f"Refreshed the catalogue in {elapsed:.2f}s."))
+            return
+
+        try:
+            while True:
+                close_old_connections()
+                elapsed = refresh_if_stale(using=using)
+                if elapsed is not None:
+                    self.stdout.write(f"Refreshed the catalogue in {elapsed:.2f}s.")
+                time.sleep(kwargs["every"])
+        except KeyboardInterrupt:
+            pass
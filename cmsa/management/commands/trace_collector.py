@@ -0,0 +1,83 @@
+# cmsa/management/commands/trace_collector.py
+
+import json
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+def summarize(request):
+    """One line per trace in an OTLP/JSON export: the root span, then time per span name."""
+    lines = []
+    spans = [
+        span
+        for resource in request.get("resourceSpans", ())
+        for scope in resource.get("scopeSpans", ())
+        for span in scope.get("spans", ())
+    ]
+    for root in (span for span in spans if not span.get("parentSpanId")):
+        by_name = defaultdict(lambda: [0, 0])
+        for span in spans:
+            if span["traceId"] == root["traceId"] and span is not root:
+                by_name[span["name"]][0] += 1
+                by_name[span["name"]][1] += _duration_ms(span)
+        parts = [f"{name} x{count} {ms:.1f}ms" for name, (count, ms) in sorted(by_name.items())]
+        lines.append(
+            f"{root['traceId']} {root['name']} {_duration_ms(root):.1f}ms"
+            + (" | " + ", ".join(parts) if parts else "")
+        )
+    return lines
+
+
+def _duration_ms(span):
+    return (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a stand-in OTLP/HTTP trace collector: accepts JSON POSTs on /v1/traces, "
+        "prints a summary per trace and optionally appends the raw exports to a file"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=4318)
+        parser.add_argument("--output", help="Append each export to this file (JSON lines)")
+
+    def handle(self, *args, **kwargs):
+        command = self
+        output = kwargs["output"]
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != "/v1/traces":
+                    self.send_error(404)
+                    return
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                try:
+                    request = json.loads(body)
+                except ValueError:
+                    self.send_error(400, "Expected OTLP/JSON")
+                    return
+                if output:
+                    with open(output, "a") as f:
+                        f.write(json.dumps(request, separators=(",", ":")) + "\n")
+                for line in summarize(request):
+                    command.stdout.write(line)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((kwargs["host"], kwargs["port"]), Handler)
+        self.stdout.write(f"Collecting traces on http://{kwargs['host']}:{kwargs['port']}/v1/traces")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
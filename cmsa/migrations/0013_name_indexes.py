@@ -0,0 +1,64 @@
+# Generated by Django 4.0.10 on 2026-10-19 17:09
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_categories(apps, schema_editor):
+    """
+    Category.name becomes unique: fold categories sharing a name into the oldest one,
+    moving their vendor links over, so the constraint can be created.
+    """
+    Category = apps.get_model('cmsa', 'Category')
+    Through = apps.get_model('cmsa', 'Vendor').categories.through
+    duplicates = (
+        Category.objects.values('name')
+        .annotate(keep=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for row in duplicates:
+        extra = list(
+            Category.objects.filter(name=row['name']).exclude(id=row['keep']).values_list('id', flat=True)
+        )
+        linked = set(Through.objects.filter(category_id=row['keep']).values_list('vendor_id', flat=True))
+        moved = set(Through.objects.filter(category_id__in=extra).values_list('vendor_id', flat=True))
+        Through.objects.bulk_create(
+            [Through(vendor_id=vendor_id, category_id=row['keep']) for vendor_id in moved - linked]
+        )
+        Through.objects.filter(category_id__in=extra).delete()
+        Category.objects.filter(id__in=extra).delete()
+
+
+class Migration(migrations.Migration):
+
+    # The merge commits on its own: Postgres refuses to ALTER a table with pending
+    # deferred-constraint checks from the deletes in the same transaction.
+    atomic = False
+
+    dependencies = [
+        ('cmsa', '0012_remove_contact_phone'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_categories, migrations.RunPython.noop, atomic=True),
+        migrations.AlterField(
+            model_name='category',
+            name='name',
+            field=models.CharField(max_length=200, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='contact',
+            name='email',
+            field=models.EmailField(blank=True, db_index=True, max_length=254, null=True),
+        ),
+        migrations.AlterField(
+            model_name='supplier',
+            name='name',
+            field=models.CharField(db_index=True, max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='vendor',
+            name='name',
+            field=models.CharField(db_index=True, max_length=200),
+        ),
+    ]
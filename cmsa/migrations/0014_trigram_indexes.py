@@ -0,0 +1,47 @@
+# cmsa/migrations/0014_trigram_indexes.py
+#
+# Trigram GIN indexes for the icontains lookups used by VendorViewSet search and the
+# admin search boxes. Django compiles `name__icontains` to UPPER("name"::text) LIKE
+# UPPER(%s) on Postgres, so the indexes are built on that exact expression.
+# Postgres only: SQLite has no pg_trgm and LIKE '%...%' never uses an index there.
+
+from django.db import migrations
+
+
+TRIGRAM_INDEXES = [
+    ("cmsa_vendor_name_trgm", "cmsa_vendor", "name"),
+    ("cmsa_supplier_name_trgm", "cmsa_supplier", "name"),
+    ("cmsa_category_name_trgm", "cmsa_category", "name"),
+    ("cmsa_contact_name_trgm", "cmsa_contact", "name"),
+    ("cmsa_contact_email_trgm", "cmsa_contact", "email"),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    # Not TrigramExtension(): its reverse queries pg_extension even on SQLite.
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for index, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{index}" ON "{table}" '
+            f'USING gin (UPPER("{column}"::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for index, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{index}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmsa', '0013_name_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.10 on 2026-10-19 17:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmsa', '0015_updated_at_and_tombstones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorDocument',
+            fields=[
+                ('vendor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document', serialize=False, to='cmsa.vendor')),
+                ('public', models.TextField()),
+                ('private', models.TextField()),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
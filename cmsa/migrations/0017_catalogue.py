@@ -0,0 +1,118 @@
+# cmsa/migrations/0017_catalogue.py
+#
+# The flattened vendor x supplier x category catalogue (see cmsa/catalogue.py). On
+# Postgres it is a materialized view with a unique row index (required by REFRESH ...
+# CONCURRENTLY) and trigram indexes on the normalized names; elsewhere it is a plain
+# table that cmsa.catalogue.refresh() repopulates.
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def _key(column):
+    return f"btrim(regexp_replace(lower(unaccent(COALESCE({column}, ''))), '\\s+', ' ', 'g'))"
+
+
+POSTGRES_VIEW = f"""
+CREATE MATERIALIZED VIEW cmsa_catalogue AS
+SELECT row_number() OVER (ORDER BY v.id, s.id, c.id) AS id,
+       v.id AS vendor_id, v.name::text AS vendor_name, {_key("v.name")} AS vendor_key,
+       COALESCE(s.id, 0) AS supplier_id, COALESCE(s.name, '')::text AS supplier_name,
+       {_key("s.name")} AS supplier_key,
+       COALESCE(c.id, 0) AS category_id, COALESCE(c.name, '')::text AS category_name,
+       {_key("c.name")} AS category_key
+FROM cmsa_vendor v
+LEFT JOIN cmsa_vendor_suppliers vs ON vs.vendor_id = v.id
+LEFT JOIN cmsa_supplier s ON s.id = vs.supplier_id
+LEFT JOIN cmsa_vendor_categories vc ON vc.vendor_id = v.id
+LEFT JOIN cmsa_category c ON c.id = vc.category_id
+"""
+
+POSTGRES_INDEXES = [
+    "CREATE UNIQUE INDEX cmsa_catalogue_row ON cmsa_catalogue (vendor_id, supplier_id, category_id)",
+    "CREATE INDEX cmsa_catalogue_supplier ON cmsa_catalogue (supplier_id)",
+    "CREATE INDEX cmsa_catalogue_category ON cmsa_catalogue (category_id)",
+    "CREATE INDEX cmsa_catalogue_vendor_trgm ON cmsa_catalogue USING gin (vendor_key gin_trgm_ops)",
+    "CREATE INDEX cmsa_catalogue_supplier_trgm ON cmsa_catalogue USING gin (supplier_key gin_trgm_ops)",
+    "CREATE INDEX cmsa_catalogue_category_trgm ON cmsa_catalogue USING gin (category_key gin_trgm_ops)",
+]
+
+TABLE = """
+CREATE TABLE cmsa_catalogue (
+    id integer PRIMARY KEY,
+    vendor_id bigint NOT NULL, vendor_name text NOT NULL, vendor_key text NOT NULL,
+    supplier_id bigint NOT NULL, supplier_name text NOT NULL, supplier_key text NOT NULL,
+    category_id bigint NOT NULL, category_name text NOT NULL, category_key text NOT NULL
+)
+"""
+
+TABLE_INDEXES = [
+    "CREATE UNIQUE INDEX cmsa_catalogue_row ON cmsa_catalogue (vendor_id, supplier_id, category_id)",
+    "CREATE INDEX cmsa_catalogue_supplier ON cmsa_catalogue (supplier_id)",
+    "CREATE INDEX cmsa_catalogue_category ON cmsa_catalogue (category_id)",
+]
+
+
+def create_catalogue(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        schema_editor.execute(POSTGRES_VIEW)
+        statements = POSTGRES_INDEXES
+    else:
+        schema_editor.execute(TABLE)
+        statements = TABLE_INDEXES
+    for statement in statements:
+        schema_editor.execute(statement)
+    # Stale until the first refresh: searches use the live joins meanwhile.
+    CatalogueState = apps.get_model("cmsa", "CatalogueState")
+    CatalogueState.objects.using(schema_editor.connection.alias).create(
+        pk=1, version=1, refreshed_version=0, stale_since=timezone.now()
+    )
+
+
+def drop_catalogue(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP MATERIALIZED VIEW IF EXISTS cmsa_catalogue")
+    else:
+        schema_editor.execute("DROP TABLE IF EXISTS cmsa_catalogue")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmsa', '0016_vendor_documents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogueEntry',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('vendor_id', models.BigIntegerField()),
+                ('vendor_name', models.TextField()),
+                ('vendor_key', models.TextField()),
+                ('supplier_id', models.BigIntegerField()),
+                ('supplier_name', models.TextField()),
+                ('supplier_key', models.TextField()),
+                ('category_id', models.BigIntegerField()),
+                ('category_name', models.TextField()),
+                ('category_key', models.TextField()),
+            ],
+            options={
+                'db_table': 'cmsa_catalogue',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='CatalogueState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+                ('refreshed_version', models.BigIntegerField(default=0)),
+                ('stale_since', models.DateTimeField(blank=True, null=True)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('refresh_seconds', models.FloatField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(create_catalogue, drop_catalogue),
+    ]
@@ -0,0 +1,127 @@
+# cmsa/migrations/0018_name_keys.py
+#
+# Normalized sort/search keys for vendor, supplier and category names (cmsa/text.py),
+# backfilled here. On Postgres, sort_key gets the "C" collation so ORDER BY compares
+# bytes exactly like SQLite, search_key gets a trigram index for substring search, and
+# the flattened catalogue is rebuilt to copy the stored keys instead of computing its
+# own with unaccent().
+
+from importlib import import_module
+
+from django.db import migrations, models
+from django.utils import timezone
+
+from cmsa.text import name_keys
+
+initial_catalogue = import_module("cmsa.migrations.0017_catalogue")
+
+TABLES = {"vendor": "cmsa_vendor", "supplier": "cmsa_supplier", "category": "cmsa_category"}
+
+CATALOGUE_VIEW = """
+CREATE MATERIALIZED VIEW cmsa_catalogue AS
+SELECT row_number() OVER (ORDER BY v.id, s.id, c.id) AS id,
+       v.id AS vendor_id, v.name::text AS vendor_name, v.search_key::text AS vendor_key,
+       COALESCE(s.id, 0) AS supplier_id, COALESCE(s.name, '')::text AS supplier_name,
+       COALESCE(s.search_key, '')::text AS supplier_key,
+       COALESCE(c.id, 0) AS category_id, COALESCE(c.name, '')::text AS category_name,
+       COALESCE(c.search_key, '')::text AS category_key
+FROM cmsa_vendor v
+LEFT JOIN cmsa_vendor_suppliers vs ON vs.vendor_id = v.id
+LEFT JOIN cmsa_supplier s ON s.id = vs.supplier_id
+LEFT JOIN cmsa_vendor_categories vc ON vc.vendor_id = v.id
+LEFT JOIN cmsa_category c ON c.id = vc.category_id
+"""
+
+
+def backfill_name_keys(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    for model_name in TABLES:
+        model = apps.get_model("cmsa", model_name)
+        rows = [
+            model(pk=pk, **name_keys(name))
+            for pk, name in model.objects.using(alias).values_list("pk", "name")
+        ]
+        model.objects.using(alias).bulk_update(rows, ["sort_key", "search_key"], batch_size=500)
+
+    CatalogueState = apps.get_model("cmsa", "CatalogueState")
+    CatalogueState.objects.using(alias).filter(pk=1).update(
+        version=models.F("version") + 1, stale_since=timezone.now()
+    )
+
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table in TABLES.values():
+        schema_editor.execute(
+            f'ALTER TABLE "{table}" ALTER COLUMN "sort_key" TYPE varchar(255) COLLATE "C"'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX "{table}_search_key_trgm" ON "{table}" USING gin ("search_key" gin_trgm_ops)'
+        )
+    schema_editor.execute("DROP MATERIALIZED VIEW cmsa_catalogue")
+    schema_editor.execute(CATALOGUE_VIEW)
+    for statement in initial_catalogue.POSTGRES_INDEXES:
+        schema_editor.execute(statement)
+
+
+def drop_postgres_key_objects(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP MATERIALIZED VIEW cmsa_catalogue")
+    schema_editor.execute(initial_catalogue.POSTGRES_VIEW)
+    for statement in initial_catalogue.POSTGRES_INDEXES:
+        schema_editor.execute(statement)
+    for table in TABLES.values():
+        schema_editor.execute(f'DROP INDEX "{table}_search_key_trgm"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmsa', '0017_catalogue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='search_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='sort_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='search_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='sort_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='search_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='sort_key',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_name_keys, drop_postgres_key_objects),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['sort_key', 'id'], name='cmsa_category_sort'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['sort_key', 'id'], name='cmsa_supplier_sort'),
+        ),
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(fields=['sort_key', 'id'], name='cmsa_vendor_sort'),
+        ),
+    ]
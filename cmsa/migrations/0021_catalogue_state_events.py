@@ -0,0 +1,25 @@
+# cmsa/migrations/0021_catalogue_state_events.py
+#
+# The catalogue's freshness is now read off ChangeEvent ids (see cmsa/catalogue.py)
+# instead of a version counter every write bumped. Existing rows start at event 0, so
+# the catalogue reads as stale until its next refresh.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cmsa", "0020_slow_queries"),
+    ]
+
+    operations = [
+        migrations.RemoveField(model_name="cataloguestate", name="version"),
+        migrations.RemoveField(model_name="cataloguestate", name="refreshed_version"),
+        migrations.RemoveField(model_name="cataloguestate", name="stale_since"),
+        migrations.AddField(
+            model_name="cataloguestate",
+            name="refreshed_event",
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,186 @@
+# cmsa/mixins.py
+
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .models import Tombstone
+from .serializers import parse_fields
+
+
+class SparseFieldsetMixin:
+    """
+    `?fields=id,name,suppliers.name` selects (nested) fields on list and retrieve.
+
+    The parsed selection reaches the serializers through the context; viewsets call
+    `wants()` to skip prefetches for relations nobody asked for.
+    """
+
+    @property
+    def requested_fields(self):
+        if not hasattr(self, "_requested_fields"):
+            request = getattr(self, "request", None)
+            raw = request.query_params.get("fields") if request is not None else None
+            self._requested_fields = parse_fields(raw) if raw else None
+        return self._requested_fields
+
+    def wants(self, *path):
+        """
+        Whether the response includes the field at `path`, e.g. wants("suppliers").
+        With a trailing set of names, whether any of them is selected below `path`.
+        """
+        selection = self.requested_fields
+        *path, last = path
+        for name in path:
+            if selection is None:
+                return True
+            if name not in selection:
+                return False
+            selection = selection[name]
+        if selection is None:
+            return True
+        names = last if isinstance(last, (set, frozenset, tuple, list)) else (last,)
+        return any(name in selection for name in names)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fields"] = self.requested_fields
+        return context
+
+
+class BatchRetrieveMixin:
+    """
+    `?ids=3,1,2` on list returns those objects, in that order, as a plain list.
+
+    One queryset (and so one prefetch pass) serves the whole batch; unknown ids are
+    left out. At most `max_batch_size` ids per request. Filters still apply, but the
+    batch skips the mixins after this one, so their parameters (`batch_conflicts`)
+    are rejected rather than silently ignored.
+    """
+
+    max_batch_size = 100
+    batch_conflicts = ("since",)
+
+    def get_batch_ids(self):
+        raw = self.request.query_params.get("ids")
+        if raw is None:
+            return None
+        try:
+            ids = list(dict.fromkeys(int(part) for part in raw.split(",") if part.strip()))
+        except ValueError:
+            raise ValidationError({"ids": "Expected comma-separated integer ids."})
+        if not ids:
+            raise ValidationError({"ids": "Expected at least one id."})
+        if len(ids) > self.max_batch_size:
+            raise ValidationError({"ids": f"At most {self.max_batch_size} ids per request."})
+        conflicts = [name for name in self.batch_conflicts if name in self.request.query_params]
+        if conflicts:
+            raise ValidationError({"ids": f"Can't be combined with {', '.join(conflicts)}."})
+        return ids
+
+    def list(self, request, *args, **kwargs):
+        ids = self.get_batch_ids()
+        if ids is None:
+            return super().list(request, *args, **kwargs)
+
+        found = {obj.pk: obj for obj in self.filter_queryset(self.get_queryset()).filter(pk__in=ids)}
+        objects = [found[pk] for pk in ids if pk in found]
+        return Response(self.get_serializer(objects, many=True).data)
+
+
+class DeltaSyncMixin:
+    """
+    Change feeds and conditional GETs for list/retrieve.
+
+    - `?since=<ISO 8601 timestamp>` on list returns only rows whose representation changed
+      after that instant, plus the ids deleted since then:
+          { "results": [...], "deleted": [ids], "synced_at": "<use as the next since>" }
+    - retrieve sends Last-Modified and answers If-Modified-Since with 304.
+
+    Viewsets override `filter_changed_since()` / `get_last_modified()` when their
+    representation nests related rows.
+
+    Delivery is at-least-once: `updated_at` is stamped when a row is saved, not when its
+    transaction commits, so synced_at lags the clock by `sync_overlap` and consecutive
+    feeds overlap. Clients must apply results idempotently (upsert by id).
+    """
+
+    # Longer than any transaction that saves catalogue rows is expected to stay open.
+    sync_overlap = timedelta(seconds=60)
+
+    def get_since(self):
+        raw = self.request.query_params.get("since")
+        if raw is None:
+            return None
+        since = parse_datetime(raw.replace(" ", "+"))  # an unencoded "+" arrives as a space
+        if since is None:
+            raise ValidationError({"since": "Expected an ISO 8601 timestamp."})
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since, timezone.utc)
+        return since
+
+    def filter_changed_since(self, queryset, since):
+        return queryset.filter(updated_at__gt=since)
+
+    def get_last_modified(self, obj):
+        return obj.updated_at
+
+    def list(self, request, *args, **kwargs):
+        since = self.get_since()
+        if since is None:
+            return super().list(request, *args, **kwargs)
+
+        # Taken before querying and moved back by the overlap, so rows saved by a transaction
+        # that was still open now (stamped earlier, committed later) show up next time.
+        synced_at = timezone.now() - self.sync_overlap
+        queryset = self.filter_changed_since(self.filter_queryset(self.get_queryset()), since)
+        deleted = Tombstone.objects.filter(
+            model=queryset.model._meta.model_name, deleted_at__gt=since
+        ).values_list("object_id", flat=True)
+
+        return Response(
+            {
+                "results": self.get_serializer(queryset, many=True).data,
+                "deleted": sorted(set(deleted)),
+                "synced_at": synced_at.isoformat(),
+            }
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        last_modified = int(self.get_last_modified(instance).timestamp())
+
+        if_modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+        if if_modified_since is not None and last_modified <= if_modified_since:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(self.get_serializer(instance).data)
+        response["Last-Modified"] = http_date(last_modified)
+        return response
+
+
+class ListExtrasMixin:
+    """
+    Adds top-level keys from `get_list_extras()` to list responses.
+
+    A plain list becomes {**extras, "results": [...]}; dict responses (paginated,
+    `?since=`) get the keys merged in. Without extras the response is unchanged.
+    """
+
+    def get_list_extras(self):
+        return {}
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        extras = self.get_list_extras()
+        if extras and response.status_code == 200:
+            if isinstance(response.data, dict):
+                response.data.update(extras)
+            else:
+                response.data = {**extras, "results": response.data}
+        return response
@@ -4,13 +4,121 @@ from cryptography.fernet import Fernet
 from django.conf import settings
 from django.db import models
 from django.db.models.signals import post_init
+from django.utils import timezone
+
+from core import tracing
+
+from .text import name_keys
+
+
+class TimestampedQuerySet(models.QuerySet):
+    """
+    Keeps `updated_at` current on set-based writes too.
+
+    auto_now only fires from Model.save() (and bulk_create()), so update() and
+    bulk_update() are taught to stamp the column as well.
+    """
+
+    touch_batch_size = 500
+
+    def update(self, **kwargs):
+        kwargs.setdefault("updated_at", timezone.now())
+        return super().update(**kwargs)
+
+    update.alters_data = True
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        fields = list(fields)
+        if "updated_at" not in fields:
+            fields.append("updated_at")
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+    bulk_update.alters_data = True
+
+    def touch(self, pks=None):
+        """Mark rows as modified (e.g. after an M2M change), batched to stay under IN limits."""
+        if pks is None:
+            return self.update()
+        pks = list(pks)
+        touched = 0
+        for i in range(0, len(pks), self.touch_batch_size):
+            touched += self.filter(pk__in=pks[i:i + self.touch_batch_size]).update()
+        return touched
+
+    touch.alters_data = True
+
+
+NAME_KEY_FIELDS = ("sort_key", "search_key")
+
+
+class NamedQuerySet(TimestampedQuerySet):
+    """
+    Keeps the derived `sort_key`/`search_key` columns in step with `name` on the
+    set-based writes that bypass Model.save().
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.set_name_keys()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def update(self, **kwargs):
+        if isinstance(kwargs.get("name"), str):
+            kwargs.update(name_keys(kwargs["name"]))
+        return super().update(**kwargs)
+
+    update.alters_data = True
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs, fields = list(objs), list(fields)
+        if "name" in fields:
+            for obj in objs:
+                obj.set_name_keys()
+            fields.extend(field for field in NAME_KEY_FIELDS if field not in fields)
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+    bulk_update.alters_data = True
+
+
+class NamedModel(models.Model):
+    """
+    A model whose `name` is displayed as entered but sorted and searched through
+    normalized keys (cmsa/text.py): case- and accent-insensitive, mojibake repaired,
+    and ordered the same on Postgres and SQLite.
+    """
+
+    sort_key = models.CharField(max_length=255, default="", editable=False)
+    search_key = models.CharField(max_length=255, default="", editable=False, db_index=True)
+
+    class Meta:
+        abstract = True
+        indexes = [models.Index(fields=["sort_key", "id"], name="%(app_label)s_%(class)s_sort")]
+
+    def set_name_keys(self):
+        for field, value in name_keys(self.name).items():
+            setattr(self, field, value)
+
+    def save(self, *args, **kwargs):
+        self.set_name_keys()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, *NAME_KEY_FIELDS}
+        super().save(*args, **kwargs)
 
 
 class Contact(models.Model):
     name = models.CharField(max_length=200)
-    email = models.EmailField(null=True, blank=True)
+    email = models.EmailField(null=True, blank=True, db_index=True)
     role = models.CharField(max_length=400, null=True, blank=True)
     primary_contact = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = TimestampedQuerySet.as_manager()
 
     def save(self, *args, **kwargs):
         # Ensure only one primary contact per supplier
@@ -24,8 +132,8 @@ class Contact(models.Model):
         return self.name
 
 
-class Supplier(models.Model):
-    name = models.CharField(max_length=200)
+class Supplier(NamedModel):
+    name = models.CharField(max_length=200, db_index=True)
     contacts = models.ManyToManyField(Contact, blank=True)
     contact_name = models.CharField(max_length=200, null=True, blank=True)
     contact_email = models.CharField(max_length=200, null=True, blank=True)
@@ -41,8 +149,11 @@ class Supplier(models.Model):
     accounting_contact = models.CharField(max_length=200, null=True, blank=True)
     account_number = models.CharField(max_length=200, null=True, blank=True)
     account_active = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     __original_website_password = None
 
+    objects = NamedQuerySet.as_manager()
+
     def __init__(self, *args, **kwargs):
         super(Supplier, self).__init__(*args, **kwargs)
         self.__original_website_password = self.website_password
@@ -64,25 +175,151 @@ class Supplier(models.Model):
         return encrypted_text.decode()
 
     def decrypt_password(self):
-        cipher_suite = Fernet(settings.PASSWORD_ENCRYPTION_KEY)
-        decrypted_text = cipher_suite.decrypt(self.website_password.encode())
+        with tracing.span("fernet.decrypt"):
+            cipher_suite = Fernet(settings.PASSWORD_ENCRYPTION_KEY)
+            decrypted_text = cipher_suite.decrypt(self.website_password.encode())
         return decrypted_text.decode()
 
     def __str__(self):
         return self.name
 
 
-class Category(models.Model):
-    name = models.CharField(max_length=200)
+class Category(NamedModel):
+    name = models.CharField(max_length=200, unique=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = NamedQuerySet.as_manager()
 
     def __str__(self):
         return self.name
 
 
-class Vendor(models.Model):
-    name = models.CharField(max_length=200)
+class Vendor(NamedModel):
+    name = models.CharField(max_length=200, db_index=True)
     suppliers = models.ManyToManyField(Supplier, related_name="vendors")
     categories = models.ManyToManyField(Category, related_name="vendors")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = NamedQuerySet.as_manager()
 
     def __str__(self):
         return self.name
+
+
+class Tombstone(models.Model):
+    """Records deletions so `?since=` change feeds can report them."""
+
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["model", "deleted_at"])]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted at {self.deleted_at:%Y-%m-%d %H:%M:%S}"
+
+
+class VendorDocument(models.Model):
+    """
+    A vendor's rendered API representations, rebuilt when anything they embed changes
+    (see cmsa/documents.py). `private` keeps website passwords encrypted.
+    """
+
+    vendor = models.OneToOneField(
+        Vendor, primary_key=True, on_delete=models.CASCADE, related_name="document"
+    )
+    public = models.TextField()
+    private = models.TextField()
+    built_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Document for vendor {self.vendor_id}"
+
+
+class CatalogueEntry(models.Model):
+    """
+    One vendor x supplier x category row of the flattened catalogue (cmsa/catalogue.py):
+    a materialized view on Postgres, a plain table refreshed in place elsewhere.
+    `*_key` columns hold the normalized (lowercase, unaccented) names; a vendor
+    without suppliers or categories gets 0 and empty names in those columns.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    vendor_id = models.BigIntegerField()
+    vendor_name = models.TextField()
+    vendor_key = models.TextField()
+    supplier_id = models.BigIntegerField()
+    supplier_name = models.TextField()
+    supplier_key = models.TextField()
+    category_id = models.BigIntegerField()
+    category_name = models.TextField()
+    category_key = models.TextField()
+
+    class Meta:
+        managed = False
+        db_table = "cmsa_catalogue"
+
+    def __str__(self):
+        return f"{self.vendor_name} / {self.supplier_name} / {self.category_name}"
+
+
+class CatalogueState(models.Model):
+    """
+    Single row (pk=1) recording the last refresh of the flattened catalogue: the
+    newest ChangeEvent id it covers. Catalogue events past it mean it is stale.
+    """
+
+    refreshed_event = models.BigIntegerField(default=0)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+    refresh_seconds = models.FloatField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Catalogue as of event {self.refreshed_event}"
+
+
+class ChangeEvent(models.Model):
+    """
+    Outbox of catalogue changes for the /routes/events/ stream (cmsa/events.py),
+    written in the same transaction as the change. `object_id` is null when a bulk
+    write changed an unknown set of rows of `model`.
+    """
+
+    CREATED, UPDATED, DELETED, CHANGED = "created", "updated", "deleted", "changed"
+    ACTIONS = [(action, action) for action in (CREATED, UPDATED, DELETED, CHANGED)]
+
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField(null=True, blank=True)
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.model} {self.object_id or '*'} {self.action}"
+
+
+class SlowQuery(models.Model):
+    """
+    Queries slower than SLOW_QUERY_MS, aggregated per fingerprint (core/sql.py): the
+    statement with its literals replaced by "?", and the EXPLAIN of its first occurrence.
+    """
+
+    fingerprint = models.CharField(max_length=16, unique=True)
+    sql = models.TextField()
+    calls = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    last_view = models.CharField(max_length=200, blank=True)
+    explain = models.TextField(blank=True)
+    first_seen = models.DateTimeField(default=timezone.now)
+    last_seen = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "slow queries"
+        indexes = [models.Index(fields=["-total_ms"], name="cmsa_slowquery_total")]
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.calls if self.calls else 0
+
+    def __str__(self):
+        return f"{self.fingerprint} ({self.calls} calls, {self.total_ms:.0f} ms)"
@@ -1,6 +1,10 @@
 # cmsa/pagination.py
 
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+# Case- and accent-insensitive name order, identical on Postgres and SQLite and read off
+# the (sort_key, id) index of each named model.
+NAME_ORDERING = ("sort_key", "id")
 
 
 class OptionalPageNumberPagination(PageNumberPagination):
@@ -21,4 +25,18 @@ class OptionalPageNumberPagination(PageNumberPagination):
         # Only paginate if the client explicitly asked for it.
         if "page" not in request.query_params and self.page_size_query_param not in request.query_params:
             return None
-        return super().paginate_queryset(queryset, request, view=view)
\ No newline at end of file
+        return super().paginate_queryset(queryset, request, view=view)
+
+
+class NameCursorPagination(CursorPagination):
+    """
+    Keyset pagination by (sort_key, id) for long related lists.
+
+    Each page is a `WHERE sort_key > <cursor>` range read off the sort index, so the last
+    page of a distributor carrying hundreds of brands costs the same as the first.
+    """
+
+    ordering = NAME_ORDERING
+    page_size = 25
+    page_size_query_param = "page_size"
+    max_page_size = 100
@@ -1,20 +1,121 @@
 # cmsa/serializers.py
 
 from rest_framework import serializers
+
+from core import tracing
+
 from .models import Vendor, Supplier, Category, Contact
 
-class ContactSerializer(serializers.ModelSerializer):
+
+def parse_fields(raw):
+    """
+    Parse a `?fields=` value into a selection tree.
+
+    "id,name,suppliers.name,categories" -> {"id": None, "name": None,
+    "suppliers": {"name": None}, "categories": None}; None means "everything below".
+    A value naming no fields at all (e.g. ",") selects everything, i.e. returns None.
+    """
+    tree = {}
+    for path in filter(None, (part.strip() for part in raw.split(","))):
+        node = tree
+        *parents, leaf = path.split(".")
+        for name in parents:
+            if name in node and node[name] is None:
+                break  # already selected in full
+            node = node.setdefault(name, {})
+        else:
+            node[leaf] = None
+    return tree or None
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Drops fields not named in the selection tree passed as context["fields"].
+
+    Nested serializers find their own branch of the tree by walking up their parents,
+    so "suppliers.name" prunes SupplierSerializer inside VendorSerializer too. Pruned
+    SerializerMethodFields are never called.
+    """
+
+    def _field_path(self):
+        path, node = [], self
+        while node.parent is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        return reversed(path)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = self.context.get("fields")
+        for name in self._field_path():
+            if selection is None:
+                break
+            selection = selection.get(name)
+        if not selection:
+            return fields
+
+        unknown = set(selection) - set(fields)
+        if unknown:
+            raise serializers.ValidationError(
+                {"fields": f"Unknown field(s): {', '.join(sorted(unknown))}"}
+            )
+        return {name: field for name, field in fields.items() if name in selection}
+
+
+class TracedListSerializer(serializers.ListSerializer):
+    """Renders a top-level list inside one tracing span (nested lists add none)."""
+
+    @property
+    def data(self):
+        if self.parent is not None:
+            return super().data
+        with tracing.span("serializer.render", {"serializer": type(self.child).__name__, "many": True}):
+            return super().data
+
+
+class TracedSerializerMixin:
+    """A tracing span per top-level object rendered; lists use TracedListSerializer."""
+
+    @property
+    def data(self):
+        if self.parent is not None:
+            return super().data
+        with tracing.span("serializer.render", {"serializer": type(self).__name__}):
+            return super().data
+
+
+class ContactSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Contact
         fields = ["id", "name", "email", "role"]
 
 
+class ContactRosterSerializer(serializers.ModelSerializer):
+    """One entry of a supplier's full contact roster (PUT /suppliers/{id}/contacts/)."""
+
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = Contact
+        fields = ["id", "name", "email", "role", "primary_contact"]
+
+
 class SupplierContactsMixin:
     """
     Makes contact-derived fields O(1) DB queries per Supplier object.
     If contacts were prefetched, this becomes 0 DB queries.
     """
 
+    # Fields that read contacts; the views only prefetch contacts when one is selected.
+    contact_fields = (
+        "primary_contact_name",
+        "primary_contact_email",
+        "accounting_contact",
+        "accounting_email",
+        "additional_contacts",
+    )
+
     def _contacts_list(self, obj) -> list[Contact]:
         cached = getattr(obj, "_contacts_list_cache", None)
         if cached is not None:
@@ -47,7 +148,9 @@ class SupplierContactsMixin:
         return obj._contact_parts_cache
 
 
-class SupplierSerializer(SupplierContactsMixin, serializers.ModelSerializer):
+class SupplierSerializer(
+    TracedSerializerMixin, SparseFieldsSerializerMixin, SupplierContactsMixin, serializers.ModelSerializer
+):
     primary_contact_name = serializers.SerializerMethodField()
     primary_contact_email = serializers.SerializerMethodField()
     accounting_email = serializers.SerializerMethodField()
@@ -57,6 +160,7 @@ class SupplierSerializer(SupplierContactsMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Supplier
+        list_serializer_class = TracedListSerializer
         fields = [
             "id",
             "name",
@@ -98,15 +202,20 @@ class SupplierSerializer(SupplierContactsMixin, serializers.ModelSerializer):
         return ContactSerializer(additional, many=True).data
 
     def get_website_password(self, obj):
+        if self.context.get("encrypted_passwords"):
+            return obj.website_password or None  # stored documents decrypt on read
         return obj.decrypt_password() if obj.website_password else None
 
 
-class SupplierPublicSerializer(SupplierContactsMixin, serializers.ModelSerializer):
+class SupplierPublicSerializer(
+    TracedSerializerMixin, SparseFieldsSerializerMixin, SupplierContactsMixin, serializers.ModelSerializer
+):
     primary_contact_name = serializers.SerializerMethodField()
     primary_contact_email = serializers.SerializerMethodField()
 
     class Meta:
         model = Supplier
+        list_serializer_class = TracedListSerializer
         fields = ["id", "name", "primary_contact_name", "primary_contact_email", "website", "phone"]
 
     def get_primary_contact_name(self, obj):
@@ -118,25 +227,58 @@ class SupplierPublicSerializer(SupplierContactsMixin, serializers.ModelSerialize
         return primary.email if primary else None
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TracedSerializerMixin, SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
+        list_serializer_class = TracedListSerializer
         fields = ["id", "name"]
 
 
-class VendorSerializer(serializers.ModelSerializer):
+class VendorSerializer(TracedSerializerMixin, SparseFieldsSerializerMixin, serializers.ModelSerializer):
     suppliers = SupplierSerializer(many=True, read_only=True)
     categories = CategorySerializer(many=True, read_only=True)
 
     class Meta:
         model = Vendor
+        list_serializer_class = TracedListSerializer
         fields = ["id", "name", "suppliers", "categories"]
 
 
-class VendorPublicSerializer(serializers.ModelSerializer):
+class VendorPublicSerializer(TracedSerializerMixin, SparseFieldsSerializerMixin, serializers.ModelSerializer):
     suppliers = SupplierPublicSerializer(many=True, read_only=True)
     categories = CategorySerializer(many=True, read_only=True)
 
     class Meta:
         model = Vendor
-        fields = ["id", "name", "suppliers", "categories"]
\ No newline at end of file
+        list_serializer_class = TracedListSerializer
+        fields = ["id", "name", "suppliers", "categories"]
+
+class IdOrNameField(serializers.Field):
+    """A related object given by id (JSON number) or by exact name (JSON string)."""
+
+    default_error_messages = {"invalid": "Expected an id or a name."}
+
+    def to_internal_value(self, data):
+        if isinstance(data, int) and not isinstance(data, bool):
+            return data
+        if isinstance(data, str) and data.strip():
+            return data.strip()
+        self.fail("invalid")
+
+    def to_representation(self, value):
+        return value
+
+
+class VendorBulkCreateSerializer(serializers.Serializer):
+    """One vendor in a bulk create; suppliers/categories are ids or names."""
+
+    name = serializers.CharField(max_length=200)
+    suppliers = serializers.ListField(child=IdOrNameField(), required=False)
+    categories = serializers.ListField(child=IdOrNameField(), required=False)
+
+
+class VendorBulkUpdateSerializer(VendorBulkCreateSerializer):
+    """One vendor in a bulk update; relations that are given replace the current ones."""
+
+    id = serializers.IntegerField()
+    name = serializers.CharField(max_length=200, required=False)
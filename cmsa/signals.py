@@ -0,0 +1,233 @@
+# cmsa/signals.py
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+
+from . import autocomplete, documents, events, facets, fuzzy
+from .models import ChangeEvent, Vendor, Supplier, Category, Contact, Tombstone
+
+SYNCED_MODELS = (Vendor, Supplier, Category, Contact)
+
+# Sent after set-based writes that bypass per-object model signals (bulk loaders,
+# bulk API writes). `sender` is the model, `pks` the affected ids (None for "many/unknown")
+# and `using` the database alias.
+catalogue_changed = Signal()
+
+
+def _touch_owner(instance, pk_set, reverse, owner):
+    """
+    An M2M change alters the representation of the owning side only
+    (Vendor for suppliers/categories, Supplier for contacts).
+    """
+    if not reverse:
+        owner.objects.touch([instance.pk])
+    elif pk_set:
+        owner.objects.touch(pk_set)
+
+
+@receiver(m2m_changed, sender=Vendor.suppliers.through)
+@receiver(m2m_changed, sender=Vendor.categories.through)
+def touch_vendor_on_relation_change(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        # pk_set is None for clear(); capture the vendors before the links disappear.
+        instance._cleared_vendor_pks = list(instance.vendors.values_list("pk", flat=True))
+    elif action == "post_clear" and reverse:
+        Vendor.objects.touch(getattr(instance, "_cleared_vendor_pks", []))
+    elif action in ("post_add", "post_remove", "post_clear"):
+        _touch_owner(instance, pk_set, reverse, Vendor)
+
+
+@receiver(m2m_changed, sender=Supplier.contacts.through)
+def touch_supplier_on_contacts_change(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        instance._cleared_supplier_pks = list(instance.supplier_set.values_list("pk", flat=True))
+    elif action == "post_clear" and reverse:
+        Supplier.objects.touch(getattr(instance, "_cleared_supplier_pks", []))
+    elif action in ("post_add", "post_remove", "post_clear"):
+        _touch_owner(instance, pk_set, reverse, Supplier)
+
+
+@receiver(pre_delete, sender=Supplier)
+@receiver(pre_delete, sender=Category)
+def touch_vendors_on_related_delete(sender, instance, **kwargs):
+    # Cascading deletes of through rows don't send m2m_changed.
+    instance.vendors.all().touch()
+
+
+@receiver(pre_delete, sender=Contact)
+def touch_suppliers_on_contact_delete(sender, instance, **kwargs):
+    Supplier.objects.filter(contacts=instance).touch()
+
+
+def record_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(model=sender._meta.model_name, object_id=instance.pk)
+
+
+for model in SYNCED_MODELS:
+    post_delete.connect(record_tombstone, sender=model, dispatch_uid=f"tombstone-{model._meta.model_name}")
+
+
+# In-process name indexes (autocomplete prefixes, fuzzy-search vocabulary).
+NAME_INDEXES = (autocomplete, fuzzy)
+
+
+@receiver(post_save, sender=Vendor)
+@receiver(post_save, sender=Supplier)
+@receiver(post_save, sender=Category)
+def update_name_indexes_on_save(sender, instance, **kwargs):
+    for index in NAME_INDEXES:
+        transaction.on_commit(
+            partial(index.update, sender._meta.model_name, instance.pk, instance.name)
+        )
+
+
+@receiver(post_delete, sender=Vendor)
+@receiver(post_delete, sender=Supplier)
+@receiver(post_delete, sender=Category)
+def update_name_indexes_on_delete(sender, instance, **kwargs):
+    for index in NAME_INDEXES:
+        transaction.on_commit(partial(index.update, sender._meta.model_name, instance.pk))
+
+
+@receiver(catalogue_changed)
+def reset_name_indexes_on_bulk_change(sender, **kwargs):
+    if sender in (Vendor, Supplier, Category):
+        for index in NAME_INDEXES:
+            transaction.on_commit(index.reset)
+
+
+@receiver(m2m_changed, sender=Vendor.suppliers.through)
+@receiver(m2m_changed, sender=Vendor.categories.through)
+@receiver(post_save, sender=Supplier)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Vendor)
+@receiver(post_delete, sender=Supplier)
+@receiver(post_delete, sender=Category)
+@receiver(catalogue_changed)
+def reset_facets(sender, **kwargs):
+    # Membership changes are rare next to reads; rebuilding beats patching bitmaps.
+    if kwargs.get("action", "post_").startswith("post_"):
+        transaction.on_commit(facets.reset)
+
+
+# Vendor documents embed suppliers, their contacts and categories: rebuild just the
+# vendors a change reaches, after commit.
+
+
+def _vendors_of_suppliers(supplier_pks):
+    return Vendor.objects.filter(suppliers__in=supplier_pks).values_list("pk", flat=True).distinct()
+
+
+@receiver(post_save, sender=Vendor)
+def rebuild_document_on_vendor_save(sender, instance, **kwargs):
+    documents.rebuild_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=Supplier)
+@receiver(post_save, sender=Category)
+def rebuild_documents_on_related_save(sender, instance, **kwargs):
+    documents.rebuild_on_commit(instance.vendors.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Contact)
+def rebuild_documents_on_contact_save(sender, instance, **kwargs):
+    documents.rebuild_on_commit(_vendors_of_suppliers(instance.supplier_set.all()))
+
+
+@receiver(pre_delete, sender=Supplier)
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Contact)
+def rebuild_documents_on_related_delete(sender, instance, **kwargs):
+    # Collected before the cascade removes the links.
+    if sender is Contact:
+        vendors = _vendors_of_suppliers(instance.supplier_set.all())
+    else:
+        vendors = instance.vendors.values_list("pk", flat=True)
+    documents.rebuild_on_commit(vendors)
+
+
+@receiver(m2m_changed, sender=Vendor.suppliers.through)
+@receiver(m2m_changed, sender=Vendor.categories.through)
+def rebuild_documents_on_vendor_links(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        documents.rebuild_on_commit([instance.pk])
+    elif action == "post_clear":
+        documents.rebuild_on_commit(getattr(instance, "_cleared_vendor_pks", []))
+    else:
+        documents.rebuild_on_commit(pk_set)
+
+
+@receiver(m2m_changed, sender=Supplier.contacts.through)
+def rebuild_documents_on_contact_links(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        documents.rebuild_on_commit(instance.vendors.values_list("pk", flat=True))
+    elif action == "post_clear":
+        documents.rebuild_on_commit(
+            _vendors_of_suppliers(getattr(instance, "_cleared_supplier_pks", []))
+        )
+    else:
+        documents.rebuild_on_commit(_vendors_of_suppliers(pk_set))
+
+
+@receiver(catalogue_changed)
+def rebuild_documents_on_bulk_change(sender, pks=None, using="default", **kwargs):
+    # Writers that relink vendors send for Vendor (loaders, bulk vendor API); a roster
+    # replace sends the supplier it changed.
+    if sender is Vendor:
+        documents.rebuild_on_commit(pks, using=using)
+    elif sender is Supplier and pks:
+        documents.rebuild_on_commit(_vendors_of_suppliers(pks).using(using), using=using)
+
+
+# Change events for /routes/events/, recorded in the writing transaction. They also
+# tell the flattened catalogue it is stale (cmsa/catalogue.py).
+
+
+@receiver(post_save, sender=Vendor)
+@receiver(post_save, sender=Supplier)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Contact)
+def record_save_event(sender, instance, created, using="default", **kwargs):
+    action = ChangeEvent.CREATED if created else ChangeEvent.UPDATED
+    events.record(sender, action, [instance.pk], using=using)
+
+
+@receiver(post_delete, sender=Vendor)
+@receiver(post_delete, sender=Supplier)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Contact)
+def record_delete_event(sender, instance, using="default", **kwargs):
+    events.record(sender, ChangeEvent.DELETED, [instance.pk], using=using)
+
+
+@receiver(m2m_changed, sender=Vendor.suppliers.through)
+@receiver(m2m_changed, sender=Vendor.categories.through)
+@receiver(m2m_changed, sender=Supplier.contacts.through)
+def record_link_event(sender, instance, action, reverse, pk_set, using="default", **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    owner = Supplier if sender is Supplier.contacts.through else Vendor
+    if not reverse:
+        pks = [instance.pk]
+    elif action == "post_clear":
+        cleared = "_cleared_supplier_pks" if owner is Supplier else "_cleared_vendor_pks"
+        pks = getattr(instance, cleared, [])
+    else:
+        pks = pk_set
+    if pks:
+        events.record(owner, ChangeEvent.UPDATED, sorted(pks), using=using)
+
+
+@receiver(catalogue_changed)
+def record_bulk_event(sender, pks=None, using="default", **kwargs):
+    if pks is None:
+        events.record(sender, ChangeEvent.CHANGED, using=using)
+    elif pks:
+        events.record(sender, ChangeEvent.UPDATED, pks, using=using)
@@ -0,0 +1,49 @@
+# cmsa/tests/conftest.py
+
+import pytest
+from rest_framework.test import APIClient
+
+from cmsa import facets
+from cmsa.models import Vendor, Supplier, Category, Contact
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def fresh_facet_index():
+    facets.reset()
+    yield
+    facets.reset()
+
+
+@pytest.fixture
+def brands(db):
+    """
+    Fender and Gibson make guitars, Pearl drums. Coast Music (active account) carries
+    Fender and Pearl; Yorkville (one contact) carries Fender.
+    """
+    guitars = Category.objects.create(name="Guitars")
+    drums = Category.objects.create(name="Drums")
+    coast = Supplier.objects.create(name="Coast Music", account_active=True)
+    yorkville = Supplier.objects.create(name="Yorkville")
+    yorkville.contacts.add(Contact.objects.create(name="Jane"))
+    fender = Vendor.objects.create(name="Fender")
+    gibson = Vendor.objects.create(name="Gibson")
+    pearl = Vendor.objects.create(name="Pearl")
+    fender.categories.add(guitars)
+    gibson.categories.add(guitars)
+    pearl.categories.add(drums)
+    fender.suppliers.add(coast, yorkville)
+    pearl.suppliers.add(coast)
+    return {
+        "guitars": guitars,
+        "drums": drums,
+        "coast": coast,
+        "yorkville": yorkville,
+        "fender": fender,
+        "gibson": gibson,
+        "pearl": pearl,
+    }
@@ -0,0 +1,123 @@
+# cmsa/tests/test_autocomplete.py
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cmsa import autocomplete
+from cmsa.autocomplete import PrefixIndex
+from cmsa.loaders import ImportRow, get_loader
+from cmsa.models import Vendor, Supplier, Category
+
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    autocomplete.reset()
+    yield
+    autocomplete.reset()
+
+
+def names(results):
+    return [r["name"] for r in results]
+
+
+def test_prefix_index_matches_name_and_word_starts():
+    index = PrefixIndex.build([
+        ("supplier", 1, "Coast Music"),
+        ("vendor", 2, "Music Man"),
+        ("vendor", 3, "Mustang Parts"),
+        ("category", 4, "Guitars, Basses & Accessories"),
+    ])
+
+    # Start-of-name matches rank ahead of mid-name word matches.
+    assert names(index.search("mus")) == ["Music Man", "Mustang Parts", "Coast Music"]
+    assert names(index.search("bass")) == ["Guitars, Basses & Accessories"]
+    assert names(index.search("mus", kinds={"supplier"})) == ["Coast Music"]
+    assert names(index.search("mus", limit=1)) == ["Music Man"]
+    assert index.search("") == []
+
+
+def test_prefix_index_is_case_and_accent_insensitive():
+    index = PrefixIndex.build([("vendor", 1, "Larrivée"), ("vendor", 2, "Höfner")])
+    assert names(index.search("LARRIVE")) == ["Larrivée"]
+    assert names(index.search("hof")) == ["Höfner"]
+
+
+def test_prefix_index_add_rename_and_remove():
+    index = PrefixIndex()
+    index.add("vendor", 1, "Fender")
+    index.add("vendor", 1, "Fender Musical")  # rename replaces the old keys
+    assert names(index.search("fen")) == ["Fender Musical"]
+    assert len(index) == 1
+
+    index.remove("vendor", 1)
+    assert index.search("fen") == []
+    assert len(index) == 0
+
+
+def test_prefix_index_kind_filter_sees_past_other_kinds():
+    index = PrefixIndex.build(
+        [("vendor", i, f"Mus Vendor {i:03d}") for i in range(200)] + [("supplier", 1, "Musicworks")]
+    )
+    assert names(index.search("mus", kinds={"supplier"})) == ["Musicworks"]
+
+
+def test_prefix_index_start_matches_beat_earlier_sorting_word_matches():
+    index = PrefixIndex.build(
+        [("vendor", i, f"Alpha Ma{i:03d}") for i in range(200)] + [("vendor", 999, "Mazda Audio")]
+    )
+    assert names(index.search("ma", limit=3)) == ["Mazda Audio", "Alpha Ma000", "Alpha Ma001"]
+
+
+@pytest.mark.django_db
+def test_endpoint_serves_from_memory_without_queries(api_client):
+    Vendor.objects.create(name="Dunlop")
+    Supplier.objects.create(name="Coast Music")
+    Category.objects.create(name="Drums")
+    api_client.get("/routes/autocomplete/", {"q": "d"})  # warm the worker's index
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.get("/routes/autocomplete/", {"q": "d"})
+
+    assert resp.status_code == 200
+    assert len(ctx) == 0
+    assert resp.data["query"] == "d"
+    assert {(r["type"], r["name"]) for r in resp.data["results"]} == {
+        ("vendor", "Dunlop"),
+        ("category", "Drums"),
+    }
+
+
+@pytest.mark.django_db
+def test_endpoint_filters_types_and_validates(api_client):
+    Vendor.objects.create(name="Coast")
+    Supplier.objects.create(name="Coast Music")
+
+    resp = api_client.get("/routes/autocomplete/", {"q": "coa", "types": "supplier"})
+    assert names(resp.data["results"]) == ["Coast Music"]
+
+    assert api_client.get("/routes/autocomplete/", {"q": "c", "types": "brand"}).status_code == 400
+    assert api_client.get("/routes/autocomplete/", {"q": "c", "limit": "x"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_index_follows_saves_and_deletes_after_commit(api_client, django_capture_on_commit_callbacks):
+    autocomplete.get_index()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        vendor = Vendor.objects.create(name="Zildjian")
+    assert names(api_client.get("/routes/autocomplete/", {"q": "zil"}).data["results"]) == ["Zildjian"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        vendor.delete()
+    assert api_client.get("/routes/autocomplete/", {"q": "zil"}).data["results"] == []
+
+
+@pytest.mark.django_db
+def test_bulk_load_resets_index(django_capture_on_commit_callbacks):
+    autocomplete.get_index()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        get_loader("copy").load([ImportRow("Paiste", ("Coast Music",), ("Drums",))])
+
+    assert names(autocomplete.get_index().search("pai")) == ["Paiste"]
@@ -0,0 +1,59 @@
+# cmsa/tests/test_batch.py
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cmsa.models import Vendor, Supplier
+
+
+def ids_param(*objs):
+    return {"ids": ",".join(str(obj.pk) for obj in objs)}
+
+
+def test_vendor_batch_keeps_requested_order_in_constant_queries(api_client, brands):
+    fender, gibson, pearl = brands["fender"], brands["gibson"], brands["pearl"]
+
+    with CaptureQueriesContext(connection) as small:
+        resp = api_client.get("/routes/vendors/", ids_param(pearl, fender))
+    assert [v["name"] for v in resp.data] == ["Pearl", "Fender"]
+
+    more = [Vendor.objects.create(name=f"Brand {i}") for i in range(8)]
+    for vendor in more:
+        vendor.suppliers.add(Supplier.objects.create(name=f"Supplier for {vendor.name}"))
+    with CaptureQueriesContext(connection) as large:
+        resp = api_client.get("/routes/vendors/", ids_param(*more, gibson, pearl))
+    assert [v["name"] for v in resp.data] == [v.name for v in more] + ["Gibson", "Pearl"]
+    assert len(large) == len(small) == 4  # vendors, suppliers, contacts, categories
+
+
+def test_batch_skips_unknown_and_duplicate_ids(api_client, brands):
+    resp = api_client.get("/routes/suppliers/", {"ids": f"999,{brands['coast'].pk},{brands['coast'].pk}"})
+    assert [s["name"] for s in resp.data] == ["Coast Music"]
+
+    resp = api_client.get("/routes/categories/", ids_param(brands["drums"], brands["guitars"]))
+    assert [c["name"] for c in resp.data] == ["Drums", "Guitars"]
+
+
+@pytest.mark.django_db
+def test_batch_is_validated_and_capped(api_client):
+    assert api_client.get("/routes/vendors/", {"ids": "1,x"}).status_code == 400
+    assert api_client.get("/routes/vendors/", {"ids": ","}).status_code == 400
+    too_many = ",".join(str(i) for i in range(1, 102))
+    resp = api_client.get("/routes/vendors/", {"ids": too_many})
+    assert resp.status_code == 400
+    assert "ids" in resp.data
+
+
+@pytest.mark.parametrize(
+    "url, extra",
+    [
+        ("/routes/vendors/", {"since": "2024-01-01T00:00:00Z"}),
+        ("/routes/vendors/", {"facets": "category"}),
+        ("/routes/suppliers/", {"since": "2024-01-01T00:00:00Z"}),
+    ],
+)
+def test_batch_rejects_parameters_it_would_ignore(api_client, brands, url, extra):
+    resp = api_client.get(url, {"ids": str(brands["fender"].pk), **extra})
+    assert resp.status_code == 400
+    assert next(iter(extra)) in str(resp.data["ids"])
@@ -0,0 +1,104 @@
+# cmsa/tests/test_bulk.py
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cmsa.models import Supplier, Vendor
+
+URL = "/routes/vendors/bulk/"
+
+
+@pytest.fixture
+def editor(api_client, db):
+    api_client.force_authenticate(get_user_model().objects.create_user(username="u", password="p"))
+    return api_client
+
+
+def links(vendor):
+    vendor = Vendor.objects.get(pk=vendor.pk if isinstance(vendor, Vendor) else vendor)
+    return (
+        sorted(vendor.suppliers.values_list("name", flat=True)),
+        sorted(vendor.categories.values_list("name", flat=True)),
+    )
+
+
+def test_bulk_create_resolves_ids_and_names(editor, brands):
+    resp = editor.post(
+        URL,
+        [
+            {"name": "Tama", "suppliers": ["Coast Music"], "categories": [brands["drums"].pk]},
+            {"name": "Ibanez", "suppliers": [brands["yorkville"].pk], "categories": ["Guitars"]},
+            {"name": "Zildjian"},
+        ],
+        format="json",
+    )
+
+    assert resp.status_code == 201, resp.data
+    assert [v["name"] for v in resp.data] == ["Tama", "Ibanez", "Zildjian"]
+    tama, ibanez, zildjian = (v["id"] for v in resp.data)
+    assert links(tama) == (["Coast Music"], ["Drums"])
+    assert links(ibanez) == (["Yorkville"], ["Guitars"])
+    assert links(zildjian) == ([], [])
+
+
+def test_bulk_patch_renames_and_replaces_relations(editor, brands):
+    fender, gibson = brands["fender"], brands["gibson"]
+    resp = editor.patch(
+        URL,
+        [
+            {"id": fender.pk, "suppliers": ["Yorkville"]},  # drops Coast Music
+            {"id": gibson.pk, "name": "Gibson USA", "categories": ["Guitars", "Drums"]},
+        ],
+        format="json",
+    )
+
+    assert resp.status_code == 200, resp.data
+    assert links(fender) == (["Yorkville"], ["Guitars"])  # categories untouched
+    assert links(gibson) == ([], ["Drums", "Guitars"])
+    assert Vendor.objects.get(pk=gibson.pk).name == "Gibson USA"
+
+
+def test_bulk_write_is_all_or_nothing(editor, brands):
+    resp = editor.post(
+        URL, [{"name": "Tama"}, {"name": "Sabian", "categories": ["Cymbals"]}], format="json"
+    )
+    assert resp.status_code == 400
+    assert "Cymbals" in str(resp.data["categories"])
+    assert not Vendor.objects.filter(name__in=["Tama", "Sabian"]).exists()
+
+    resp = editor.patch(URL, [{"id": 999, "name": "Ghost"}], format="json")
+    assert resp.status_code == 400
+
+
+def test_bulk_rejects_a_supplier_name_shared_by_several_rows(editor, brands):
+    other = Supplier.objects.create(name="Coast Music")
+
+    resp = editor.post(URL, [{"name": "Tama", "suppliers": ["Coast Music"]}], format="json")
+    assert resp.status_code == 400
+    assert "Ambiguous" in str(resp.data["suppliers"])
+
+    resp = editor.post(URL, [{"name": "Tama", "suppliers": [other.pk]}], format="json")
+    assert resp.status_code == 201, resp.data
+    assert list(Vendor.objects.get(name="Tama").suppliers.all()) == [other]
+
+
+def test_bulk_query_count_does_not_grow_with_batch_size(editor, brands):
+    def patch_all(n):
+        vendors = Vendor.objects.bulk_create([Vendor(name=f"Brand {n}-{i}") for i in range(n)])
+        payload = [
+            {"id": v.pk, "suppliers": ["Coast Music", "Yorkville"], "categories": ["Drums"]}
+            for v in vendors
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            resp = editor.patch(URL + "?fields=id", payload, format="json")
+        assert resp.status_code == 200
+        return len(ctx)
+
+    assert patch_all(10) == patch_all(200)
+
+
+@pytest.mark.django_db
+def test_bulk_requires_authentication(api_client):
+    assert api_client.post(URL, [{"name": "Tama"}], format="json").status_code == 403
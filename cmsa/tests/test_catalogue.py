@@ -0,0 +1,136 @@
+# cmsa/tests/test_catalogue.py
+
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cmsa import catalogue
+from cmsa.management.commands import refresh_catalogue
+from cmsa.models import CatalogueEntry, ChangeEvent, Vendor
+
+pytestmark = pytest.mark.usefixtures("fresh_facet_index")
+
+
+def names(resp):
+    return [row["name"] for row in resp.data]
+
+
+@pytest.mark.django_db
+def test_refresh_flattens_vendors_with_normalized_names(brands):
+    Vendor.objects.create(name="  Larrivée ")
+    catalogue.refresh()
+
+    assert catalogue.is_fresh()
+    rows = set(CatalogueEntry.objects.values_list("vendor_key", "supplier_key", "category_key"))
+    assert rows == {
+        ("fender", "coast music", "guitars"),
+        ("fender", "yorkville", "guitars"),
+        ("gibson", "", "guitars"),
+        ("pearl", "coast music", "drums"),
+        ("larrivee", "", ""),
+    }
+
+
+@pytest.mark.django_db
+def test_writes_leave_the_catalogue_stale_until_refreshed(brands, django_assert_max_num_queries):
+    catalogue.refresh()
+
+    with django_assert_max_num_queries(4):  # the row and its change event; no state row
+        Vendor.objects.create(name="Taylor")
+    assert not catalogue.is_fresh()
+    assert catalogue.refresh_if_stale() is not None
+    assert catalogue.is_fresh()
+    assert CatalogueEntry.objects.filter(vendor_key="taylor").exists()
+
+    brands["gibson"].suppliers.add(brands["coast"])
+    assert not catalogue.is_fresh()
+    catalogue.refresh()
+    assert CatalogueEntry.objects.filter(vendor_key="gibson", supplier_key="coast music").exists()
+    assert catalogue.refresh_if_stale() is None
+
+
+@pytest.mark.django_db
+def test_contact_edits_keep_the_catalogue_fresh(brands):
+    catalogue.refresh()
+    jane = brands["yorkville"].contacts.get()
+    jane.name = "Jane Doe"
+    jane.save()
+    assert catalogue.is_fresh()
+
+
+@pytest.mark.django_db
+def test_refresh_does_not_cover_an_event_still_in_flight(brands):
+    first = ChangeEvent.objects.create(model="vendor", object_id=1, action=ChangeEvent.UPDATED)
+    ChangeEvent.objects.create(model="vendor", object_id=2, action=ChangeEvent.UPDATED)
+    first_pk = first.pk
+    first.delete()  # its transaction hasn't committed yet
+    catalogue.refresh()
+    assert not catalogue.is_fresh()
+
+    first.pk = first_pk
+    first.save()
+    catalogue.refresh()
+    assert catalogue.is_fresh()
+
+
+@pytest.mark.django_db
+def test_search_reads_the_fresh_catalogue(api_client, brands):
+    Vendor.objects.create(name="Larrivée").suppliers.add(brands["yorkville"])
+    catalogue.refresh()
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.get("/routes/vendors/", {"search": "YORK", "fields": "id,name"})
+    assert names(resp) == ["Fender", "Larrivée"]
+    vendor_sql = [q["sql"] for q in ctx.captured_queries if 'FROM "cmsa_vendor"' in q["sql"]]
+    assert all("cmsa_catalogue" in sql and "DISTINCT" not in sql for sql in vendor_sql)
+
+    assert names(api_client.get("/routes/vendors/", {"search": "larrivee"})) == ["Larrivée"]
+    assert names(
+        api_client.get("/routes/vendors/", {"search": "coast", "category": brands["drums"].pk})
+    ) == ["Pearl"]
+
+
+@pytest.mark.django_db
+def test_stale_catalogue_falls_back_to_live_joins(api_client, brands):
+    catalogue.refresh()
+    Vendor.objects.create(name="Coastline Drums")
+    before = catalogue.fallbacks.value()
+
+    resp = api_client.get("/routes/vendors/", {"search": "coast"})
+
+    assert names(resp) == ["Coastline Drums", "Fender", "Pearl"]
+    assert catalogue.fallbacks.value() == before + 1
+
+
+@pytest.mark.django_db
+def test_refresh_catalogue_command(brands):
+    call_command("refresh_catalogue")
+    assert catalogue.is_fresh()
+    assert CatalogueEntry.objects.count() == 4
+
+
+@pytest.mark.django_db
+def test_refresh_catalogue_command_keeps_refreshing_when_stale(brands, monkeypatch):
+    def stop(seconds):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(refresh_catalogue.time, "sleep", stop)
+    out = StringIO()
+    call_command("refresh_catalogue", every=5, stdout=out)
+    assert catalogue.is_fresh()
+    assert "Refreshed the catalogue" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_metrics_report_staleness(client, brands, django_user_model):
+    client.force_login(django_user_model.objects.create_user("ops", password="x", is_staff=True))
+    body = client.get("/metrics").content.decode()
+    assert "cmsa_catalogue_stale_seconds " in body
+
+    catalogue.refresh()
+    body = client.get("/metrics").content.decode()
+    assert "cmsa_catalogue_stale_seconds 0\n" in body
+    assert "cmsa_catalogue_last_refresh_duration_seconds " in body
@@ -0,0 +1,111 @@
+# cmsa/tests/test_contact_roster.py
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cmsa.models import Supplier, Contact
+
+
+@pytest.fixture
+def editor(api_client, db):
+    api_client.force_authenticate(get_user_model().objects.create_user(username="u", password="p"))
+    return api_client
+
+
+@pytest.fixture
+def supplier(db):
+    supplier = Supplier.objects.create(name="Coast Music")
+    supplier.contacts.add(
+        Contact.objects.create(name="Isabelle", email="isabelle@coast.ca", primary_contact=True),
+        Contact.objects.create(name="Marc", email="ap@coast.ca", role="Accounting Contact"),
+        Contact.objects.create(name="Old Rep", email="rep@coast.ca", role="Sales"),
+    )
+    return supplier
+
+
+def url(supplier):
+    return f"/routes/suppliers/{supplier.pk}/contacts/"
+
+
+def roster(supplier):
+    return sorted(
+        supplier.contacts.values_list("name", "email", "role", "primary_contact"), key=lambda c: c[0]
+    )
+
+
+def test_put_writes_only_the_difference(editor, supplier):
+    isabelle = Contact.objects.get(name="Isabelle")
+    payload = [
+        {"id": isabelle.pk, "name": "Isabelle", "email": "isabelle@coast.ca", "primary_contact": True},
+        # Matched by email (a CRM export has no ids), role unchanged, name updated.
+        {"name": "Marc Tremblay", "email": "AP@coast.ca", "role": "Accounting Contact"},
+        {"name": "New Rep", "email": "new@coast.ca", "role": "Sales"},
+    ]
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = editor.put(url(supplier), payload, format="json")
+
+    assert resp.status_code == 200, resp.data
+    assert [c["name"] for c in resp.data] == ["Isabelle", "Marc Tremblay", "New Rep"]
+    assert roster(supplier) == [
+        ("Isabelle", "isabelle@coast.ca", None, True),
+        ("Marc Tremblay", "AP@coast.ca", "Accounting Contact", False),
+        ("New Rep", "new@coast.ca", "Sales", False),
+    ]
+    assert not Contact.objects.filter(name="Old Rep").exists()
+    writes = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+    assert not any('"primary_contact" = false' in sql.lower() for sql in writes)
+
+
+def test_unchanged_roster_writes_nothing(editor, supplier):
+    payload = [
+        {"id": c.pk, "name": c.name, "email": c.email, "role": c.role, "primary_contact": c.primary_contact}
+        for c in supplier.contacts.all()
+    ]
+    with CaptureQueriesContext(connection) as ctx:
+        assert editor.put(url(supplier), payload, format="json").status_code == 200
+    assert not [q for q in ctx.captured_queries if q["sql"].startswith(("UPDATE", "INSERT", "DELETE"))]
+
+
+def test_contacts_shared_with_another_supplier_are_only_unlinked(editor, supplier):
+    other = Supplier.objects.create(name="Yorkville")
+    other.contacts.add(Contact.objects.get(name="Old Rep"))
+    payload = [
+        {"name": "Isabelle", "email": "isabelle@coast.ca", "primary_contact": True},
+        {"name": "Marc", "email": "ap@coast.ca", "role": "Accounting Contact"},
+    ]
+    assert editor.put(url(supplier), payload, format="json").status_code == 200
+    assert list(other.contacts.values_list("name", flat=True)) == ["Old Rep"]
+    assert "Old Rep" not in [c[0] for c in roster(supplier)]
+
+
+@pytest.mark.parametrize(
+    "payload, field",
+    [
+        ([{"name": "A", "role": "Accounting Contact"}], "primary_contact"),
+        (
+            [
+                {"name": "A", "primary_contact": True, "role": "Accounting Contact"},
+                {"name": "B", "primary_contact": True},
+            ],
+            "primary_contact",
+        ),
+        ([{"name": "A", "primary_contact": True}], "role"),
+    ],
+)
+def test_roster_needs_one_primary_and_one_accounting_contact(editor, supplier, payload, field):
+    resp = editor.put(url(supplier), payload, format="json")
+    assert resp.status_code == 400
+    assert field in resp.data
+    assert len(roster(supplier)) == 3
+
+
+def test_roster_rejects_foreign_ids_and_anonymous_users(editor, supplier, api_client):
+    stranger = Contact.objects.create(name="Stranger")
+    payload = [{"id": stranger.pk, "name": "Stranger", "primary_contact": True, "role": "Accounting Contact"}]
+    assert editor.put(url(supplier), payload, format="json").status_code == 400
+
+    api_client.force_authenticate(None)
+    assert api_client.put(url(supplier), [], format="json").status_code == 403
@@ -0,0 +1,95 @@
+# cmsa/tests/test_documents.py
+
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cmsa.documents import build_documents
+from cmsa.loaders import ImportRow, get_loader
+from cmsa.models import Vendor, Contact, VendorDocument
+
+
+def document(vendor, private=False):
+    stored = VendorDocument.objects.get(vendor=vendor)
+    return json.loads(stored.private if private else stored.public)
+
+
+def test_plain_list_joins_stored_documents_in_one_query(api_client, brands):
+    expected = api_client.get("/routes/vendors/", {"fields": "id,name,suppliers,categories"}).content
+    build_documents()
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.get("/routes/vendors/")
+
+    assert resp.status_code == 200
+    assert resp["Content-Type"] == "application/json"
+    assert resp.content == expected
+    assert len(ctx) == 1
+
+
+def test_private_documents_decrypt_passwords_on_read(api_client, brands):
+    coast = brands["coast"]
+    coast.website_password = "hunter2"
+    coast.save()
+    build_documents()
+
+    assert "hunter2" not in VendorDocument.objects.get(vendor=brands["pearl"]).private
+    api_client.force_authenticate(get_user_model().objects.create_user(username="u", password="p"))
+    expected = api_client.get("/routes/vendors/", {"fields": "id,name,suppliers,categories"}).json()
+    resp = api_client.get("/routes/vendors/")
+    assert resp.json() == expected
+    assert resp.json()[-1]["suppliers"][0]["website_password"] == "hunter2"
+
+
+def test_missing_documents_fall_back_to_serializers(api_client, brands):
+    build_documents([brands["fender"].pk])
+    resp = api_client.get("/routes/vendors/")
+    assert [v["name"] for v in resp.json()] == ["Fender", "Gibson", "Pearl"]
+
+
+def test_changes_rebuild_only_affected_vendors(brands, django_capture_on_commit_callbacks):
+    build_documents()
+    fender, gibson, pearl = brands["fender"], brands["gibson"], brands["pearl"]
+    before = {v.pk: VendorDocument.objects.get(vendor=v).built_at for v in (fender, gibson, pearl)}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        yorkville = brands["yorkville"]
+        yorkville.name = "Yorkville Sound"
+        yorkville.save()
+    assert document(fender)["suppliers"][1]["name"] == "Yorkville Sound"
+    assert VendorDocument.objects.get(vendor=gibson).built_at == before[gibson.pk]
+    assert VendorDocument.objects.get(vendor=pearl).built_at == before[pearl.pk]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Contact.objects.filter(name="Jane").get().delete()
+    assert document(fender, private=True)["suppliers"][1]["additional_contacts"] == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        gibson.suppliers.add(brands["coast"])
+    assert [s["name"] for s in document(gibson)["suppliers"]] == ["Coast Music"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        brands["drums"].delete()
+    assert document(pearl)["categories"] == []
+
+
+def test_bulk_writes_and_command_rebuild_documents(brands, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        get_loader("copy").load([ImportRow("Tama", ("Coast Music",), ("Drums",))])
+    assert document(Vendor.objects.get(name="Tama"))["suppliers"][0]["name"] == "Coast Music"
+
+    VendorDocument.objects.all().delete()
+    call_command("rebuild_vendor_documents")
+    assert VendorDocument.objects.count() == Vendor.objects.count()
+
+
+@pytest.mark.django_db
+def test_vendor_delete_drops_its_document():
+    vendor = Vendor.objects.create(name="Solo")
+    build_documents()
+    vendor.delete()
+    assert not VendorDocument.objects.exists()
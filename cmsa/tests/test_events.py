@@ -0,0 +1,173 @@
+# cmsa/tests/test_events.py
+
+import asyncio
+import json
+from datetime import timedelta
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from cmsa import events
+from cmsa.bulk import update_vendors
+from cmsa.models import ChangeEvent, Vendor
+
+pytestmark = pytest.mark.usefixtures("fresh_facet_index")
+
+
+def recorded(since=0):
+    return list(ChangeEvent.objects.filter(pk__gt=since).values_list("model", "object_id", "action"))
+
+
+def parse(body):
+    """SSE messages in `body` as dicts of their fields (comments and retry-only blocks skipped)."""
+    messages = []
+    for block in body.decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if "event" in fields:
+            messages.append(fields)
+    return messages
+
+
+@pytest.mark.django_db
+def test_writes_record_change_events(brands):
+    start = events.latest_id()
+    fender, gibson_pk = brands["fender"], brands["gibson"].pk
+
+    fender.name = "Fender Musical Instruments"
+    fender.save()
+    fender.suppliers.remove(brands["coast"])
+    brands["yorkville"].contacts.clear()
+    brands["gibson"].delete()
+
+    assert recorded(start) == [
+        ("vendor", fender.pk, ChangeEvent.UPDATED),
+        ("vendor", fender.pk, ChangeEvent.UPDATED),
+        ("supplier", brands["yorkville"].pk, ChangeEvent.UPDATED),
+        ("vendor", gibson_pk, ChangeEvent.DELETED),
+    ]
+
+
+@pytest.mark.django_db
+def test_bulk_writes_record_one_event_per_row(brands):
+    start = events.latest_id()
+    update_vendors([{"id": brands["fender"].pk, "name": "Fender"}, {"id": brands["pearl"].pk, "name": "Pearl"}])
+
+    assert {row for row in recorded(start) if row[0] == "vendor"} == {
+        ("vendor", brands["fender"].pk, ChangeEvent.UPDATED),
+        ("vendor", brands["pearl"].pk, ChangeEvent.UPDATED),
+    }
+
+
+@pytest.mark.django_db
+def test_events_view_sends_backlog_after_last_event_id(client, brands):
+    start = events.latest_id()
+    taylor = Vendor.objects.create(name="Taylor")
+
+    resp = client.get("/routes/events/", HTTP_LAST_EVENT_ID=str(start))
+
+    assert resp["Content-Type"] == "text/event-stream"
+    assert resp.content.startswith(f"retry: {events.RETRY_MS}\n\n".encode())
+    [message] = parse(resp.content)
+    assert message["event"] == "change"
+    assert int(message["id"]) > start
+    assert json.loads(message["data"]) == {"model": "vendor", "id": taylor.pk, "action": "created"}
+
+
+@pytest.mark.django_db
+def test_events_view_without_last_event_id_sends_ready(client, brands):
+    [message] = parse(client.get("/routes/events/").content)
+
+    assert message["event"] == "ready"
+    assert int(message["id"]) == events.latest_id()
+
+
+@pytest.mark.django_db
+def test_events_view_resets_a_client_too_far_behind(client, brands, monkeypatch):
+    monkeypatch.setattr(events, "BACKLOG_LIMIT", 2)
+
+    [message] = parse(client.get("/routes/events/", HTTP_LAST_EVENT_ID="0").content)
+
+    assert message["event"] == "reset"
+    assert int(message["id"]) == events.latest_id()
+
+
+@pytest.mark.django_db
+def test_events_view_waits_for_an_id_committed_out_of_order(client, brands):
+    start = events.latest_id()
+    first = ChangeEvent.objects.create(model="vendor", object_id=1, action=ChangeEvent.UPDATED)
+    ChangeEvent.objects.create(model="vendor", object_id=2, action=ChangeEvent.UPDATED)
+    first_pk = first.pk
+    first.delete()  # the lower id's transaction hasn't committed yet
+
+    def poll(last_id):
+        response = client.get("/routes/events/", HTTP_LAST_EVENT_ID=str(last_id))
+        return [json.loads(message["data"])["id"] for message in parse(response.content)]
+
+    assert poll(start) == []
+    [ready] = parse(client.get("/routes/events/").content)
+    assert int(ready["id"]) == start
+
+    first.pk = first_pk
+    first.save()  # ...and now it has
+    assert poll(start) == [1, 2]
+
+
+@pytest.mark.django_db
+def test_events_view_skips_a_gap_once_it_is_old(client, brands):
+    start = events.latest_id()
+    first = ChangeEvent.objects.create(model="vendor", object_id=1, action=ChangeEvent.UPDATED)
+    second = ChangeEvent.objects.create(model="vendor", object_id=2, action=ChangeEvent.UPDATED)
+    first.delete()  # rolled back
+    ChangeEvent.objects.filter(pk=second.pk).update(
+        created_at=timezone.now() - timedelta(seconds=events.GAP_WAIT + 1)
+    )
+
+    [message] = parse(client.get("/routes/events/", HTTP_LAST_EVENT_ID=str(start)).content)
+
+    assert int(message["id"]) == second.pk
+
+
+@pytest.mark.django_db(transaction=True)
+def test_asgi_stream_sends_backlog_then_live_events():
+    start = events.latest_id()
+    Vendor.objects.create(name="Fender")
+
+    async def run():
+        sent, disconnect = [], asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/routes/events/",
+            "headers": [(b"last-event-id", str(start).encode())],
+        }
+        task = asyncio.ensure_future(events.stream(scope, receive, send))
+        while len(sent) < 2:
+            await asyncio.sleep(0.01)
+        await sync_to_async(Vendor.objects.create)(name="Gibson")
+        for _ in range(300):
+            if len(sent) >= 3:
+                break
+            await asyncio.sleep(0.01)
+        disconnect.set()
+        await asyncio.wait_for(task, 5)
+        return sent
+
+    sent = asyncio.run(run())
+
+    assert sent[0]["status"] == 200
+    assert (b"content-type", b"text/event-stream") in sent[0]["headers"]
+    messages = [parse(message["body"])[0] for message in sent[1:]]
+    names = [
+        Vendor.objects.get(pk=json.loads(message["data"])["id"]).name for message in messages
+    ]
+    assert names == ["Fender", "Gibson"]
+    assert [int(m["id"]) for m in messages] == sorted(int(m["id"]) for m in messages)
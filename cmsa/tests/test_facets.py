@@ -0,0 +1,101 @@
+# cmsa/tests/test_facets.py
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cmsa import facets
+from cmsa.facets import FacetBitmapIndex, _bitmap
+from cmsa.models import Vendor
+
+pytestmark = pytest.mark.usefixtures("fresh_facet_index")
+
+
+def counts(rows):
+    return [(row["name"], row["count"]) for row in rows]
+
+
+def test_bitmap_sets_one_bit_per_id():
+    assert _bitmap([]) == 0
+    assert _bitmap([0, 3, 9]) == 0b1000001001
+    assert _bitmap([1, 2, 700]).bit_count() == 3
+
+
+def test_bitmap_index_counts_and_intersects():
+    index = FacetBitmapIndex(
+        {"category": {1: _bitmap([1, 2, 3]), 2: _bitmap([3])}},
+        {"category": {1: "Guitars", 2: "Drums"}},
+    )
+    assert counts(index.counts(["category"])["category"]) == [("Guitars", 3), ("Drums", 1)]
+    assert counts(index.counts(["category"], vendors=_bitmap([1, 3]))["category"]) == [
+        ("Guitars", 2),
+        ("Drums", 1),
+    ]
+
+
+@pytest.mark.django_db
+def test_unfiltered_facets_come_from_the_bitmap_index(api_client, brands):
+    api_client.get("/routes/vendors/", {"facets": "category"})  # warm the worker's index
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.get("/routes/vendors/", {"facets": "category,supplier", "fields": "id"})
+
+    assert resp.status_code == 200
+    assert len(resp.data["results"]) == 3
+    assert counts(resp.data["facets"]["category"]) == [("Guitars", 2), ("Drums", 1)]
+    assert counts(resp.data["facets"]["supplier"]) == [("Coast Music", 2), ("Yorkville", 1)]
+    assert not any("cmsa_vendor_categories" in q["sql"] for q in ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_search_facets_use_one_grouped_query_per_facet(api_client, brands):
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.get(
+            "/routes/vendors/", {"search": "coast", "facets": "category", "page": 1, "fields": "id"}
+        )
+
+    assert resp.data["count"] == 2
+    assert counts(resp.data["facets"]["category"]) == [("Drums", 1), ("Guitars", 1)]
+    grouped = [q["sql"] for q in ctx.captured_queries if "GROUP BY" in q["sql"]]
+    assert len(grouped) == 1
+
+
+@pytest.mark.django_db
+def test_facets_are_validated_and_optional(api_client, brands):
+    assert api_client.get("/routes/vendors/", {"facets": "colour"}).status_code == 400
+    assert isinstance(api_client.get("/routes/vendors/").data, list)
+
+
+@pytest.mark.django_db
+def test_bitmap_index_is_rebuilt_after_membership_changes(
+    api_client, brands, django_capture_on_commit_callbacks
+):
+    facets.get_index()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Vendor.objects.get(name="Gibson").categories.add(brands["drums"])
+    resp = api_client.get("/routes/vendors/", {"facets": "category"})
+    assert counts(resp.data["facets"]["category"]) == [("Drums", 2), ("Guitars", 2)]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Vendor.objects.get(name="Fender").delete()
+    resp = api_client.get("/routes/vendors/", {"facets": "category"})
+    assert counts(resp.data["facets"]["category"]) == [("Drums", 2), ("Guitars", 1)]
+
+
+@pytest.mark.django_db
+def test_bitmap_index_sees_writes_from_other_workers(api_client, brands):
+    api_client.get("/routes/vendors/", {"facets": "category"})  # warm the worker's index
+
+    # No on-commit callbacks run here, as for a write made by another process.
+    Vendor.objects.get(name="Pearl").categories.add(brands["guitars"])
+
+    resp = api_client.get("/routes/vendors/", {"facets": "category"})
+    assert counts(resp.data["facets"]["category"]) == [("Guitars", 3), ("Drums", 1)]
+
+
+@pytest.mark.django_db
+def test_bitmaps_are_sized_by_vendor_count_not_id(brands):
+    Vendor.objects.create(id=10_000_000, name="Zildjian").categories.add(brands["drums"])
+    index = FacetBitmapIndex.build()
+    assert max(bitmap.bit_length() for bitmap in index.bitmaps["category"].values()) <= 4
@@ -0,0 +1,109 @@
+# cmsa/tests/test_fields.py
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cmsa.models import Vendor, Supplier, Category, Contact
+from cmsa.serializers import parse_fields
+
+
+@pytest.fixture
+def catalogue(db):
+    category = Category.objects.create(name="Guitars")
+    for i in range(3):
+        supplier = Supplier.objects.create(name=f"Coast Music {i}", website_password="secret")
+        supplier.contacts.add(
+            Contact.objects.create(name=f"Primary {i}", email=f"p{i}@example.com", primary_contact=True)
+        )
+        vendor = Vendor.objects.create(name=f"Brand {i}")
+        vendor.suppliers.add(supplier)
+        vendor.categories.add(category)
+
+
+def get(api_client, url, **params):
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.get(url, params)
+    assert resp.status_code == 200, resp.data
+    return resp, len(ctx)
+
+
+def test_parse_fields_builds_selection_tree():
+    assert parse_fields("id, name,suppliers.name,suppliers.website,categories") == {
+        "id": None,
+        "name": None,
+        "suppliers": {"name": None, "website": None},
+        "categories": None,
+    }
+    # A bare relation wins over narrower selections, in either order.
+    assert parse_fields("suppliers.name,suppliers") == {"suppliers": None}
+    assert parse_fields("suppliers,suppliers.name") == {"suppliers": None}
+    # Naming no fields selects everything.
+    assert parse_fields(",") is None
+
+
+def test_empty_selection_keeps_full_response_and_prefetches(api_client, catalogue):
+    resp, queries = get(api_client, "/routes/vendors/", fields=",")
+    full, full_queries = get(api_client, "/routes/vendors/", fields="id,name,suppliers,categories")
+
+    assert resp.data == full.data
+    assert queries == full_queries == 4  # vendors, suppliers, contacts, categories
+
+
+def test_top_level_fields_skip_all_prefetches(api_client, catalogue):
+    resp, queries = get(api_client, "/routes/vendors/", fields="id,name")
+
+    assert [set(v) for v in resp.data] == [{"id", "name"}] * 3
+    assert queries == 1
+
+
+def test_nested_selection_prunes_contacts_prefetch(api_client, catalogue):
+    resp, queries = get(api_client, "/routes/vendors/", fields="name,suppliers.name,categories")
+
+    assert resp.data[0] == {
+        "name": "Brand 0",
+        "suppliers": [{"name": "Coast Music 0"}],
+        "categories": [{"id": Category.objects.get().pk, "name": "Guitars"}],
+    }
+    assert queries == 3  # vendors, suppliers, categories; no contacts
+
+
+def test_contact_derived_field_keeps_contacts_prefetch(api_client, catalogue):
+    resp, queries = get(api_client, "/routes/vendors/", fields="name,suppliers.primary_contact_name")
+
+    assert resp.data[0]["suppliers"] == [{"primary_contact_name": "Primary 0"}]
+    assert queries == 3  # vendors, suppliers, contacts
+
+
+def test_unselected_password_is_never_decrypted(api_client, catalogue, monkeypatch):
+    user = get_user_model().objects.create_user(username="u", password="p")
+    api_client.force_authenticate(user=user)
+
+    def boom(self):
+        raise AssertionError("decrypt_password should not run")
+
+    monkeypatch.setattr(Supplier, "decrypt_password", boom)
+    resp, _ = get(api_client, "/routes/suppliers/", fields="id,name,account_active")
+    assert set(resp.data[0]) == {"id", "name", "account_active"}
+
+
+def test_fields_apply_to_retrieve_and_categories(api_client, catalogue):
+    vendor = Vendor.objects.get(name="Brand 1")
+    resp, _ = get(api_client, f"/routes/vendors/{vendor.pk}/", fields="name")
+    assert resp.data == {"name": "Brand 1"}
+
+    resp, _ = get(api_client, "/routes/categories/", fields="name")
+    assert resp.data == [{"name": "Guitars"}]
+
+
+def test_unknown_field_is_a_400(api_client, catalogue):
+    resp = api_client.get("/routes/vendors/", {"fields": "name,suppliers.website_password"})
+    assert resp.status_code == 400
+    assert "website_password" in str(resp.data["fields"])
+
+
+def test_without_fields_response_is_unchanged(api_client, catalogue):
+    resp, _ = get(api_client, "/routes/vendors/")
+    assert set(resp.data[0]) == {"id", "name", "suppliers", "categories"}
+    assert "primary_contact_name" in resp.data[0]["suppliers"][0]
@@ -0,0 +1,59 @@
+# cmsa/tests/test_filters.py
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = pytest.mark.usefixtures("fresh_facet_index")
+
+
+def names(resp):
+    return [row["name"] for row in resp.data]
+
+
+@pytest.mark.django_db
+def test_vendor_filters(api_client, brands):
+    guitars, coast = brands["guitars"].pk, brands["coast"].pk
+
+    assert names(api_client.get("/routes/vendors/", {"category": guitars})) == ["Fender", "Gibson"]
+    assert names(api_client.get("/routes/vendors/", {"supplier": coast})) == ["Fender", "Pearl"]
+    assert names(
+        api_client.get("/routes/vendors/", {"category": guitars, "supplier": coast})
+    ) == ["Fender"]
+    assert api_client.get("/routes/vendors/", {"category": "x"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_supplier_filters(api_client, brands):
+    assert names(api_client.get("/routes/suppliers/", {"account_active": "true"})) == ["Coast Music"]
+    assert names(api_client.get("/routes/suppliers/", {"has_contacts": "1"})) == ["Yorkville"]
+    assert names(api_client.get("/routes/suppliers/", {"has_contacts": "false"})) == ["Coast Music"]
+    assert sorted(
+        names(api_client.get("/routes/suppliers/", {"vendor": brands["fender"].pk}))
+    ) == ["Coast Music", "Yorkville"]
+    assert api_client.get("/routes/suppliers/", {"account_active": "maybe"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_filters_compile_to_exists_without_distinct(api_client, brands):
+    with CaptureQueriesContext(connection) as ctx:
+        api_client.get(
+            "/routes/vendors/",
+            {"category": brands["guitars"].pk, "supplier": brands["coast"].pk, "fields": "id"},
+        )
+
+    (sql,) = [q["sql"] for q in ctx.captured_queries if 'FROM "cmsa_vendor"' in q["sql"]]
+    assert sql.count("EXISTS") == 2
+    assert "DISTINCT" not in sql
+
+
+@pytest.mark.django_db
+def test_filtered_facets_intersect_bitmaps(api_client, brands):
+    resp = api_client.get(
+        "/routes/vendors/", {"supplier": brands["coast"].pk, "facets": "category"}
+    )
+    assert [row["name"] for row in resp.data["results"]] == ["Fender", "Pearl"]
+    assert [(row["name"], row["count"]) for row in resp.data["facets"]["category"]] == [
+        ("Drums", 1),
+        ("Guitars", 1),
+    ]
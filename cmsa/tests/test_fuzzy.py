@@ -0,0 +1,100 @@
+# cmsa/tests/test_fuzzy.py
+
+import pytest
+
+from cmsa import fuzzy
+from cmsa.fuzzy import SymSpellIndex, edit_distance
+from cmsa.loaders import ImportRow, get_loader
+from cmsa.models import Vendor, Supplier, Category
+
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    fuzzy.reset()
+    yield
+    fuzzy.reset()
+
+
+def test_edit_distance_counts_transpositions_once():
+    assert edit_distance("yamaha", "yamaha", 2) == 0
+    assert edit_distance("yamha", "yamaha", 2) == 1
+    assert edit_distance("fnedr", "fender", 2) == 2
+    assert edit_distance("gibson", "fender", 2) == 3  # capped at limit + 1
+
+
+def test_symspell_corrects_words_and_keeps_accents():
+    index = SymSpellIndex.build([
+        ("vendor", 1, "Yamaha"),
+        ("vendor", 2, "Fender Musical Instruments"),
+        ("vendor", 3, "Larrivée Guitars"),
+        ("category", 4, "Guitars"),
+    ])
+
+    assert index.correct("Yamha") == "Yamaha"
+    assert index.correct("fendr musical") == "Fender musical"
+    assert index.correct("larivee") == "Larrivée"
+    assert index.correct("guitars") is None  # already known
+    assert index.correct("xylophone") is None  # nothing close enough
+
+
+def test_symspell_prefers_more_frequent_words():
+    index = SymSpellIndex.build([
+        ("vendor", 1, "Boss"),
+        ("category", 2, "Bass"),
+        ("vendor", 3, "Bass Central"),
+    ])
+    # "bess" is one edit from both "boss" and "bass"; "bass" occurs in two names.
+    assert index.lookup("bess") == "bass"
+
+
+def test_symspell_add_rename_and_remove():
+    index = SymSpellIndex()
+    index.add("vendor", 1, "Fender")
+    index.add("vendor", 1, "Gretsch")  # rename drops the old words
+    assert index.lookup("fendr") is None
+    assert index.lookup("gretch") == "gretsch"
+
+    index.remove("vendor", 1)
+    assert index.lookup("gretch") is None
+
+
+@pytest.mark.django_db
+def test_fuzzy_search_matches_corrected_query(api_client):
+    Vendor.objects.create(name="Yamaha")
+    Vendor.objects.create(name="Fender")
+
+    resp = api_client.get("/routes/vendors/", {"search": "Yamha", "fuzzy": "1"})
+    assert resp.status_code == 200
+    assert resp.data["suggestion"] == "Yamaha"
+    assert [v["name"] for v in resp.data["results"]] == ["Yamaha"]
+
+    # Without fuzzy the response shape and matching are unchanged.
+    resp = api_client.get("/routes/vendors/", {"search": "Yamha"})
+    assert resp.data == []
+
+
+@pytest.mark.django_db
+def test_fuzzy_search_suggestion_is_null_for_known_terms_and_paginates(api_client):
+    Vendor.objects.create(name="Yamaha")
+
+    resp = api_client.get("/routes/vendors/", {"search": "yamaha", "fuzzy": "1", "page": 1})
+    assert resp.data["suggestion"] is None
+    assert resp.data["count"] == 1
+
+
+@pytest.mark.django_db
+def test_fuzzy_index_follows_writes(api_client, django_capture_on_commit_callbacks):
+    fuzzy.get_index()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        supplier = Supplier.objects.create(name="Coast Music")
+    assert fuzzy.get_index().correct("cost music") == "Coast music"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        supplier.delete()
+    assert fuzzy.get_index().correct("cost music") is None
+
+    with django_capture_on_commit_callbacks(execute=True):
+        get_loader("copy").load([ImportRow("Paiste", (), ("Cymbals",))])
+    assert fuzzy.get_index().correct("cymbls") == "Cymbals"
+    assert Category.objects.filter(name="Cymbals").exists()
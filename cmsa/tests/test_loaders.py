@@ -0,0 +1,138 @@
+# cmsa/tests/test_loaders.py
+
+import io
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from cmsa.loaders import (
+    BulkCreateLoader,
+    ExecutemanyLoader,
+    ImportRow,
+    PostgresCopyLoader,
+    RowLoader,
+    get_loader,
+    read_tsv_rows,
+)
+from cmsa.models import Vendor, Supplier, Category
+
+
+ROWS = [
+    ImportRow("Dunlop", ("Coast Music", "Erikson Audio"), ("Guitars",)),
+    ImportRow("Fender", ("Coast Music",), ("Guitars",)),
+    ImportRow("Dunlop", ("Coast Music",), ("Accessories",)),
+    ImportRow("Zildjian", (), ("Drums",)),
+]
+
+
+def snapshot():
+    return {
+        vendor.name: (
+            sorted(s.name for s in vendor.suppliers.all()),
+            sorted(c.name for c in vendor.categories.all()),
+        )
+        for vendor in Vendor.objects.prefetch_related("suppliers", "categories")
+    }
+
+
+EXPECTED = {
+    "Dunlop": (["Coast Music", "Erikson Audio"], ["Accessories", "Guitars"]),
+    "Fender": (["Coast Music"], ["Guitars"]),
+    "Zildjian": ([], ["Drums"]),
+}
+
+
+def loader_classes():
+    classes = [RowLoader, BulkCreateLoader, ExecutemanyLoader]
+    if connection.vendor == "postgresql":
+        classes.append(PostgresCopyLoader)
+    return classes
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("loader_class", loader_classes())
+def test_loaders_create_entities_and_links(loader_class):
+    counts = loader_class().load(ROWS)
+
+    assert counts == {"vendors": 3, "suppliers": 2, "categories": 3}
+    assert snapshot() == EXPECTED
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("loader_class", loader_classes())
+def test_loaders_are_idempotent_and_reuse_existing_rows(loader_class):
+    existing = Supplier.objects.create(name="Coast Music", website="https://coast.example")
+
+    loader_class().load(ROWS)
+    counts = loader_class().load(ROWS)
+
+    assert counts == {"vendors": 0, "suppliers": 0, "categories": 0}
+    assert snapshot() == EXPECTED
+    assert Supplier.objects.filter(name="Coast Music").get().pk == existing.pk
+    assert Vendor.suppliers.through.objects.count() == 3
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("loader_class", loader_classes())
+def test_loaders_link_the_oldest_row_of_a_repeated_name(loader_class):
+    dunlop, _ = Vendor.objects.create(name="Dunlop"), Vendor.objects.create(name="Dunlop")
+    coast, _ = Supplier.objects.create(name="Coast Music"), Supplier.objects.create(name="Coast Music")
+
+    loader_class().load([ImportRow("Dunlop", ("Coast Music",), ())])
+
+    links = Vendor.suppliers.through.objects.values_list("vendor_id", "supplier_id")
+    assert list(links) == [(dunlop.pk, coast.pk)]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("loader_class", loader_classes())
+def test_loaders_store_name_keys(loader_class):
+    loader_class().load([ImportRow("LarrivÃ©e", ("Höfner Canada",), ("Pianos & Keys",))])
+
+    assert Vendor.objects.values_list("name", "sort_key", "search_key").get() == (
+        "LarrivÃ©e", "larrivee", "larrivee"
+    )
+    assert Supplier.objects.get().search_key == "hofner canada"
+    assert Category.objects.values_list("sort_key", "search_key").get() == (
+        "pianos keys", "pianos & keys"
+    )
+
+
+@pytest.mark.django_db
+def test_get_loader_picks_backend_for_copy():
+    expected = PostgresCopyLoader if connection.vendor == "postgresql" else ExecutemanyLoader
+    assert type(get_loader("copy")) is expected
+    assert type(get_loader("row")) is RowLoader
+    with pytest.raises(ValueError):
+        get_loader("nope")
+
+
+def test_read_tsv_rows_splits_suppliers_and_drops_blanks():
+    tsv = io.StringIO(
+        "Vendor\tSupplier\tCategory\n"
+        "Dunlop\tCoast Music, Erikson Audio,\tGuitars\n"
+        "\tOrphan\tGuitars\n"
+    )
+    assert list(read_tsv_rows(tsv)) == [
+        ImportRow("Dunlop", ("Coast Music", "Erikson Audio"), ("Guitars",)),
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("loader", ["row", "bulk", "copy"])
+def test_import_tsv_data_command(tmp_path, loader):
+    path = tmp_path / "cmt.tsv"
+    path.write_text(
+        "Vendor\tSupplier\tCategory\n"
+        "Dunlop\tCoast Music\tGuitars\n"
+        "Fender\tCoast Music\tGuitars\n"
+    )
+    out = io.StringIO()
+
+    call_command("import_tsv_data", str(path), loader=loader, stdout=out)
+
+    assert "Successfully imported" in out.getvalue()
+    assert Vendor.objects.count() == 2
+    assert Supplier.objects.count() == 1
+    assert Category.objects.get().vendors.count() == 2
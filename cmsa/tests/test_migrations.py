@@ -0,0 +1,33 @@
+# cmsa/tests/test_migrations.py
+
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+
+def migrate(target):
+    executor = MigrationExecutor(connection)
+    executor.migrate([("cmsa", target)])
+    executor.loader.build_graph()
+    return executor.loader.project_state([("cmsa", target)]).apps
+
+
+@pytest.mark.django_db(transaction=True)
+def test_unique_category_name_merges_existing_duplicates():
+    latest = MigrationExecutor(connection).loader.graph.leaf_nodes("cmsa")[0][1]
+    old = migrate("0012_remove_contact_phone")
+    try:
+        Category, Vendor = old.get_model("cmsa", "Category"), old.get_model("cmsa", "Vendor")
+        first, second, third = (Category.objects.create(name="Drums") for _ in range(3))
+        pearl, tama = Vendor.objects.create(name="Pearl"), Vendor.objects.create(name="Tama")
+        pearl.categories.add(first, second)
+        tama.categories.add(third)
+
+        new = migrate("0013_name_indexes")
+
+        Category = new.get_model("cmsa", "Category")
+        (drums,) = Category.objects.all()
+        assert drums.pk == first.pk
+        assert sorted(drums.vendors.values_list("name", flat=True)) == ["Pearl", "Tama"]
+    finally:
+        migrate(latest)
@@ -275,3 +275,25 @@ def test_primary_contact_update_logic():
     # Verify that contact1 is no longer primary, but contact2 is
     assert contact1.primary_contact is False
     assert contact2.primary_contact is True
+
+
+@pytest.mark.django_db
+def test_name_keys_follow_every_write_path():
+    vendor = Vendor.objects.create(name="RitmÃ¼ller")
+    assert (vendor.sort_key, vendor.search_key) == ("ritmuller", "ritmuller")
+
+    vendor.name = "Château"
+    vendor.save(update_fields=["name"])
+    vendor.refresh_from_db()
+    assert vendor.search_key == "chateau"
+
+    (bulk,) = Vendor.objects.bulk_create([Vendor(name=".Strandberg")])
+    assert Vendor.objects.get(pk=bulk.pk).sort_key == "strandberg"
+
+    bulk.name = "Höfner"
+    Vendor.objects.bulk_update([bulk], ["name"])
+    Vendor.objects.filter(pk=vendor.pk).update(name="Larrivée")
+    assert dict(Vendor.objects.values_list("name", "search_key")) == {
+        "Höfner": "hofner",
+        "Larrivée": "larrivee",
+    }
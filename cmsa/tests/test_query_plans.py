@@ -0,0 +1,94 @@
+# cmsa/tests/test_query_plans.py
+#
+# Captures EXPLAIN output for the hot lookups and fails when the planner falls back
+# to a sequential scan (or an explicit sort) at realistic table sizes.
+
+import re
+
+import pytest
+from django.db import connection
+
+from cmsa.models import Vendor, Supplier, Category, Contact
+from cmsa.pagination import NAME_ORDERING
+
+postgres_only = pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="trigram indexes are Postgres-only"
+)
+
+
+def sequential_scans(plan):
+    if connection.vendor == "postgresql":
+        return re.findall(r"Seq Scan on (\w+)", plan)
+    # SQLite: "SCAN cmsa_vendor" (no "USING ... INDEX") is a full table scan.
+    return re.findall(r"\bSCAN (?:TABLE )?(\w+)\s*$", plan, flags=re.MULTILINE)
+
+
+def explicit_sorts(plan):
+    if connection.vendor == "postgresql":
+        return re.findall(r"\b(?:Incremental )?Sort\b", plan)
+    return re.findall(r"USE TEMP B-TREE FOR ORDER BY", plan)
+
+
+def assert_index_only(queryset):
+    plan = queryset.explain()
+    assert not sequential_scans(plan), plan
+    assert not explicit_sorts(plan), plan
+    return plan
+
+
+@pytest.fixture
+def catalogue(db):
+    categories = Category.objects.bulk_create(
+        [Category(name=f"Category {i:02d}") for i in range(40)]
+    )
+    suppliers = Supplier.objects.bulk_create(
+        [Supplier(name=f"Supplier {i:04d}") for i in range(500)]
+    )
+    Vendor.objects.bulk_create([Vendor(name=f"Vendor {i:05d}") for i in range(5000)])
+    Contact.objects.bulk_create(
+        [Contact(name=f"Contact {i:05d}", email=f"contact{i}@example.com") for i in range(2000)]
+    )
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    return categories, suppliers
+
+
+def test_vendor_name_lookup_uses_index(catalogue):
+    assert_index_only(Vendor.objects.filter(name="Vendor 01234"))
+
+
+def test_supplier_name_lookup_uses_index(catalogue):
+    assert_index_only(Supplier.objects.filter(name="Supplier 0123"))
+
+
+def test_category_name_lookup_uses_index(catalogue):
+    assert_index_only(Category.objects.filter(name="Category 12"))
+
+
+def test_contact_email_lookup_uses_index(catalogue):
+    assert_index_only(Contact.objects.filter(email="contact1234@example.com"))
+
+
+def test_vendor_page_ordered_by_name_uses_index(catalogue):
+    assert_index_only(Vendor.objects.order_by("name")[:25])
+
+
+@pytest.mark.parametrize("model", [Vendor, Supplier, Category])
+def test_sort_key_order_uses_index(catalogue, model):
+    assert_index_only(model.objects.order_by(*NAME_ORDERING)[:25])
+
+
+@postgres_only
+@pytest.mark.parametrize(
+    "queryset",
+    [
+        lambda: Vendor.objects.filter(name__icontains="01234"),
+        lambda: Supplier.objects.filter(name__icontains="0123"),
+        lambda: Category.objects.filter(name__icontains="ory 12"),
+        lambda: Contact.objects.filter(email__icontains="contact1234@"),
+        lambda: Vendor.objects.filter(search_key__contains="01234"),
+        lambda: Supplier.objects.filter(search_key__contains="0123"),
+    ],
+)
+def test_icontains_search_uses_trigram_index(catalogue, queryset):
+    assert_index_only(queryset())
@@ -0,0 +1,74 @@
+# cmsa/tests/test_supplier_search.py
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cmsa.models import Vendor, Supplier, Category, Contact
+
+
+@pytest.fixture
+def suppliers():
+    coast = Supplier.objects.create(name="Coast Music", website="coastmusic.com")
+    yorkville = Supplier.objects.create(name="Yorkville Sound", website="yorkville.com")
+    yorkville.contacts.add(Contact.objects.create(name="Jane Coaster", email="jane@yorkville.com"))
+    return coast, yorkville
+
+
+def names(data):
+    return [row["name"] for row in data]
+
+
+@pytest.mark.django_db
+def test_anonymous_search_matches_name_and_website(api_client, suppliers):
+    assert names(api_client.get("/routes/suppliers/", {"search": "coast"}).data) == ["Coast Music"]
+    assert names(api_client.get("/routes/suppliers/", {"search": "YORKVILLE.COM"}).data) == [
+        "Yorkville Sound"
+    ]
+    # Contact details are private: no match through them.
+    assert api_client.get("/routes/suppliers/", {"search": "jane@"}).data == []
+
+
+@pytest.mark.django_db
+def test_authenticated_search_also_matches_contacts(api_client, suppliers):
+    api_client.force_authenticate(get_user_model().objects.create_user(username="u", password="p"))
+
+    assert names(api_client.get("/routes/suppliers/", {"search": "jane@"}).data) == ["Yorkville Sound"]
+    # Matches through both the name and a contact, listed once.
+    assert sorted(names(api_client.get("/routes/suppliers/", {"search": "coast"}).data)) == [
+        "Coast Music",
+        "Yorkville Sound",
+    ]
+
+
+@pytest.mark.django_db
+def test_supplier_vendors_pages_by_keyset(api_client):
+    coast = Supplier.objects.create(name="Coast Music")
+    drums = Category.objects.create(name="Drums")
+    vendors = Vendor.objects.bulk_create([Vendor(name=f"Vendor {i:02d}") for i in range(30)])
+    coast.vendors.add(*vendors)
+    for vendor in vendors:
+        vendor.categories.add(drums)
+    Vendor.objects.create(name="Not carried")
+
+    # The next links carry the cursor and page_size; follow them unchanged.
+    url = f"/routes/suppliers/{coast.pk}/vendors/?page_size=12"
+    seen, pages = [], []
+    while url:
+        with CaptureQueriesContext(connection) as ctx:
+            resp = api_client.get(url)
+        assert resp.status_code == 200
+        pages.append(len(ctx))
+        seen += names(resp.data["results"])
+        url = resp.data["next"]
+
+    assert seen == [f"Vendor {i:02d}" for i in range(30)]
+    assert resp.data["results"][0]["categories"][0]["name"] == "Drums"
+    # Supplier lookup, page, and one prefetch per nested relation: the same on every page.
+    assert len(set(pages)) == 1
+
+
+@pytest.mark.django_db
+def test_supplier_vendors_404_for_unknown_supplier(api_client):
+    assert api_client.get("/routes/suppliers/999/vendors/").status_code == 404
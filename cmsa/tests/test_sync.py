@@ -0,0 +1,175 @@
+# cmsa/tests/test_sync.py
+
+from datetime import datetime, timedelta
+
+import pytest
+from django.utils import timezone
+from django.utils.http import http_date
+
+from cmsa.models import Vendor, Supplier, Category, Contact, Tombstone
+
+
+def age(*objs, seconds=60):
+    """Push updated_at into the past so later changes are distinguishable."""
+    past = timezone.now() - timedelta(seconds=seconds)
+    for obj in objs:
+        type(obj).objects.filter(pk=obj.pk).update(updated_at=past)
+        obj.refresh_from_db()
+    return past
+
+
+def since_param(moment):
+    return {"since": moment.isoformat()}
+
+
+@pytest.fixture
+def catalogue(db):
+    category = Category.objects.create(name="Guitars")
+    supplier = Supplier.objects.create(name="Coast Music")
+    contact = Contact.objects.create(name="Isabelle", email="i@example.com", primary_contact=True)
+    supplier.contacts.add(contact)
+    dunlop = Vendor.objects.create(name="Dunlop")
+    dunlop.suppliers.add(supplier)
+    dunlop.categories.add(category)
+    fender = Vendor.objects.create(name="Fender")
+    age(category, supplier, contact, dunlop, fender, seconds=120)
+    return {"category": category, "supplier": supplier, "contact": contact,
+            "dunlop": dunlop, "fender": fender}
+
+
+@pytest.mark.django_db
+def test_updated_at_set_on_save_and_queryset_update():
+    vendor = Vendor.objects.create(name="Dunlop")
+    past = age(vendor)
+
+    Vendor.objects.filter(pk=vendor.pk).update(name="Dunlop Mfg")
+    vendor.refresh_from_db()
+    assert vendor.updated_at > past
+
+    age(vendor)
+    vendor.name = "Dunlop"
+    Vendor.objects.bulk_update([vendor], ["name"])
+    vendor.refresh_from_db()
+    assert vendor.updated_at > past
+
+
+def test_m2m_changes_touch_the_owning_side(catalogue):
+    dunlop, fender, supplier = catalogue["dunlop"], catalogue["fender"], catalogue["supplier"]
+    past = timezone.now() - timedelta(seconds=60)
+
+    supplier.vendors.add(fender)  # reverse add
+    fender.refresh_from_db()
+    assert fender.updated_at > past
+
+    dunlop.categories.clear()
+    dunlop.refresh_from_db()
+    assert dunlop.updated_at > past
+
+    age(supplier)
+    catalogue["contact"].supplier_set.clear()  # reverse clear
+    supplier.refresh_from_db()
+    assert supplier.updated_at > past
+
+
+def test_list_since_returns_only_changed_rows(api_client, catalogue):
+    checkpoint = timezone.now() - timedelta(seconds=60)
+    catalogue["fender"].save()
+
+    resp = api_client.get("/routes/vendors/", since_param(checkpoint))
+
+    assert resp.status_code == 200
+    assert [v["name"] for v in resp.data["results"]] == ["Fender"]
+    assert resp.data["deleted"] == []
+    assert resp.data["synced_at"]
+
+
+@pytest.mark.parametrize("change", ["supplier", "contact", "category"])
+def test_vendor_feed_includes_nested_changes(api_client, catalogue, change):
+    checkpoint = timezone.now() - timedelta(seconds=60)
+    catalogue[change].save()
+
+    resp = api_client.get("/routes/vendors/", since_param(checkpoint))
+
+    assert [v["name"] for v in resp.data["results"]] == ["Dunlop"]
+
+
+def test_feeds_report_deletions_as_tombstones(api_client, catalogue):
+    checkpoint = timezone.now() - timedelta(seconds=60)
+    supplier_id = catalogue["supplier"].pk
+    catalogue["supplier"].delete()
+
+    vendors = api_client.get("/routes/vendors/", since_param(checkpoint)).data
+    suppliers = api_client.get("/routes/suppliers/", since_param(checkpoint)).data
+
+    # Dunlop lost its supplier, so it changed too.
+    assert [v["name"] for v in vendors["results"]] == ["Dunlop"]
+    assert suppliers["results"] == []
+    assert suppliers["deleted"] == [supplier_id]
+    assert Tombstone.objects.filter(model="supplier", object_id=supplier_id).exists()
+
+
+def test_feed_is_empty_when_nothing_changed(api_client, catalogue):
+    resp = api_client.get("/routes/categories/", since_param(timezone.now() - timedelta(seconds=60)))
+    assert resp.data["results"] == []
+    assert resp.data["deleted"] == []
+
+
+@pytest.mark.django_db
+def test_invalid_since_is_rejected(api_client):
+    resp = api_client.get("/routes/vendors/", {"since": "yesterday"})
+    assert resp.status_code == 400
+    assert "since" in resp.data
+
+
+def test_retrieve_sends_last_modified_and_honours_if_modified_since(api_client, catalogue):
+    dunlop = catalogue["dunlop"]
+    url = f"/routes/vendors/{dunlop.pk}/"
+
+    resp = api_client.get(url)
+    assert resp.status_code == 200
+    last_modified = resp["Last-Modified"]
+
+    resp = api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert resp.status_code == 304
+    assert resp.content == b""
+
+    catalogue["contact"].save()
+    resp = api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert resp.status_code == 200
+    assert resp["Last-Modified"] != last_modified
+
+
+def test_retrieve_without_conditional_header_is_unchanged(api_client, catalogue):
+    category = catalogue["category"]
+    resp = api_client.get(f"/routes/categories/{category.pk}/")
+    assert resp.data == {"id": category.pk, "name": "Guitars"}
+    assert resp["Last-Modified"] == http_date(int(category.updated_at.timestamp()))
+
+
+def test_synced_at_overlaps_for_transactions_still_open(api_client, catalogue):
+    before = timezone.now()
+    synced_at = api_client.get("/routes/vendors/", since_param(before)).data["synced_at"]
+    assert datetime.fromisoformat(synced_at) <= before - timedelta(seconds=59)
+
+    # Saved (and stamped) before the feed above ran, but committed only afterwards.
+    age(catalogue["fender"], seconds=30)
+    resp = api_client.get("/routes/vendors/", {"since": synced_at})
+    assert "Fender" in [v["name"] for v in resp.data["results"]]
+
+
+def test_retrieve_last_modified_costs_one_query_whatever_is_prefetched(
+    api_client, catalogue, django_assert_num_queries
+):
+    dunlop = catalogue["dunlop"]
+    for i in range(3):
+        supplier = Supplier.objects.create(name=f"Extra {i}")
+        supplier.contacts.add(Contact.objects.create(name=f"Contact {i}"))
+        dunlop.suppliers.add(supplier)
+
+    with django_assert_num_queries(2):  # the vendor, then one aggregate
+        resp = api_client.get(f"/routes/vendors/{dunlop.pk}/", {"fields": "name"})
+    assert resp.data == {"name": "Dunlop"}
+    dunlop.refresh_from_db()
+    assert resp["Last-Modified"] == http_date(
+        int(max(dunlop.updated_at, Contact.objects.latest("updated_at").updated_at).timestamp())
+    )
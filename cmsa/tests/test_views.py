@@ -255,4 +255,18 @@ def test_vendor_search_pagination_count_uses_distinct(api_client):
 
     assert resp.data["count"] == 1
     assert len(resp.data["results"]) == 1
-    assert resp.data["results"][0]["name"] == "Dunlop"    
\ No newline at end of file
+    assert resp.data["results"][0]["name"] == "Dunlop"
+
+
+@pytest.mark.django_db
+def test_vendor_order_and_search_ignore_case_accents_and_mojibake(api_client):
+    for name in ["höfner", "Larrivée", "HOHNER", "ChÃ¢teau", "Hofmann"]:
+        Vendor.objects.create(name=name)
+
+    resp = api_client.get("/routes/vendors/")
+    assert [row["name"] for row in resp.data] == ["ChÃ¢teau", "Hofmann", "höfner", "HOHNER", "Larrivée"]
+
+    resp = api_client.get("/routes/vendors/?search=LARRIVEE")
+    assert [row["name"] for row in resp.data] == ["Larrivée"]
+    resp = api_client.get("/routes/vendors/?search=château")
+    assert [row["name"] for row in resp.data] == ["ChÃ¢teau"]
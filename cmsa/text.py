@@ -0,0 +1,59 @@
+# cmsa/text.py
+
+import re
+import unicodedata
+
+_whitespace = re.compile(r"\s+")
+_punctuation = re.compile(r"[^\w\s]")
+# A UTF-8 lead byte (Ã, Â, â) decoded as Windows-1252/Latin-1, followed by a
+# continuation byte decoded the same way: "Ã©", "Ã¶", "â€™".
+_mojibake = re.compile("[\u00c2\u00c3\u00e2][\u0080-\u00bf\u0152\u0153\u0160\u0161\u0178\u017d\u017e\u0192\u02c6\u02dc\u2013-\u203a\u20ac\u2122]")
+
+KEY_MAX_LENGTH = 255
+
+
+def normalize(value):
+    """
+    Case- and accent-insensitive form of a name, for matching and sorting.
+
+    "  Larrivée  Guitars" -> "larrivee guitars"
+    """
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _whitespace.sub(" ", stripped.casefold()).strip()
+
+
+def repair(value):
+    """
+    Undo UTF-8 text that was decoded as Windows-1252 or Latin-1 somewhere upstream.
+
+    "LarrivÃ©e" -> "Larrivée"; anything that doesn't round-trip is returned as is.
+    """
+    if not value or not _mojibake.search(value):
+        return value
+    for encoding in ("cp1252", "latin-1"):
+        try:
+            return value.encode(encoding).decode("utf-8")
+        except UnicodeError:
+            continue
+    return value
+
+
+def search_key(value):
+    """Stored form of a name for substring search: "LarrivÃ©e Guitars" -> "larrivee guitars"."""
+    return normalize(repair(value))[:KEY_MAX_LENGTH]
+
+
+def sort_key(value):
+    """
+    Stored form of a name for ordering: the search key without punctuation, so
+    ".strandberg" and "A&B" file under their letters. Compared bytewise everywhere
+    (the column uses the "C" collation on Postgres).
+    """
+    return _whitespace.sub(" ", _punctuation.sub("", search_key(value))).strip()
+
+
+def name_keys(value):
+    return {"sort_key": sort_key(value), "search_key": search_key(value)}
@@ -7,6 +7,8 @@ from .views import (
     VendorViewSet,
     SupplierViewSet,
     CategoryViewSet,
+    autocomplete,
+    events,
     frontend,
 )
 
@@ -17,5 +19,7 @@ router.register(r"categories", CategoryViewSet)
 
 urlpatterns = [
     path("", frontend, name="frontend"),
+    path("routes/autocomplete/", autocomplete, name="autocomplete"),
+    path("routes/events/", events, name="events"),
     path("routes/", include(router.urls)),
 ]
@@ -1,9 +1,23 @@
 # cmsa/views.py
 
-from rest_framework import viewsets
-from django.db.models import Q, Prefetch
-from .models import Vendor, Supplier, Category
+from rest_framework import serializers, status, viewsets
+from rest_framework.decorators import (
+    action,
+    api_view,
+    authentication_classes,
+    permission_classes,
+    throttle_classes,
+)
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from django.db.models import Exists, Max, OuterRef, Q, Prefetch
+from .models import Vendor, Supplier, Category, Contact
+from .bulk import create_vendors, replace_contacts, update_vendors
 from .serializers import (
+    ContactRosterSerializer,
+    VendorBulkCreateSerializer,
+    VendorBulkUpdateSerializer,
     VendorSerializer,
     VendorPublicSerializer,
     SupplierSerializer,
@@ -11,10 +25,92 @@ from .serializers import (
     CategorySerializer,
 )
 from django.db.models import Q
-from django.shortcuts import render
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404, render
 from django.views.decorators.csrf import ensure_csrf_cookie
-from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
-from .pagination import OptionalPageNumberPagination
+from django.views.decorators.http import require_GET
+from drf_spectacular.utils import (
+    extend_schema,
+    extend_schema_view,
+    inline_serializer,
+    OpenApiParameter,
+)
+from . import autocomplete as autocomplete_index, catalogue, documents, events as change_events, facets, fuzzy
+from .pagination import NAME_ORDERING, NameCursorPagination, OptionalPageNumberPagination
+from .text import search_key
+from .filters import (
+    SUPPLIER_FILTER_PARAMETERS,
+    VENDOR_FILTER_PARAMETERS,
+    filter_suppliers,
+    filter_vendors,
+    id_param,
+    search_suppliers,
+)
+from .mixins import BatchRetrieveMixin, DeltaSyncMixin, ListExtrasMixin, SparseFieldsetMixin
+
+SINCE_PARAMETER = OpenApiParameter(
+    name="since",
+    description=(
+        "ISO 8601 timestamp. Returns only rows changed after it, plus deleted ids: "
+        "{results, deleted, synced_at}. Pass synced_at as the next since."
+    ),
+    required=False,
+    type=str,
+    location=OpenApiParameter.QUERY,
+)
+
+FIELDS_PARAMETER = OpenApiParameter(
+    name="fields",
+    description=(
+        "Comma-separated fields to return; dotted paths select nested fields "
+        "(e.g. id,name,suppliers.name). Unselected relations are not fetched."
+    ),
+    required=False,
+    type=str,
+    location=OpenApiParameter.QUERY,
+)
+
+IDS_PARAMETER = OpenApiParameter(
+    name="ids",
+    description=(
+        f"Comma-separated ids (at most {BatchRetrieveMixin.max_batch_size}). Returns those "
+        "objects in the given order as a plain list; unknown ids are left out. Can't be "
+        "combined with since (or, on vendors, facets)."
+    ),
+    required=False,
+    type=str,
+    location=OpenApiParameter.QUERY,
+)
+
+
+def vendor_prefetches(view):
+    """Prefetches for serializing vendors, limited to the relations `view` will render."""
+    prefetches = []
+    if view.wants("categories"):
+        prefetches.append("categories")
+    if view.wants("suppliers"):
+        suppliers = Supplier.objects.all()
+        if view.wants("suppliers", SupplierSerializer.contact_fields):
+            suppliers = suppliers.prefetch_related("contacts")
+        prefetches.append(Prefetch("suppliers", queryset=suppliers))
+    return prefetches
+
+
+@require_GET
+def events(request):
+    """
+    /routes/events/ when served over WSGI (under ASGI, core/asgi.py streams it): sends
+    the events after the client's Last-Event-ID and closes. EventSource reconnects
+    after the `retry:` delay, so a WSGI deployment degrades to polling without holding
+    a worker per open tab.
+    """
+    last_id = change_events.parse_last_event_id(request.headers.get("Last-Event-ID"))
+    messages, _ = change_events.backlog(last_id)
+    body = f"retry: {change_events.RETRY_MS}\n\n".encode() + b"".join(messages)
+    response = HttpResponse(body, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    return response
+
 
 @ensure_csrf_cookie
 def frontend(request):
@@ -32,6 +128,26 @@ def frontend(request):
                 type=str,
                 location=OpenApiParameter.QUERY,
             ),
+            OpenApiParameter(
+                name="fuzzy",
+                description=(
+                    "1 to tolerate typos in search: also matches the closest known spelling "
+                    'and adds a "suggestion" key (the corrected query, or null).'
+                ),
+                required=False,
+                type=bool,
+                location=OpenApiParameter.QUERY,
+            ),
+            OpenApiParameter(
+                name="facets",
+                description=(
+                    f"Comma-separated subset of {','.join(facets.FACETS)}. Adds a \"facets\" key "
+                    "with the number of matching vendors per category/supplier, highest first."
+                ),
+                required=False,
+                type=str,
+                location=OpenApiParameter.QUERY,
+            ),
             OpenApiParameter(
                 name="page",
                 description="Page number (enables pagination when provided).",
@@ -46,47 +162,318 @@ def frontend(request):
                 type=int,
                 location=OpenApiParameter.QUERY,
             ),
+            *VENDOR_FILTER_PARAMETERS,
+            IDS_PARAMETER,
+            SINCE_PARAMETER,
+            FIELDS_PARAMETER,
         ],
     ),
-    retrieve=extend_schema(tags=["vendors"], summary="Retrieve a vendor"),
+    retrieve=extend_schema(
+        tags=["vendors"], summary="Retrieve a vendor", parameters=[FIELDS_PARAMETER]
+    ),
 )
-class VendorViewSet(viewsets.ModelViewSet):
+class VendorViewSet(
+    BatchRetrieveMixin, ListExtrasMixin, SparseFieldsetMixin, DeltaSyncMixin, viewsets.ModelViewSet
+):
     pagination_class = OptionalPageNumberPagination
+    batch_conflicts = ("since", "facets")
 
-    queryset = Vendor.objects.prefetch_related(
-        "categories",
-        Prefetch(
-            "suppliers",
-            queryset=Supplier.objects.prefetch_related("contacts"),
-        ),
-    )
+    queryset = Vendor.objects.all()
+
+    def get_prefetches(self):
+        return vendor_prefetches(self)
+
+    @property
+    def fuzzy(self):
+        return self.request.query_params.get("fuzzy", "").lower() in ("1", "true", "yes")
+
+    @property
+    def suggestion(self):
+        """Corrected search term under ?fuzzy=1 (None if nothing to correct)."""
+        if not hasattr(self, "_suggestion"):
+            search_term = self.request.query_params.get("search")
+            self._suggestion = (
+                fuzzy.get_index().correct(search_term) if search_term and self.fuzzy else None
+            )
+        return self._suggestion
+
+    @staticmethod
+    def search_filter(term):
+        key = search_key(term)
+        return (
+            Q(search_key__contains=key)
+            | Q(suppliers__search_key__contains=key)
+            | Q(categories__search_key__contains=key)
+        )
+
+    @property
+    def catalogue_fresh(self):
+        if not hasattr(self, "_catalogue_fresh"):
+            self._catalogue_fresh = catalogue.is_fresh()
+        return self._catalogue_fresh
 
     def get_queryset(self):
-        qs = super().get_queryset()
-        search_term = self.request.query_params.get("search")
+        qs = super().get_queryset().prefetch_related(*self.get_prefetches())
+        params = self.request.query_params
+        search_term = params.get("search")
+        if not search_term:
+            return filter_vendors(qs, params).order_by(*NAME_ORDERING)
 
-        if search_term:
-            qs = qs.filter(
-                Q(name__icontains=search_term)
-                | Q(suppliers__name__icontains=search_term)
-                | Q(categories__name__icontains=search_term)
-            ).distinct()
+        terms = [search_term, self.suggestion] if self.suggestion else [search_term]
+        if self.catalogue_fresh:
+            matches = catalogue.search_vendors(
+                terms, category=id_param(params, "category"), supplier=id_param(params, "supplier")
+            )
+            return qs.filter(pk__in=matches).order_by(*NAME_ORDERING)
 
-        return qs.order_by("name")
+        catalogue.fallbacks.inc()
+        condition = Q()
+        for term in terms:
+            condition |= self.search_filter(term)
+        return filter_vendors(qs.filter(condition).distinct(), params).order_by(*NAME_ORDERING)
+
+    def get_facets(self):
+        raw = self.request.query_params.get("facets")
+        if not raw:
+            return []
+        requested = [name.strip() for name in raw.split(",") if name.strip()]
+        unknown = sorted(set(requested) - set(facets.FACETS))
+        if unknown:
+            raise ValidationError({"facets": f"Unknown facets: {', '.join(unknown)}."})
+        return list(dict.fromkeys(requested))
+
+    def count_facets(self, names):
+        params = self.request.query_params
+        if params.get("search"):
+            return facets.count_facets(self.filter_queryset(self.get_queryset()), names)
+        # Structured filters alone are answered by intersecting bitmaps.
+        index = facets.get_index()
+        selected = {name: id_param(params, name) for name in facets.FACETS}
+        return index.counts(names, vendors=index.matching(selected))
+
+    def get_list_extras(self):
+        extras = {}
+        if self.fuzzy and self.request.query_params.get("search"):
+            extras["suggestion"] = self.suggestion
+        names = self.get_facets()
+        if names:
+            extras["facets"] = self.count_facets(names)
+        return extras
 
     def get_serializer_class(self):
         return VendorSerializer if self.request.user.is_authenticated else VendorPublicSerializer
 
+    def list(self, request, *args, **kwargs):
+        # The plain full list is the stored vendor documents joined together.
+        if not request.query_params and request.accepted_renderer.format == "json":
+            queryset = Vendor.objects.order_by(*NAME_ORDERING)
+            if request.user.is_authenticated:
+                body = documents.private_list(queryset)
+            else:
+                body = documents.public_list(queryset)
+            if body is not None:
+                return HttpResponse(body, content_type="application/json")
+        return super().list(request, *args, **kwargs)
 
-class SupplierViewSet(viewsets.ModelViewSet):
+    max_bulk_size = 1000
+
+    @extend_schema(
+        methods=["POST"],
+        summary="Create vendors in bulk",
+        request=VendorBulkCreateSerializer(many=True),
+        responses={201: VendorSerializer(many=True)},
+    )
+    @extend_schema(
+        methods=["PATCH"],
+        summary="Update vendors in bulk",
+        request=VendorBulkUpdateSerializer(many=True),
+        responses={200: VendorSerializer(many=True)},
+    )
+    @action(detail=False, methods=["post", "patch"], permission_classes=[IsAuthenticated])
+    def bulk(self, request):
+        """
+        POST a list of new vendors or PATCH a list of {id, ...} changes, all in one
+        transaction. Suppliers and categories are given by id or name.
+        """
+        if not isinstance(request.data, list):
+            raise ValidationError({"non_field_errors": "Expected a list of vendors."})
+        if len(request.data) > self.max_bulk_size:
+            raise ValidationError(
+                {"non_field_errors": f"At most {self.max_bulk_size} vendors per request."}
+            )
+
+        creating = request.method == "POST"
+        serializer_class = VendorBulkCreateSerializer if creating else VendorBulkUpdateSerializer
+        serializer = serializer_class(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        write = create_vendors if creating else update_vendors
+        pks = write(serializer.validated_data)
+
+        found = Vendor.objects.filter(pk__in=pks).prefetch_related(*self.get_prefetches()).in_bulk()
+        return Response(
+            self.get_serializer([found[pk] for pk in pks], many=True).data,
+            status=status.HTTP_201_CREATED if creating else status.HTTP_200_OK,
+        )
+
+    def filter_changed_since(self, queryset, since):
+        # A vendor's representation nests suppliers, their contacts and categories.
+        # Deleted suppliers/categories/contacts touch the rows that embedded them.
+        return queryset.filter(
+            Q(updated_at__gt=since)
+            | Exists(Supplier.objects.filter(vendors=OuterRef("pk"), updated_at__gt=since))
+            | Exists(Category.objects.filter(vendors=OuterRef("pk"), updated_at__gt=since))
+            | Exists(Contact.objects.filter(supplier__vendors=OuterRef("pk"), updated_at__gt=since))
+        )
+
+    def get_last_modified(self, obj):
+        # One aggregate, whatever ?fields= left prefetched.
+        related = Vendor.objects.filter(pk=obj.pk).aggregate(
+            Max("suppliers__updated_at"),
+            Max("suppliers__contacts__updated_at"),
+            Max("categories__updated_at"),
+        )
+        return max(filter(None, [obj.updated_at, *related.values()]))
+
+
+@extend_schema_view(
+    list=extend_schema(
+        parameters=[*SUPPLIER_FILTER_PARAMETERS, IDS_PARAMETER, SINCE_PARAMETER, FIELDS_PARAMETER]
+    ),
+    retrieve=extend_schema(parameters=[FIELDS_PARAMETER]),
+)
+class SupplierViewSet(BatchRetrieveMixin, SparseFieldsetMixin, DeltaSyncMixin, viewsets.ModelViewSet):
     pagination_class = OptionalPageNumberPagination
-    queryset = Supplier.objects.prefetch_related("contacts")
+    queryset = Supplier.objects.all()
+
+    def get_queryset(self):
+        qs = super().get_queryset().order_by(*NAME_ORDERING)
+        if self.wants(SupplierSerializer.contact_fields):
+            qs = qs.prefetch_related("contacts")
+        search_term = self.request.query_params.get("search")
+        if search_term:
+            qs = search_suppliers(qs, search_term, private=self.request.user.is_authenticated)
+        return filter_suppliers(qs, self.request.query_params)
 
     def get_serializer_class(self):
+        if self.action == "vendors":
+            return VendorSerializer if self.request.user.is_authenticated else VendorPublicSerializer
         return SupplierSerializer if self.request.user.is_authenticated else SupplierPublicSerializer
 
+    @extend_schema(
+        summary="List the vendors a supplier carries",
+        parameters=[
+            OpenApiParameter(
+                name="cursor", description="Opaque cursor from the previous page's next/previous link.",
+                required=False, type=str, location=OpenApiParameter.QUERY,
+            ),
+            OpenApiParameter(
+                name="page_size", description="Page size (default 25, max 100).",
+                required=False, type=int, location=OpenApiParameter.QUERY,
+            ),
+            FIELDS_PARAMETER,
+        ],
+    )
+    @action(detail=True, methods=["get"], pagination_class=NameCursorPagination)
+    def vendors(self, request, pk=None):
+        supplier = get_object_or_404(Supplier.objects.only("pk"), pk=pk)
+        # Prefetches run per page: only the page's vendors get their relations loaded.
+        vendors = supplier.vendors.prefetch_related(*vendor_prefetches(self))
+        page = self.paginate_queryset(vendors)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @extend_schema(
+        summary="Replace a supplier's contacts",
+        request=ContactRosterSerializer(many=True),
+        responses=ContactRosterSerializer(many=True),
+    )
+    @action(detail=True, methods=["put"], permission_classes=[IsAuthenticated])
+    def contacts(self, request, pk=None):
+        """
+        Takes the full desired roster; contacts are matched by id or email and only the
+        difference is written. Exactly one primary and one "Accounting Contact" required.
+        """
+        supplier = get_object_or_404(Supplier.objects.only("pk"), pk=pk)
+        serializer = ContactRosterSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        roster = replace_contacts(supplier, serializer.validated_data)
+        return Response(ContactRosterSerializer(roster, many=True).data)
+
+    def filter_changed_since(self, queryset, since):
+        return queryset.filter(
+            Q(updated_at__gt=since)
+            | Exists(Contact.objects.filter(supplier=OuterRef("pk"), updated_at__gt=since))
+        )
 
-class CategoryViewSet(viewsets.ModelViewSet):
+    def get_last_modified(self, obj):
+        related = Supplier.objects.filter(pk=obj.pk).aggregate(Max("contacts__updated_at"))
+        return max(filter(None, [obj.updated_at, *related.values()]))
+
+
+@extend_schema_view(
+    list=extend_schema(parameters=[IDS_PARAMETER, SINCE_PARAMETER, FIELDS_PARAMETER]),
+    retrieve=extend_schema(parameters=[FIELDS_PARAMETER]),
+)
+class CategoryViewSet(BatchRetrieveMixin, SparseFieldsetMixin, DeltaSyncMixin, viewsets.ModelViewSet):
     pagination_class = OptionalPageNumberPagination
-    queryset = Category.objects.all()
-    serializer_class = CategorySerializer
\ No newline at end of file
+    queryset = Category.objects.order_by(*NAME_ORDERING)
+    serializer_class = CategorySerializer
+
+
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+
+@extend_schema(
+    tags=["search"],
+    summary="Autocomplete vendor, supplier and category names",
+    parameters=[
+        OpenApiParameter(
+            name="q", description="Prefix of any word in the name", required=True,
+            type=str, location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name="limit", description=f"Max suggestions (default 10, max {AUTOCOMPLETE_MAX_LIMIT})",
+            required=False, type=int, location=OpenApiParameter.QUERY,
+        ),
+        OpenApiParameter(
+            name="types", description="Comma-separated subset of vendor,supplier,category",
+            required=False, type=str, location=OpenApiParameter.QUERY,
+        ),
+    ],
+    responses=inline_serializer(
+        name="AutocompleteResponse",
+        fields={
+            "query": serializers.CharField(),
+            "results": inline_serializer(
+                name="AutocompleteSuggestion",
+                many=True,
+                fields={
+                    "type": serializers.CharField(),
+                    "id": serializers.IntegerField(),
+                    "name": serializers.CharField(),
+                },
+            ),
+        },
+    ),
+)
+@api_view(["GET"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@throttle_classes([])
+def autocomplete(request):
+    """
+    Typeahead suggestions from the in-process prefix index (cmsa/autocomplete.py).
+    Names are public, so the view skips authentication and never touches the database
+    once the worker's index is warm; nor is it throttled, since it fires per keystroke.
+    """
+    query = request.query_params.get("q", "")
+    try:
+        limit = min(int(request.query_params.get("limit", 10)), AUTOCOMPLETE_MAX_LIMIT)
+    except ValueError:
+        raise ValidationError({"limit": "Expected an integer."})
+    kinds = {k.strip() for k in request.query_params.get("types", "").split(",") if k.strip()}
+    unknown = kinds - set(autocomplete_index.INDEXED_MODELS)
+    if unknown:
+        raise ValidationError({"types": f"Unknown type(s): {', '.join(sorted(unknown))}"})
+
+    results = autocomplete_index.get_index().search(query, limit=max(limit, 0), kinds=kinds)
+    return Response({"query": query, "results": results})
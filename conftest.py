@@ -0,0 +1,19 @@
+# conftest.py
+
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Throttle buckets and coalescing locks live in the cache; start every test empty."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def raise_on_nplusone(settings):
+    """Fail any test whose request repeats a query (see core/nplusone.py)."""
+    settings.NPLUSONE = "raise"
+    settings.NPLUSONE_THRESHOLD = 2
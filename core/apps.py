@@ -0,0 +1,10 @@
+# core/apps.py
+
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    name = "core"
+
+    def ready(self):
+        from . import sql  # noqa: F401  (installs the slow-query log on new connections)
@@ -3,6 +3,14 @@ ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with uvicorn workers under gunicorn:
+
+    gunicorn core.asgi -k uvicorn.workers.UvicornWorker -b 0.0.0.0:8000
+
+The project middleware runs natively on the event loop (core/middleware.py); the
+DRF views are sync and cost one thread hop per request. Compare against the WSGI
+setup with benchmarks/bench_asgi.py.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.0/howto/deployment/asgi/
 """
@@ -13,4 +21,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from cmsa import events  # noqa: E402  (needs the app registry set up above)
+
+
+async def application(scope, receive, send):
+    # Django 4.0 can't stream an open-ended response under ASGI; the change-event
+    # stream is served by a raw ASGI app instead (cmsa/events.py).
+    if scope["type"] == "http" and scope["path"] == "/routes/events/":
+        return await events.stream(scope, receive, send)
+    return await django_application(scope, receive, send)
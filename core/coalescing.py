@@ -0,0 +1,165 @@
+# core/coalescing.py
+"""
+Single-flight coalescing of identical API reads.
+
+When many clients ask for the same expensive read at once (a popular ?search= right
+after a deploy, say), only the first request runs the view; the others wait for it and
+get a copy of its rendered response. Requests are identical when they share the path,
+query string, auth tier (anonymous, authenticated, staff) and the headers that change
+the rendering (Accept, conditional headers).
+
+Within a worker the wait is on a threading.Event. With REQUEST_COALESCING_SHARED the
+same happens across workers through the cache: the first worker takes a lock with
+cache.add() and publishes the response under a key named after its lock token, which
+only the requests that found the lock held will read. That needs a cache shared by the
+workers (DJANGO_CACHE_URL=redis://... or memcached); the default local-memory cache
+only spans one process.
+
+Only a response that was in flight while a request arrived is shared, so coalescing
+never serves anything older than an ordinary concurrent read would.
+"""
+
+import hashlib
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from core.metrics import counter
+
+coalesced = counter(
+    "http_coalesced_requests_total",
+    "Coalescible API reads, by role: leader (ran the view) or follower (shared its response).",
+)
+
+EXCLUDED_PATHS = ("/routes/events/",)  # answers depend on Last-Event-ID; cheap anyway
+KEY_HEADERS = ("Accept", "Accept-Language", "If-Modified-Since", "If-None-Match")
+
+
+def auth_tier(request):
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return "anon"
+    return "staff" if user.is_staff else "user"
+
+
+def coalescing_key(request):
+    """The key identifying requests that get the same response, or None if not coalescible."""
+    if request.method != "GET" or not request.path.startswith("/routes/"):
+        return None
+    if request.path in EXCLUDED_PATHS:
+        return None
+    if settings.DATABASE_REPLICA_PIN_COOKIE in request.COOKIES:
+        # Pinned to the primary after a write; a shared replica read could miss it.
+        return None
+    parts = [request.get_full_path(), auth_tier(request)]
+    parts += [request.headers.get(name, "") for name in KEY_HEADERS]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def freeze(response):
+    """The shareable parts of a rendered response, or None if it must not be shared."""
+    if response.streaming or response.status_code >= 500:
+        return None
+    # Cookies (session, CSRF, replica pin) belong to the leader's client and are not copied.
+    return response.status_code, list(response.headers.items()), response.content
+
+
+def thaw(frozen):
+    status, headers, content = frozen
+    response = HttpResponse(content, status=status)
+    for name, value in headers:
+        response[name] = value
+    return response
+
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.waiters = 0
+
+
+class CoalescingMiddleware:
+    """
+    Sync-only: a follower blocks its thread until the leader finishes. Under ASGI Django
+    runs it (and the sync views behind it) in a per-request thread, never on the loop.
+    """
+
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, request):
+        if not settings.REQUEST_COALESCING:
+            return self.get_response(request)
+        key = coalescing_key(request)
+        if key is None:
+            return self.get_response(request)
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+            else:
+                flight.waiters += 1
+
+        if not leader:
+            if flight.done.wait(settings.REQUEST_COALESCING_TIMEOUT) and flight.result is not None:
+                coalesced.inc(role="follower")
+                return thaw(flight.result)
+            # The leader's response can't be shared (or is taking too long): run our own.
+            return self.get_response(request)
+
+        try:
+            response = self._lead(request, key)
+            flight.result = freeze(response)
+            return response
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _lead(self, request, key):
+        if not settings.REQUEST_COALESCING_SHARED:
+            coalesced.inc(role="leader")
+            return self.get_response(request)
+
+        cache = caches[settings.REQUEST_COALESCING_CACHE]
+        timeout = settings.REQUEST_COALESCING_TIMEOUT
+        lock_key = f"coalesce:{key}"
+        token = uuid.uuid4().hex
+        if cache.add(lock_key, token, timeout=timeout):
+            coalesced.inc(role="leader")
+            try:
+                response = self.get_response(request)
+                frozen = freeze(response)
+                if frozen is not None:
+                    cache.set(f"{lock_key}:{token}", frozen, timeout=timeout)
+                return response
+            finally:
+                cache.delete(lock_key)
+
+        # Another worker is computing it: poll for its result while its lock is held.
+        holder = None
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            current = cache.get(lock_key)
+            holder = current or holder  # the result outlives the lock by a moment
+            frozen = cache.get(f"{lock_key}:{holder}") if holder else None
+            if frozen is not None:
+                coalesced.inc(role="follower")
+                return thaw(frozen)
+            if current is None:
+                break
+            time.sleep(settings.REQUEST_COALESCING_POLL)
+        coalesced.inc(role="leader")
+        return self.get_response(request)
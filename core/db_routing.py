@@ -0,0 +1,109 @@
+# core/db_routing.py
+"""
+Read-replica routing.
+
+Reads go to a replica only while a request has opted in (safe-method /routes/ API calls
+and the admin changelists, decided by ReplicaRoutingMiddleware). Everything else — writes,
+management commands, shells, and any read that follows a write — uses "default".
+
+Local setup with two SQLite files (copy the primary to simulate replication):
+
+    DATABASE_URL=sqlite:////tmp/primary.sqlite3
+    DATABASE_REPLICA_URLS=sqlite:////tmp/replica.sqlite3
+"""
+
+import contextvars
+import random
+import time
+
+from django.conf import settings
+
+from core.middleware import HybridMiddleware
+
+# The replica chosen for this request (None: read from the primary).
+_replica = contextvars.ContextVar("replica", default=None)
+_wrote = contextvars.ContextVar("wrote", default=False)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # Related lookups and prefetches follow the row they start from.
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        replica = _replica.get()
+        if replica is not None and not _wrote.get():
+            return replica
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        # Any write pins the rest of this request to the primary (read-your-writes).
+        _wrote.set(True)
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication, never through migrate.
+        return db == "default"
+
+
+def is_replica_eligible(request):
+    """Safe-method /routes/ API calls and admin changelists may read from a replica."""
+    if request.method not in SAFE_METHODS:
+        return False
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return False
+    if match.route.startswith("routes/"):
+        return True
+    return match.namespace == "admin" and (match.url_name or "").endswith("_changelist")
+
+
+class ReplicaRoutingMiddleware(HybridMiddleware):
+    """
+    Opts eligible requests into replica reads, unless the client wrote recently.
+
+    After an unsafe request (or any request that wrote), the response carries a short-lived
+    cookie; while it is present the client keeps reading from the primary, so a save in the
+    admin or API is always visible on the next page load.
+    """
+
+    def process_request(self, request):
+        _replica.set(None)
+        _wrote.set(False)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        replicas = getattr(settings, "DATABASE_REPLICAS", [])
+        pinned_until = request.COOKIES.get(settings.DATABASE_REPLICA_PIN_COOKIE)
+        if not replicas or (pinned_until and _pin_active(pinned_until)):
+            return None
+        if is_replica_eligible(request):
+            # One replica for the whole request, so every query sees the same lag.
+            _replica.set(random.choice(replicas))
+
+    def process_response(self, request, response):
+        if getattr(settings, "DATABASE_REPLICAS", []) and (
+            request.method not in SAFE_METHODS or _wrote.get()
+        ):
+            window = settings.DATABASE_REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                settings.DATABASE_REPLICA_PIN_COOKIE,
+                str(int(time.time() + window)),
+                max_age=window,
+                httponly=True,
+                samesite="Lax",
+            )
+        _replica.set(None)
+        return response
+
+
+def _pin_active(value):
+    try:
+        return float(value) > time.time()
+    except ValueError:
+        return False
@@ -1,14 +1,33 @@
 # core/logging.py
+import atexit
 import logging
+import logging.handlers
+import queue
 import uuid
 import contextvars
-from django.utils.deprecation import MiddlewareMixin
+
+from django.utils.functional import SimpleLazyObject, empty
+
+from core.metrics import counter
+from core.middleware import HybridMiddleware
+
+dropped_records = counter(
+    "log_records_dropped_total", "Log records dropped because the logging queue was full."
+)
 
 # Context vars survive across async contexts (safe for ASGI/gunicorn workers)
 _request_id = contextvars.ContextVar("request_id", default=None)
 _user = contextvars.ContextVar("user", default=None)
 _path = contextvars.ContextVar("path", default=None)
 _method = contextvars.ContextVar("method", default=None)
+_view = contextvars.ContextVar("view", default=None)
+
+def current_request_id():
+    return _request_id.get()
+
+def current_view():
+    """The resolved view name ("vendor-list", "login", ...) of the current request."""
+    return _view.get()
 
 class RequestContextFilter(logging.Filter):
     """Inject request-scoped fields into each log record."""
@@ -19,19 +38,80 @@ class RequestContextFilter(logging.Filter):
         record.method = _method.get() or "-"
         return True
 
-class RequestContextMiddleware(MiddlewareMixin):
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # The queue may be full at shutdown; wait for room rather than raise.
+        self.queue.put(self._sentinel)
+
+
+class QueueingHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to a background QueueListener that writes them to `handlers` (names
+    of handlers defined earlier in the same LOGGING dict; dictConfig builds handlers
+    in name order). Request threads never wait on stdout: when the bounded queue is
+    full the record is dropped and counted instead.
+
+    Filters on this handler run in the calling (request) thread, where the request's
+    context variables can still be read, so request-context filters belong here; the
+    target handlers run in the listener thread.
+    """
+
+    def __init__(self, handlers=(), queue_size=10_000):
+        targets = []
+        for name in handlers:
+            target = logging._handlers.get(name)  # what logging.getHandlerByName does in 3.12
+            if target is None:
+                raise ValueError(f"QueueingHandler target {name!r} is not configured")
+            targets.append(target)
+        super().__init__(queue.Queue(queue_size))
+        self.listener = _Listener(self.queue, *targets, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.stop_listener)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped_records.inc()
+
+    def stop_listener(self):
+        """Flush the queue and stop the writer thread (at exit, or when closed)."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def close(self):
+        # dictConfig closes the old handlers when logging is reconfigured.
+        self.stop_listener()
+        super().close()
+
+
+def request_username(request, resolve=True):
+    """
+    The request's username, or None. With resolve=False a user that hasn't been loaded
+    yet is left alone: loading it queries the session and user tables, which must not
+    happen on the event loop under ASGI.
+    """
+    user = getattr(request, "user", None)
+    if not resolve and isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return None
+    return getattr(user, "username", None)
+
+class RequestContextMiddleware(HybridMiddleware):
     def process_request(self, request):
         rid = request.headers.get("X-Request-ID") or str(uuid.uuid4())
         _request_id.set(rid)
         _path.set(getattr(request, "path", "-"))
         _method.set(getattr(request, "method", "-"))
-        username = getattr(getattr(request, "user", None), "username", None)
-        _user.set(username or "-")
+        _view.set(None)
+        _user.set(request_username(request, resolve=not self.is_async) or "-")
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        _view.set(match.view_name if match is not None else None)
 
     def process_response(self, request, response):
         # Update to final user (e.g., after login)
-        username = getattr(getattr(request, "user", None), "username", None)
-        _user.set(username or "-")
+        _user.set(request_username(request, resolve=not self.is_async) or "-")
 
         rid = _request_id.get()
         if rid:
@@ -0,0 +1,55 @@
+# core/middleware.py
+
+import asyncio
+
+
+class HybridMiddleware:
+    """
+    Base for middleware that runs natively under both WSGI and ASGI.
+
+    Django's MiddlewareMixin hooks are sync-only, so under ASGI every process_request /
+    process_response call is pushed through sync_to_async: a thread hop per hook per
+    request. Subclasses of this class keep the same hook names but must only do cheap,
+    non-blocking work in them; the hooks then run inline on the event loop, and a
+    process_view hook is exposed as a coroutine so Django doesn't wrap it either.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Marks the instance as a coroutine function for Django's handler (what
+            # asgiref's markcoroutinefunction does in later releases).
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+            if hasattr(self, "process_view"):
+                self.process_view = self._async_hook(self.process_view)
+
+    @staticmethod
+    def _async_hook(hook):
+        async def run(*args, **kwargs):
+            return hook(*args, **kwargs)
+
+        return run
+
+    def process_request(self, request):
+        return None
+
+    def process_response(self, request, response):
+        return response
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        response = self.process_request(request)
+        if response is None:
+            response = self.get_response(request)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        response = self.process_request(request)
+        if response is None:
+            response = await self.get_response(request)
+        return self.process_response(request, response)
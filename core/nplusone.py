@@ -0,0 +1,143 @@
+# core/nplusone.py
+"""
+N+1 query detector, for development, tests and staging.
+
+With NPLUSONE set to "log" or "raise", every SELECT a request runs is fingerprinted
+(core/sql.py: literals and placeholders folded, so `WHERE supplier_id = 1` and
+`= 2` match). When one fingerprint runs more than NPLUSONE_THRESHOLD times in a
+request, the stack at that point is summarized down to this project's own frames
+(the serializer method, admin `display_*` or view that issued it), and at the end
+of the request the offenders are logged at WARNING on "core.nplusone" ("log") or
+raised as NPlusOneError ("raise"; the tests run with it). "off", the default,
+costs one settings lookup per request.
+"""
+
+import contextvars
+import logging
+import os
+import traceback
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from core.logging import current_view
+from core.metrics import counter
+from core.middleware import HybridMiddleware
+from core.sql import fingerprint
+
+logger = logging.getLogger(__name__)
+
+detections = counter("nplusone_detections_total", "Requests that repeated a query past NPLUSONE_THRESHOLD, by view.")
+
+CALL_SITE_FRAMES = 4
+_DJANGO_DB = os.sep.join(("", "django", "db", ""))
+
+_recorder = contextvars.ContextVar("nplusone_recorder", default=None)
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def call_site():
+    """The innermost project frames that led to the current query, outermost first."""
+    base = str(settings.BASE_DIR) + os.sep
+    stack = traceback.extract_stack()
+    # Stop where the ORM takes over; below are its internals and the execute wrappers.
+    orm = next(
+        (i for i, frame in enumerate(stack) if _DJANGO_DB in frame.filename),
+        len(stack),
+    )
+    frames = [
+        frame
+        for frame in stack[:orm]
+        if frame.filename.startswith(base) and "site-packages" + os.sep not in frame.filename
+    ]
+    return " > ".join(
+        f"{os.path.relpath(frame.filename, base)}:{frame.lineno} {frame.name}"
+        for frame in frames[-CALL_SITE_FRAMES:]
+    ) or "-"
+
+
+class Recorder:
+    """SELECT counts per fingerprint for one request, and where the repeats came from."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = Counter()
+        self.sql = {}
+        self.call_sites = {}
+
+    def record(self, sql):
+        key, normalized = fingerprint(sql)
+        self.counts[key] += 1
+        if self.counts[key] == self.threshold + 1:
+            self.sql[key] = normalized
+            self.call_sites[key] = call_site()
+
+    def offenders(self):
+        """(count, normalized SQL, call site) for each repeated query, most repeated first."""
+        return sorted(
+            ((self.counts[key], self.sql[key], self.call_sites[key]) for key in self.sql),
+            reverse=True,
+        )
+
+
+def detect_repeats(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is not None and not many and sql.lstrip()[:6].upper() == "SELECT":
+        recorder.record(sql)
+    return execute(sql, params, many, context)
+
+
+def install_detector(connection, **kwargs):
+    if detect_repeats not in connection.execute_wrappers:
+        connection.execute_wrappers.append(detect_repeats)
+
+
+connection_created.connect(install_detector)
+
+
+class NPlusOneMiddleware(HybridMiddleware):
+    """
+    Place it after RequestContextMiddleware (for the view name) and before
+    CoalescingMiddleware, so a shared response is checked by the request that ran it.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        for connection in connections.all():
+            install_detector(connection)
+
+    def process_request(self, request):
+        request._nplusone_token = None
+        if settings.NPLUSONE == "off":
+            return
+        # The Recorder is shared with the view's thread through the copied context.
+        request._nplusone_token = _recorder.set(Recorder(settings.NPLUSONE_THRESHOLD))
+
+    def process_response(self, request, response):
+        token = getattr(request, "_nplusone_token", None)
+        if token is None:
+            return response
+        recorder = _recorder.get()
+        _recorder.reset(token)
+        offenders = recorder.offenders()
+        if not offenders:
+            return response
+
+        view = current_view() or request.path
+        detections.inc(view=view)
+        report = "\n".join(f"  x{count} {sql}\n    at {site}" for count, sql, site in offenders)
+        if settings.NPLUSONE == "raise":
+            raise NPlusOneError(f"{len(offenders)} repeated queries in {view}:\n{report}")
+        logger.warning(
+            "%d repeated queries in %s:\n%s",
+            len(offenders),
+            view,
+            report,
+            extra={"view": view, "repeated_queries": [count for count, _, _ in offenders]},
+        )
+        return response
@@ -0,0 +1,194 @@
+# core/profiling.py
+"""
+On-demand profiling of a single API request, for staff.
+
+Adding `_profile=cpu` or `_profile=sql` to a /routes/ URL, while signed in (session
+auth) as a staff user, runs the request as usual but replies with a profile instead
+of its body (the normal status is kept in X-Profile-Status):
+
+- cpu: a sampling profiler reads the request thread's stack every
+  PROFILE_SAMPLE_INTERVAL seconds and returns the stacks in the collapsed format
+  ("outer;inner;leaf count" per line) that flamegraph.pl and speedscope read.
+- sql: every query with its time, then EXPLAIN for the slowest SELECTs (EXPLAIN
+  ANALYZE on Postgres, run in a transaction that is rolled back).
+
+The `_profile` parameter is removed before the view sees the request, so the view
+takes the same path as the unprofiled request. Other requests pay one substring check.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.http import HttpResponse, QueryDict
+
+MODES = ("cpu", "sql")
+EXPLAINED_QUERIES = 10
+
+
+def profile_mode(request):
+    """"cpu" or "sql" when this request asks for (and may have) a profile, else None."""
+    if "_profile=" not in request.META.get("QUERY_STRING", ""):
+        return None
+    mode = request.GET.get("_profile")
+    if mode not in MODES or not request.path.startswith("/routes/"):
+        return None
+    user = getattr(request, "user", None)
+    if user is None or not user.is_staff:
+        return None
+    return mode
+
+
+def strip_profile_param(request):
+    query = request.GET.copy()
+    del query["_profile"]
+    request.GET = QueryDict(query.urlencode())
+    request.META["QUERY_STRING"] = request.GET.urlencode()
+
+
+# --- CPU -----------------------------------------------------------------------------
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    if "site-packages" + os.sep in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[1]
+    elif filename.startswith(str(settings.BASE_DIR)):
+        filename = os.path.relpath(filename, settings.BASE_DIR)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples one thread's stack on a background thread until stopped."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while True:  # at least one sample, however short the request
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+            if self._stop.wait(self.interval):
+                return
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+# --- SQL -----------------------------------------------------------------------------
+
+
+class QueryRecorder:
+    """Execute wrapper recording every query's SQL, parameters, database and duration."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.queries.append((elapsed, context["connection"].alias, sql, params, many))
+
+
+def explain(alias, sql, params):
+    connection = connections[alias]
+    if connection.vendor == "postgresql":
+        prefix = connection.ops.explain_query_prefix(analyze=True, buffers=True)
+    else:
+        prefix = connection.ops.explain_query_prefix()
+    # ANALYZE runs the statement again; only SELECTs are explained, and any locks or
+    # side effects are rolled back.
+    with transaction.atomic(using=alias):
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql}", params)
+            rows = cursor.fetchall()
+        transaction.set_rollback(True, using=alias)
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+def sql_report(queries):
+    total = sum(query[0] for query in queries)
+    lines = [f"{len(queries)} queries, {total:.1f} ms", ""]
+    for number, (elapsed, alias, sql, params, many) in enumerate(queries, 1):
+        lines.append(f"#{number} {elapsed:.2f} ms [{alias}]{' executemany' if many else ''}")
+        lines.append(f"  {sql}")
+        if params:
+            lines.append(f"  params: {params!r}")
+    duplicates = Counter(query[2] for query in queries)
+    repeated = [(count, sql) for sql, count in duplicates.items() if count > 1]
+    if repeated:
+        lines += ["", "Repeated statements:"]
+        lines += [f"  x{count} {sql}" for count, sql in sorted(repeated, reverse=True)]
+
+    selects = [query for query in queries if query[2].lstrip().upper().startswith("SELECT") and not query[4]]
+    for elapsed, alias, sql, params, _ in sorted(selects, key=lambda query: -query[0])[:EXPLAINED_QUERIES]:
+        lines += ["", f"EXPLAIN ({elapsed:.2f} ms) {sql}"]
+        try:
+            lines.append(explain(alias, sql, params))
+        except Exception as exc:  # report it; the profile is still useful without it
+            lines.append(f"  explain failed: {exc}")
+    return "\n".join(lines) + "\n"
+
+
+# --- Middleware ----------------------------------------------------------------------
+
+
+class ProfilingMiddleware:
+    """Sync-only, like the views it profiles; place it last so it wraps just the view."""
+
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = profile_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        strip_profile_param(request)
+
+        if mode == "cpu":
+            with StackSampler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL) as sampler:
+                response = self.get_response(request)
+            body = sampler.collapsed()
+        else:
+            recorder = QueryRecorder()
+            wrappers = [connection.execute_wrapper(recorder) for connection in connections.all()]
+            for wrapper in wrappers:
+                wrapper.__enter__()
+            try:
+                response = self.get_response(request)
+            finally:
+                for wrapper in reversed(wrappers):
+                    wrapper.__exit__(None, None, None)
+            body = sql_report(recorder.queries)
+
+        profile = HttpResponse(body, content_type="text/plain; charset=utf-8")
+        profile["X-Profile-Status"] = str(response.status_code)
+        profile["Cache-Control"] = "no-store"
+        return profile
@@ -1,24 +1,42 @@
 # core/request_logging.py
 
+import random
 import time, logging
-from django.utils.deprecation import MiddlewareMixin
+
+from django.conf import settings
+
+from core.logging import request_username
+from core.middleware import HybridMiddleware
 
 req_logger = logging.getLogger("core.request")
 
-class RequestLogMiddleware(MiddlewareMixin):
+
+def should_log(status, duration_ms):
+    """Errors (4xx and 5xx) and slow requests always; others 1 in LOG_SAMPLE_RATE."""
+    if status >= 400 or duration_ms >= settings.LOG_SLOW_REQUEST_MS:
+        return True
+    rate = settings.LOG_SAMPLE_RATE
+    return rate <= 1 or random.random() * rate < 1
+
+
+class RequestLogMiddleware(HybridMiddleware):
     def process_request(self, request):
         request._start_ts = time.time()
 
     def process_response(self, request, response):
         dur_ms = int((time.time() - getattr(request, "_start_ts", time.time())) * 1000)
+        status = getattr(response, "status_code", 0)
+        if not should_log(status, dur_ms) or not req_logger.isEnabledFor(logging.INFO):
+            return response
         req_logger.info(
             "request complete",
             extra={
-                "status": getattr(response, "status_code", 0),
+                "status": status,
                 "duration_ms": dur_ms,
                 "path": getattr(request, "path", "-"),
                 "method": getattr(request, "method", "-"),
-                "user": getattr(getattr(request, "user", None), "username", "-"),
+                "user": request_username(request, resolve=not self.is_async) or "-",
+                "sample_rate": settings.LOG_SAMPLE_RATE,
             },
         )
-        return response
\ No newline at end of file
+        return response
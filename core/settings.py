@@ -2,7 +2,9 @@
 
 import os
 from pathlib import Path
+import dj_database_url
 from environs import Env
+from marshmallow.validate import OneOf
 
 env = Env()
 env.read_env()
@@ -33,6 +35,7 @@ INSTALLED_APPS = [
     "whitenoise.runserver_nostatic",
     "django.contrib.staticfiles",
     # Local
+    "core.apps.CoreConfig",
     "accounts.apps.AccountsConfig",
     "cmsa.apps.CmsaConfig",
     "rest_framework",
@@ -53,6 +56,11 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "core.request_logging.RequestLogMiddleware",
     "core.logging.RequestContextMiddleware",
+    "core.tracing.TracingMiddleware",
+    "core.db_routing.ReplicaRoutingMiddleware",
+    "core.nplusone.NPlusOneMiddleware",
+    "core.coalescing.CoalescingMiddleware",
+    "core.profiling.ProfilingMiddleware",
 ]
 
 AUTH_USER_MODEL = "accounts.CustomUser"
@@ -61,7 +69,9 @@ ROOT_URLCONF = "core.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates with a tracing span per render; keeps the engine's usual name.
+        "BACKEND": "core.tracing.TracedDjangoTemplates",
+        "NAME": "django",
         "DIRS": [os.path.join(BASE_DIR, "static")],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -80,6 +90,19 @@ REST_FRAMEWORK = {
         "rest_framework.authentication.SessionAuthentication",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # Token buckets per user or IP (core/throttling.py): "N/period" is a burst of N
+    # refilling at N per period.
+    "DEFAULT_THROTTLE_CLASSES": (
+        "core.throttling.SearchThrottle",
+        "core.throttling.ListThrottle",
+    ),
+    "DEFAULT_THROTTLE_RATES": {
+        "search": env.str("DJANGO_THROTTLE_SEARCH", default="30/min"),
+        "list": env.str("DJANGO_THROTTLE_LIST", default="300/min"),
+        "auth": env.str("DJANGO_THROTTLE_AUTH", default="10/min"),
+    },
+    # Proxies in front of the app, so throttles key on the real client address.
+    "NUM_PROXIES": env.int("DJANGO_NUM_PROXIES", default=None),
 }
 
 SPECTACULAR_SETTINGS = {
@@ -91,9 +114,55 @@ SPECTACULAR_SETTINGS = {
     "SERVE_INCLUDE_SCHEMA": False,  # UI endpoints will call the schema view by name
 }
 
+# Seconds before a worker rebuilds its in-memory name indexes (autocomplete, fuzzy search)
+# from the database. Writes made by the same worker are applied immediately through signals.
+NAME_INDEX_MAX_AGE = env.int("DJANGO_NAME_INDEX_MAX_AGE", default=300)
+
+# Cache: local memory by default; a shared one (redis://..., pymemcache://...) lets
+# request coalescing span workers.
+CACHES = {"default": env.dj_cache_url("DJANGO_CACHE_URL", default="locmem://")}
+
+# Concurrent identical GET /routes/ requests share one view run (see core/coalescing.py).
+REQUEST_COALESCING = env.bool("DJANGO_REQUEST_COALESCING", default=True)
+REQUEST_COALESCING_SHARED = env.bool("DJANGO_REQUEST_COALESCING_SHARED", default=False)
+REQUEST_COALESCING_CACHE = "default"
+REQUEST_COALESCING_TIMEOUT = env.float("DJANGO_REQUEST_COALESCING_TIMEOUT", default=10.0)
+REQUEST_COALESCING_POLL = 0.02
+
+# Bearer token for scraping /metrics without a staff session (empty: staff only).
+METRICS_TOKEN = env.str("DJANGO_METRICS_TOKEN", default="")
+
+
+# Request tracing (core/tracing.py): the fraction of requests traced, and where the
+# OTLP/JSON traces go (a file path, or an OTLP/HTTP URL such as a local collector).
+TRACE_SAMPLE_RATE = env.float("DJANGO_TRACE_SAMPLE_RATE", default=0.0)
+TRACE_EXPORT = env.str("DJANGO_TRACE_EXPORT", default="")
+TRACE_SERVICE_NAME = "cmsa"
+TRACE_MAX_SPANS = 2000  # per trace; further spans are counted, not kept
+
+
+# Queries at least this slow (ms) are logged and aggregated in the SlowQuery admin
+# (core/sql.py); 0 turns the slow-query log off.
+SLOW_QUERY_MS = env.int("DJANGO_SLOW_QUERY_MS", default=500)
+
+# N+1 detection (core/nplusone.py): "off", "log" (staging) or "raise" (the tests), when
+# one SELECT runs more than NPLUSONE_THRESHOLD times in a request.
+NPLUSONE = env.str("DJANGO_NPLUSONE", default="off", validate=OneOf(("off", "log", "raise")))
+NPLUSONE_THRESHOLD = env.int("DJANGO_NPLUSONE_THRESHOLD", default=5)
+
+# Seconds between stack samples for staff ?_profile=cpu requests (core/profiling.py).
+PROFILE_SAMPLE_INTERVAL = 0.001
+
 
 LOG_JSON = env.bool("DJANGO_LOG_JSON", default=False)
 LOG_LEVEL = env.str("DJANGO_LOG_LEVEL", default="INFO")
+# Records go through a bounded queue to a background writer; when it is full they are
+# dropped (counted as log_records_dropped_total) rather than blocking the request.
+LOG_QUEUE_SIZE = env.int("DJANGO_LOG_QUEUE_SIZE", default=10_000)
+# Request log sampling: 4xx/5xx and requests slower than LOG_SLOW_REQUEST_MS are always
+# logged, other requests 1 in LOG_SAMPLE_RATE (1: all).
+LOG_SAMPLE_RATE = env.int("DJANGO_LOG_SAMPLE_RATE", default=1)
+LOG_SLOW_REQUEST_MS = env.int("DJANGO_LOG_SLOW_REQUEST_MS", default=1000)
 
 LOGGING = {
     "version": 1,
@@ -118,18 +187,24 @@ LOGGING = {
     "handlers": {
         "console": {
             "class": "logging.StreamHandler",
-            "filters": ["request_context"],
             "formatter": "json" if LOG_JSON else "plain",
         },
+        # Every logger writes here; a background thread feeds "console".
+        "queue": {
+            "()": "core.logging.QueueingHandler",
+            "handlers": ["console"],
+            "queue_size": LOG_QUEUE_SIZE,
+            "filters": ["request_context"],
+        },
     },
     "loggers": {
-        "django": {"handlers": ["console"], "level": "ERROR"},
-        "django.request": {"handlers": ["console"], "level": "ERROR", "propagate": False},
-        "core": {"handlers": ["console"], "level": LOG_LEVEL, "propagate": False},
-        "accounts": {"handlers": ["console"], "level": LOG_LEVEL, "propagate": False},
-        "gunicorn.error": {"handlers": ["console"], "level": LOG_LEVEL, "propagate": False},
-        "gunicorn.access": {"handlers": ["console"], "level": LOG_LEVEL, "propagate": False},
-        "core.request": {"handlers": ["console"], "level": LOG_LEVEL, "propagate": False},
+        "django": {"handlers": ["queue"], "level": "ERROR"},
+        "django.request": {"handlers": ["queue"], "level": "ERROR", "propagate": False},
+        "core": {"handlers": ["queue"], "level": LOG_LEVEL, "propagate": False},
+        "accounts": {"handlers": ["queue"], "level": LOG_LEVEL, "propagate": False},
+        "gunicorn.error": {"handlers": ["queue"], "level": LOG_LEVEL, "propagate": False},
+        "gunicorn.access": {"handlers": ["queue"], "level": LOG_LEVEL, "propagate": False},
+        "core.request": {"handlers": ["queue"], "level": LOG_LEVEL, "propagate": False},
     },
 }
 
@@ -169,6 +244,20 @@ DATABASES = {
     )
 }
 
+# Read replicas: comma-separated database URLs, exposed as "replica_0", "replica_1", ...
+# Safe-method API requests and admin changelists read from them (see core/db_routing.py).
+DATABASE_REPLICAS = []
+for i, replica_url in enumerate(env.list("DATABASE_REPLICA_URLS", default=[])):
+    alias = f"replica_{i}"
+    DATABASES[alias] = {**dj_database_url.parse(replica_url), "TEST": {"MIRROR": "default"}}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["core.db_routing.ReplicaRouter"]
+
+# After a write, the client keeps reading from the primary for this many seconds.
+DATABASE_REPLICA_STICKY_SECONDS = env.int("DATABASE_REPLICA_STICKY_SECONDS", default=5)
+DATABASE_REPLICA_PIN_COOKIE = "db_primary_pin"
+
 
 # Password validation
 
@@ -0,0 +1,188 @@
+# core/sql.py
+"""
+Slow-query log.
+
+An execute wrapper on every database connection times each query. One that takes
+SLOW_QUERY_MS or longer is logged at WARNING on "core.sql" with its duration, the
+view that ran it (the request id comes from the logging context) and its fingerprint:
+the SQL with literals and placeholders replaced by "?" and IN/VALUES lists folded,
+so the same ORM query with different arguments aggregates as one statement.
+
+Slow queries are also aggregated per fingerprint in the SlowQuery table (admin:
+Cmsa > Slow queries, sorted by total time). Observations are buffered in the worker
+and written when the request finishes, outside the request's transaction and after
+the response is sent; the first occurrence of a fingerprint also stores its EXPLAIN.
+"""
+
+import contextvars
+import hashlib
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from core.logging import current_view
+
+logger = logging.getLogger(__name__)
+
+MAX_PENDING = 1000  # fingerprints buffered between flushes; more are only logged
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_SPACE = re.compile(r"\s+")
+
+# Set while the wrapper itself queries (flushing, EXPLAIN), so those aren't timed.
+_suspended = contextvars.ContextVar("slow_query_suspended", default=False)
+
+
+def normalize(sql):
+    sql = _STRING.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _LIST.sub("(...)", sql)
+    sql = _ROWS.sub("(...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def fingerprint(sql):
+    """(fingerprint, normalized SQL) for a statement."""
+    normalized = normalize(sql)
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16], normalized
+
+
+class Pending:
+    """Slow-query observations not yet written to the SlowQuery table."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def add(self, key, normalized, elapsed_ms, view, alias, sql, params):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= MAX_PENDING:
+                    return
+                entry = self._entries[key] = {
+                    "sql": normalized,
+                    "calls": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    # The first occurrence is the one EXPLAINed.
+                    "sample": (alias, sql, params),
+                }
+            entry["calls"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["view"] = view
+
+    def take(self):
+        with self._lock:
+            entries, self._entries = self._entries, {}
+        return entries
+
+
+pending = Pending()
+
+
+def log_slow_queries(execute, sql, params, many, context):
+    if _suspended.get():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        threshold = settings.SLOW_QUERY_MS
+        if threshold and elapsed_ms >= threshold:
+            key, normalized = fingerprint(sql)
+            view = current_view() or "-"
+            logger.warning(
+                "slow query %.1f ms in %s: %s",
+                elapsed_ms,
+                view,
+                normalized,
+                extra={"duration_ms": round(elapsed_ms, 1), "fingerprint": key, "view": view},
+            )
+            alias = context["connection"].alias
+            pending.add(key, normalized, elapsed_ms, view, alias, sql, None if many else params)
+
+
+def install_slow_query_log(connection, **kwargs):
+    if log_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_slow_queries)
+
+
+connection_created.connect(install_slow_query_log)
+
+
+def explain(alias, sql, params):
+    """Plain EXPLAIN (the query is not run again); None for anything but a SELECT."""
+    if not sql.lstrip().upper().startswith("SELECT") or params is None:
+        return None
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+        return "\n".join(str(row[-1]) for row in cursor.fetchall())
+
+
+def _accumulate(model, key, entry, now):
+    return model.objects.filter(fingerprint=key).update(
+        calls=F("calls") + entry["calls"],
+        total_ms=F("total_ms") + entry["total_ms"],
+        max_ms=Greatest("max_ms", entry["max_ms"]),
+        last_view=entry["view"],
+        last_seen=now,
+    )
+
+
+def flush(**kwargs):
+    """Write buffered observations to the SlowQuery table (connected to request_finished)."""
+    entries = pending.take()
+    if not entries:
+        return
+    from cmsa.models import SlowQuery
+
+    token = _suspended.set(True)
+    try:
+        now = timezone.now()
+        for key, entry in entries.items():
+            if _accumulate(SlowQuery, key, entry, now):
+                continue
+            try:
+                plan = explain(*entry["sample"])
+            except Exception as exc:
+                plan = f"EXPLAIN failed: {exc}"
+            _, created = SlowQuery.objects.get_or_create(
+                fingerprint=key,
+                defaults={
+                    "sql": entry["sql"],
+                    "calls": entry["calls"],
+                    "total_ms": entry["total_ms"],
+                    "max_ms": entry["max_ms"],
+                    "last_view": entry["view"],
+                    "explain": plan or "",
+                    "first_seen": now,
+                    "last_seen": now,
+                },
+            )
+            if not created:  # another worker stored it first
+                _accumulate(SlowQuery, key, entry, now)
+    except Exception:
+        logger.exception("could not record slow queries")
+    finally:
+        _suspended.reset(token)
+
+
+request_finished.connect(flush)
@@ -0,0 +1,112 @@
+# core/test_coalescing.py
+
+import threading
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from core.coalescing import CoalescingMiddleware, coalescing_key
+
+shared = override_settings(REQUEST_COALESCING_SHARED=True)
+
+
+class SlowView:
+    """Counts its runs; each run blocks until `release` is set."""
+
+    def __init__(self):
+        self.runs = 0
+        self.release = threading.Event()
+
+    def __call__(self, request):
+        self.runs += 1
+        self.release.wait(5)
+        response = HttpResponse(f"run {self.runs}", content_type="application/json")
+        response.set_cookie("csrftoken", "leader-only")
+        return response
+
+
+def get(path="/routes/vendors/?search=guitar", **headers):
+    request = RequestFactory().get(path, **headers)
+    request.user = AnonymousUser()
+    return request
+
+
+def fire(middlewares, count):
+    """Send `count` identical requests concurrently, spread over `middlewares`."""
+    responses = [None] * count
+
+    def send(i):
+        responses[i] = middlewares[i % len(middlewares)](get())
+
+    threads = [threading.Thread(target=send, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, responses
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_concurrent_identical_reads_share_one_view_run():
+    view = SlowView()
+    middleware = CoalescingMiddleware(view)
+    threads, responses = fire([middleware], 5)
+    wait_for(lambda: sum(flight.waiters for flight in middleware._flights.values()) == 4)
+    view.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert view.runs == 1
+    assert {response.content for response in responses} == {b"run 1"}
+    assert all(response["Content-Type"] == "application/json" for response in responses)
+    # Only the leader's own client gets its cookies.
+    assert sum("csrftoken" in response.cookies for response in responses) == 1
+
+
+def test_sequential_reads_are_not_shared():
+    view = SlowView()
+    view.release.set()
+    middleware = CoalescingMiddleware(view)
+
+    assert middleware(get()).content == b"run 1"
+    assert middleware(get()).content == b"run 2"
+
+
+@shared
+def test_shared_cache_coalesces_across_workers():
+    view = SlowView()
+    workers = [CoalescingMiddleware(view), CoalescingMiddleware(view)]
+    threads, responses = fire(workers, 2)
+    wait_for(lambda: view.runs == 1)
+    time.sleep(0.1)  # the other worker is now polling the cache
+    view.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert view.runs == 1
+    assert [response.content for response in responses] == [b"run 1", b"run 1"]
+
+
+def test_key_separates_what_changes_the_response():
+    base = coalescing_key(get())
+    assert coalescing_key(get()) == base
+    assert coalescing_key(get("/routes/vendors/?search=drum")) != base
+    assert coalescing_key(get(HTTP_ACCEPT="text/html")) != base
+
+    signed_in = get()
+    signed_in.user = type("User", (), {"is_authenticated": True, "is_staff": False})()
+    assert coalescing_key(signed_in) != base
+
+
+def test_unsafe_pinned_and_non_api_requests_are_not_coalesced(settings):
+    assert coalescing_key(RequestFactory().post("/routes/vendors/bulk/")) is None
+    assert coalescing_key(get("/admin/")) is None
+    assert coalescing_key(get("/routes/events/")) is None
+    pinned = get()
+    pinned.COOKIES[settings.DATABASE_REPLICA_PIN_COOKIE] = "1"
+    assert coalescing_key(pinned) is None
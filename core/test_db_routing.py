@@ -0,0 +1,115 @@
+# core/test_db_routing.py
+
+import time
+
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import resolve
+
+from cmsa.models import Vendor
+from core.db_routing import ReplicaRouter, ReplicaRoutingMiddleware
+
+router = ReplicaRouter()
+replicas = override_settings(DATABASE_REPLICAS=["replica_0"])
+no_replicas = override_settings(DATABASE_REPLICAS=[])
+
+
+def run_request(method, path, cookies=None, write=False, reads=1):
+    """Push a request through the middleware and report where the view's reads went."""
+    seen = {}
+
+    def view(request):
+        if write:
+            router.db_for_write(Vendor)
+        dbs = {router.db_for_read(Vendor) for _ in range(reads)}
+        (seen["db"],) = dbs  # every read in a request hits the same database
+        return HttpResponse()
+
+    request = getattr(RequestFactory(), method.lower())(path)
+    request.COOKIES.update(cookies or {})
+    request.resolver_match = resolve(path)
+
+    middleware = ReplicaRoutingMiddleware(view)
+    middleware.process_request(request)
+    middleware.process_view(request, view, (), {})
+    response = middleware.process_response(request, view(request))
+    return seen["db"], response
+
+
+@replicas
+def test_safe_api_reads_go_to_replica():
+    db, response = run_request("GET", "/routes/vendors/")
+    assert db == "replica_0"
+    assert "db_primary_pin" not in response.cookies
+
+
+@override_settings(DATABASE_REPLICAS=["replica_0", "replica_1", "replica_2"])
+def test_one_replica_serves_the_whole_request():
+    dbs = {run_request("GET", "/routes/vendors/", reads=20)[0] for _ in range(30)}
+    assert dbs <= {"replica_0", "replica_1", "replica_2"}
+    assert len(dbs) > 1  # ...while requests are spread across replicas
+
+
+def test_related_reads_follow_the_instance():
+    vendor = Vendor(name="Dunlop")
+    vendor._state.db = "replica_1"
+    assert router.db_for_read(Vendor, instance=vendor) == "replica_1"
+
+
+@replicas
+def test_admin_changelist_reads_go_to_replica():
+    db, _ = run_request("GET", "/admin/cmsa/vendor/")
+    assert db == "replica_0"
+
+
+@replicas
+def test_admin_change_form_reads_stay_on_primary():
+    db, _ = run_request("GET", "/admin/cmsa/vendor/1/change/")
+    assert db == "default"
+
+
+@replicas
+def test_unsafe_request_reads_primary_and_pins_client():
+    db, response = run_request("POST", "/routes/vendors/")
+    assert db == "default"
+    assert float(response.cookies["db_primary_pin"].value) > time.time()
+
+
+@replicas
+def test_reads_after_write_in_same_request_stick_to_primary():
+    db, response = run_request("GET", "/routes/vendors/", write=True)
+    assert db == "default"
+    assert "db_primary_pin" in response.cookies
+
+
+@replicas
+def test_pinned_client_reads_primary_until_window_expires():
+    db, _ = run_request("GET", "/routes/vendors/", cookies={"db_primary_pin": str(time.time() + 5)})
+    assert db == "default"
+
+    db, _ = run_request("GET", "/routes/vendors/", cookies={"db_primary_pin": str(time.time() - 1)})
+    assert db == "replica_0"
+
+
+@no_replicas
+def test_without_replicas_everything_reads_primary():
+    db, response = run_request("GET", "/routes/vendors/")
+    assert db == "default"
+
+    _, response = run_request("POST", "/routes/vendors/")
+    assert "db_primary_pin" not in response.cookies
+
+
+def test_reads_outside_requests_use_primary():
+    with replicas:
+        assert router.db_for_read(Vendor) == "default"
+    assert router.allow_migrate("replica_0", "cmsa") is False
+    assert router.allow_migrate("default", "cmsa") is True
+
+
+@no_replicas
+@pytest.mark.django_db
+def test_api_still_works_with_router_installed(client):
+    Vendor.objects.create(name="Dunlop")
+    assert client.get("/routes/vendors/").json()[0]["name"] == "Dunlop"
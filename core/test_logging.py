@@ -0,0 +1,82 @@
+# core/test_logging.py
+
+import logging
+import threading
+
+from django.test import override_settings
+
+from core import request_logging
+from core.logging import QueueingHandler, RequestContextFilter, _request_id, dropped_records
+
+
+class GatedHandler(logging.Handler):
+    """Collects records, blocking each write until `gate` is set (a stalled stdout)."""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+        self.records = []
+
+    def emit(self, record):
+        self.gate.wait(5)
+        self.records.append(record)
+
+
+def make_logger(target, queue_size):
+    target.name = "test-target"
+    handler = QueueingHandler(handlers=["test-target"], queue_size=queue_size)
+    handler.addFilter(RequestContextFilter())
+    logger = logging.getLogger("core.tests.queueing")
+    logger.handlers[:] = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger, handler
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    target = GatedHandler()
+    logger, handler = make_logger(target, queue_size=2)
+    before = dropped_records.value()
+    try:
+        for i in range(10):
+            logger.info("record %d", i)  # returns at once although the writer is stuck
+        assert dropped_records.value() - before >= 7
+    finally:
+        target.gate.set()
+        handler.close()
+    assert len(target.records) == 10 - (dropped_records.value() - before)
+
+
+def test_request_context_is_captured_in_the_request_thread():
+    target = GatedHandler()
+    target.gate.set()
+    logger, handler = make_logger(target, queue_size=10)
+    _request_id.set("req-42")
+    try:
+        logger.info("hello %s", "world")
+    finally:
+        _request_id.set(None)
+        handler.close()
+    [record] = target.records
+    assert record.getMessage() == "hello world"
+    assert record.request_id == "req-42"
+
+
+@override_settings(LOG_SAMPLE_RATE=10, LOG_SLOW_REQUEST_MS=500)
+def test_sampling_keeps_errors_and_slow_requests(monkeypatch):
+    monkeypatch.setattr(request_logging.random, "random", lambda: 0.5)
+    assert not request_logging.should_log(200, 20)
+    assert not request_logging.should_log(304, 20)
+    assert request_logging.should_log(404, 20)
+    assert request_logging.should_log(429, 20)
+    assert request_logging.should_log(503, 20)
+    assert request_logging.should_log(200, 800)
+
+    monkeypatch.setattr(request_logging.random, "random", lambda: 0.05)
+    assert request_logging.should_log(200, 20)
+
+
+@override_settings(LOG_SAMPLE_RATE=1)
+def test_sample_rate_one_logs_everything(monkeypatch):
+    monkeypatch.setattr(request_logging.random, "random", lambda: 0.99)
+    assert request_logging.should_log(200, 1)
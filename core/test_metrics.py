@@ -0,0 +1,37 @@
+# core/test_metrics.py
+
+import pytest
+
+from core.metrics import Registry
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    hits = registry.counter("app_hits_total", "Hits.")
+    hits.inc(route="search")
+    hits.inc(2, route="search")
+    registry.gauge("app_depth", "Depth.").set(7)
+    registry.gauge("app_lag_seconds", "Lag.", callback=lambda: 1.5)
+
+    assert registry.render().splitlines() == [
+        "# HELP app_depth Depth.",
+        "# TYPE app_depth gauge",
+        "app_depth 7",
+        "# HELP app_hits_total Hits.",
+        "# TYPE app_hits_total counter",
+        'app_hits_total{route="search"} 3',
+        "# HELP app_lag_seconds Lag.",
+        "# TYPE app_lag_seconds gauge",
+        "app_lag_seconds 1.5",
+    ]
+    assert registry.counter("app_hits_total", "Hits.") is hits
+
+
+@pytest.mark.django_db
+def test_metrics_requires_staff_or_token(client, settings):
+    settings.METRICS_TOKEN = "s3cret"
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code == 403
+    resp = client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+    assert resp.status_code == 200
+    assert resp["Content-Type"].startswith("text/plain")
@@ -0,0 +1,35 @@
+# core/test_middleware.py
+
+import asyncio
+
+from django.http import HttpResponse
+from django.test import AsyncClient
+
+from core.db_routing import ReplicaRoutingMiddleware
+from core.logging import RequestContextMiddleware
+from core.request_logging import RequestLogMiddleware
+
+
+async def async_view(request):
+    return HttpResponse("ok")
+
+
+def test_project_middleware_runs_natively_on_the_event_loop():
+    for middleware_class in (RequestLogMiddleware, RequestContextMiddleware, ReplicaRoutingMiddleware):
+        middleware = middleware_class(async_view)
+        # Django only wraps middleware in sync_to_async when these are plain functions.
+        assert asyncio.iscoroutinefunction(middleware)
+        if hasattr(middleware, "process_view"):
+            assert asyncio.iscoroutinefunction(middleware.process_view)
+
+
+def test_sync_stack_is_unchanged():
+    middleware = RequestContextMiddleware(lambda request: HttpResponse("ok"))
+    assert not asyncio.iscoroutinefunction(middleware)
+
+
+def test_asgi_request_carries_request_id():
+    # Django 4.0's AsyncClient takes extra headers by their plain names.
+    response = asyncio.run(AsyncClient().get("/healthz", **{"X-Request-ID": "abc-123"}))
+    assert response.status_code == 200
+    assert response["X-Request-ID"] == "abc-123"
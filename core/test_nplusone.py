@@ -0,0 +1,72 @@
+# core/test_nplusone.py
+
+import logging
+
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from cmsa.models import Supplier, Vendor
+from core.nplusone import NPlusOneError, NPlusOneMiddleware
+
+
+@pytest.fixture
+def catalogue(db):
+    supplier = Supplier.objects.create(name="Coast Music")
+    for name in ("Fender", "Gibson", "Pearl", "Yamaha"):
+        Vendor.objects.create(name=name).suppliers.add(supplier)
+
+
+def supplier_names(request):
+    names = [supplier.name for vendor in Vendor.objects.all() for supplier in vendor.suppliers.all()]
+    return HttpResponse(", ".join(names))
+
+
+def prefetched_supplier_names(request):
+    vendors = Vendor.objects.prefetch_related("suppliers")
+    return HttpResponse(", ".join(supplier.name for vendor in vendors for supplier in vendor.suppliers.all()))
+
+
+def run(view):
+    return NPlusOneMiddleware(view)(RequestFactory().get("/routes/vendors/"))
+
+
+def test_repeated_query_raises_with_its_call_site(catalogue):
+    with pytest.raises(NPlusOneError) as raised:
+        run(supplier_names)
+    message = str(raised.value)
+    assert "x4 SELECT" in message
+    assert '"cmsa_vendor_suppliers"."vendor_id" = ?' in message
+    assert "core/test_nplusone.py:" in message and "supplier_names" in message
+
+
+def test_prefetched_queries_pass(catalogue):
+    assert run(prefetched_supplier_names).status_code == 200
+
+
+@override_settings(NPLUSONE="log")
+def test_log_mode_keeps_the_response(catalogue):
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger = logging.getLogger("core.nplusone")
+    logger.addHandler(handler)
+    try:
+        response = run(supplier_names)
+    finally:
+        logger.removeHandler(handler)
+    assert response.status_code == 200
+    [record] = records
+    assert record.levelno == logging.WARNING
+    assert record.repeated_queries == [4]
+
+
+@override_settings(NPLUSONE="off")
+def test_off_records_nothing(catalogue):
+    assert run(supplier_names).status_code == 200
+
+
+def test_vendor_changelist_prefetches_suppliers(catalogue, admin_client):
+    response = admin_client.get("/admin/cmsa/vendor/")
+    assert response.status_code == 200
+    assert b"Coast Music" in response.content
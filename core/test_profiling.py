@@ -0,0 +1,65 @@
+# core/test_profiling.py
+
+import re
+
+import pytest
+from rest_framework.test import APIClient
+
+from cmsa.models import Vendor
+
+
+@pytest.fixture
+def vendors(db):
+    Vendor.objects.bulk_create([Vendor(name=name) for name in ("Fender", "Gibson", "Pearl")])
+
+
+def client_for(django_user_model, **flags):
+    user = django_user_model.objects.create_user(username="profiler", password="pw", **flags)
+    client = APIClient()
+    client.force_login(user)  # session auth, as in the admin
+    return client
+
+
+@pytest.mark.django_db
+def test_cpu_profile_returns_collapsed_stacks(vendors, django_user_model):
+    client = client_for(django_user_model, is_staff=True)
+
+    response = client.get("/routes/vendors/?search=fender&_profile=cpu")
+
+    assert response["Content-Type"].startswith("text/plain")
+    assert response["X-Profile-Status"] == "200"
+    lines = response.content.decode().splitlines()
+    assert lines
+    assert all(re.fullmatch(r".+ \d+", line) for line in lines)
+    assert all(";" in line or "(" in line for line in lines)
+
+
+@pytest.mark.django_db
+def test_sql_profile_lists_and_explains_queries(vendors, django_user_model):
+    client = client_for(django_user_model, is_staff=True)
+
+    body = client.get("/routes/vendors/?search=fender&_profile=sql").content.decode()
+
+    assert re.match(r"\d+ queries, [\d.]+ ms", body)
+    assert "cmsa_vendor" in body
+    explain = body.split("\nEXPLAIN ", 1)[1]
+    assert "explain failed" not in explain
+
+
+@pytest.mark.django_db
+def test_profile_param_is_hidden_from_the_view(vendors, django_user_model):
+    client = client_for(django_user_model, is_staff=True)
+    # The plain list's fast path only runs without query parameters.
+    body = client.get("/routes/vendors/?_profile=sql").content.decode()
+    assert "cmsa_vendordocument" in body
+
+
+@pytest.mark.django_db
+def test_non_staff_and_anonymous_get_the_normal_response(vendors, django_user_model):
+    client = client_for(django_user_model)
+    response = client.get("/routes/vendors/?_profile=cpu")
+    assert response["Content-Type"] == "application/json"
+    assert "X-Profile-Status" not in response
+
+    response = APIClient().get("/routes/vendors/?_profile=sql")
+    assert response["Content-Type"] == "application/json"
@@ -0,0 +1,84 @@
+# core/test_sql.py
+
+import logging
+
+import pytest
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from cmsa.models import SlowQuery, Vendor
+from core.sql import fingerprint, normalize, pending
+
+every_query_is_slow = override_settings(SLOW_QUERY_MS=1e-6)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture(autouse=True)
+def empty_buffer():
+    """Queries the test itself runs outside a request stay buffered; drop them."""
+    pending.take()
+    yield
+    pending.take()
+
+
+@pytest.fixture
+def sql_log():
+    handler = ListHandler()
+    logger = logging.getLogger("core.sql")
+    logger.addHandler(handler)
+    yield handler.records
+    logger.removeHandler(handler)
+
+
+def test_normalize_folds_literals_and_lists():
+    assert normalize("SELECT * FROM t WHERE a = 'x''y' AND b = 42 AND c IN (%s, %s, %s)") == (
+        "SELECT * FROM t WHERE a = ? AND b = ? AND c IN (...)"
+    )
+    assert normalize('INSERT INTO "t" ("a", "b") VALUES (%s, %s), (%s, %s)') == (
+        'INSERT INTO "t" ("a", "b") VALUES (...)'
+    )
+    assert normalize("SELECT  1\n  FROM t_2") == "SELECT ? FROM t_2"
+
+
+def test_fingerprint_ignores_arguments():
+    one, _ = fingerprint("SELECT * FROM t WHERE id IN (%s, %s) LIMIT 21")
+    other, _ = fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s, %s) LIMIT 5")
+    assert one == other
+    assert fingerprint("SELECT * FROM u")[0] != one
+
+
+@pytest.mark.django_db
+@every_query_is_slow
+def test_slow_queries_are_logged_and_aggregated(sql_log):
+    Vendor.objects.create(name="Fender")
+    client = APIClient()
+
+    client.get("/routes/vendors/?search=fender", HTTP_X_REQUEST_ID="req-1")
+    client.get("/routes/vendors/?search=gibson")
+
+    record = next(r for r in sql_log if 'FROM "cmsa_vendor"' in r.getMessage())
+    assert record.levelno == logging.WARNING
+    assert record.view == "vendor-list"
+    assert len(record.fingerprint) == 16
+
+    search = SlowQuery.objects.get(sql__contains='FROM "cmsa_vendor"', sql__icontains="LIKE")
+    assert search.calls == 2
+    assert search.last_view == "vendor-list"
+    assert search.max_ms <= search.total_ms
+    assert search.explain  # captured on the first occurrence
+    assert "?" in search.sql and "fender" not in search.sql
+
+
+@pytest.mark.django_db
+def test_fast_queries_are_not_recorded(sql_log):
+    APIClient().get("/routes/vendors/")
+    assert not sql_log
+    assert not SlowQuery.objects.exists()
@@ -0,0 +1,78 @@
+# core/test_throttling.py
+
+import pytest
+from rest_framework.test import APIClient
+
+from core.throttling import (
+    ListThrottle,
+    LoginThrottle,
+    SearchThrottle,
+    TokenBucketThrottle,
+    throttle_decisions,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A controllable timer for every throttle."""
+    now = [1000.0]
+    monkeypatch.setattr(TokenBucketThrottle, "timer", lambda self: now[0])
+    return now
+
+
+@pytest.fixture
+def rates(monkeypatch):
+    # Settings are read when DRF loads, so the rates are patched on the classes.
+    monkeypatch.setattr(SearchThrottle, "rate", "2/min", raising=False)
+    monkeypatch.setattr(ListThrottle, "rate", "5/min", raising=False)
+    monkeypatch.setattr(LoginThrottle, "rate", "2/min", raising=False)
+
+
+pytestmark = pytest.mark.usefixtures("rates")
+
+
+@pytest.mark.django_db
+def test_search_bucket_bursts_then_refills(clock):
+    client = APIClient()
+    statuses = [client.get("/routes/vendors/?search=guitar").status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+
+    throttled = client.get("/routes/vendors/?search=guitar")
+    assert throttled["Retry-After"] == "30"  # one token refills in 60s / 2
+
+    clock[0] += 30
+    assert client.get("/routes/vendors/?search=guitar").status_code == 200
+
+
+@pytest.mark.django_db
+def test_search_and_list_budgets_are_separate(clock):
+    client = APIClient()
+    for _ in range(2):
+        client.get("/routes/vendors/?search=guitar")
+    assert client.get("/routes/vendors/?search=guitar").status_code == 429
+    assert client.get("/routes/vendors/").status_code == 200
+
+
+@pytest.mark.django_db
+def test_buckets_are_per_client(clock):
+    for _ in range(2):
+        APIClient(REMOTE_ADDR="10.0.0.1").get("/routes/vendors/?search=guitar")
+    assert APIClient(REMOTE_ADDR="10.0.0.1").get("/routes/vendors/?search=guitar").status_code == 429
+    assert APIClient(REMOTE_ADDR="10.0.0.2").get("/routes/vendors/?search=guitar").status_code == 200
+
+
+@pytest.mark.django_db
+def test_login_attempts_are_throttled(clock):
+    client = APIClient()
+    credentials = {"username": "nobody", "password": "wrong"}
+    statuses = [client.post("/api/login/", credentials, format="json").status_code for _ in range(3)]
+    assert statuses == [401, 401, 429]
+
+
+@pytest.mark.django_db
+def test_decisions_are_counted(clock):
+    before = throttle_decisions.value(scope="search", result="throttled")
+    client = APIClient()
+    for _ in range(3):
+        client.get("/routes/vendors/?search=guitar")
+    assert throttle_decisions.value(scope="search", result="throttled") == before + 1
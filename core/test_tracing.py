@@ -0,0 +1,134 @@
+# core/test_tracing.py
+
+import json
+import uuid
+
+import pytest
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from cmsa.management.commands.trace_collector import summarize
+from cmsa.models import Supplier, Vendor
+from core import tracing
+
+
+@pytest.fixture
+def export_file(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    with override_settings(TRACE_SAMPLE_RATE=1.0, TRACE_EXPORT=str(path)):
+        yield path
+
+
+@pytest.fixture
+def coast(db):
+    """Coast Music, carrying Fender."""
+    supplier = Supplier.objects.create(name="Coast Music")
+    Vendor.objects.create(name="Fender").suppliers.add(supplier)
+    return supplier
+
+
+def exported(path):
+    tracing.get_exporter().flush()
+    lines = path.read_text().splitlines()
+    return [json.loads(line) for line in lines]
+
+
+def spans_of(request):
+    [resource] = request["resourceSpans"]
+    [scope] = resource["scopeSpans"]
+    return scope["spans"]
+
+
+def attributes(span):
+    return {item["key"]: next(iter(item["value"].values())) for item in span["attributes"]}
+
+
+@pytest.mark.django_db
+def test_request_exports_spans_under_the_request_id(export_file, coast, django_user_model):
+    user = django_user_model.objects.create_user(username="staff", password="pw")
+    client = APIClient()
+    client.force_authenticate(user)
+    request_id = str(uuid.uuid4())
+
+    response = client.get("/routes/vendors/?search=fender", HTTP_X_REQUEST_ID=request_id)
+
+    [request] = exported(export_file)
+    spans = spans_of(request)
+    [root] = [span for span in spans if not span["parentSpanId"]]
+    assert root["traceId"] == request_id.replace("-", "")
+    assert root["name"] == "GET /routes/vendors/"
+    assert attributes(root)["http.status_code"] == "200"
+    assert response["traceparent"] == f"00-{root['traceId']}-{root['spanId']}-01"
+
+    names = {span["name"] for span in spans}
+    assert {"db.query", "serializer.render"} <= names
+    assert all(span["traceId"] == root["traceId"] for span in spans)
+    query = next(span for span in spans if span["name"] == "db.query")
+    assert query["kind"] == tracing.CLIENT
+    assert "SELECT" in attributes(query)["db.statement"]
+
+
+@pytest.mark.django_db
+def test_decrypts_and_templates_get_spans(export_file, coast, django_user_model):
+    coast.website_password = coast.encrypt_password("secret")
+    coast.save()
+    user = django_user_model.objects.create_user(username="u", password="pw")
+    client = APIClient()
+    client.force_authenticate(user)
+
+    client.get(f"/routes/suppliers/{coast.pk}/")
+    client.get("/routes/vendors/?format=api")
+
+    names = [{span["name"] for span in spans_of(request)} for request in exported(export_file)]
+    assert "fernet.decrypt" in names[0]
+    assert "template.render" in names[1]
+
+
+@pytest.mark.django_db
+def test_unsampled_requests_export_nothing(tmp_path, coast):
+    path = tmp_path / "traces.jsonl"
+    with override_settings(TRACE_SAMPLE_RATE=0.0, TRACE_EXPORT=str(path)):
+        response = APIClient().get("/routes/vendors/")
+    assert "traceparent" not in response
+    assert not path.exists()
+
+
+def test_sampling_follows_the_trace_id():
+    assert tracing.trace_id_for("abc-123") == tracing.trace_id_for("abc-123")
+    assert len(tracing.trace_id_for("abc-123")) == 32
+    assert tracing.is_sampled("00000000" + "0" * 24, 0.01)
+    assert not tracing.is_sampled("ffffffff" + "0" * 24, 0.99)
+    assert not tracing.is_sampled("00000000" + "0" * 24, 0.0)
+
+
+@pytest.mark.django_db
+@override_settings(TRACE_MAX_SPANS=3)
+def test_span_count_is_capped(export_file, coast):
+    APIClient().get("/routes/vendors/?search=fender")
+
+    [request] = exported(export_file)
+    [root] = [span for span in spans_of(request) if not span["parentSpanId"]]
+    assert len(spans_of(request)) == 3
+    assert int(attributes(root)["trace.dropped_spans"]) > 0
+
+
+def test_collector_summary():
+    trace = {
+        "resourceSpans": [
+            {
+                "scopeSpans": [
+                    {
+                        "spans": [
+                            {"traceId": "t", "spanId": "a", "parentSpanId": "", "name": "GET /x",
+                             "startTimeUnixNano": "0", "endTimeUnixNano": "5000000"},
+                            {"traceId": "t", "spanId": "b", "parentSpanId": "a", "name": "db.query",
+                             "startTimeUnixNano": "0", "endTimeUnixNano": "2000000"},
+                            {"traceId": "t", "spanId": "c", "parentSpanId": "a", "name": "db.query",
+                             "startTimeUnixNano": "0", "endTimeUnixNano": "1000000"},
+                        ]
+                    }
+                ]
+            }
+        ]
+    }
+    assert summarize(trace) == ["t GET /x 5.0ms | db.query x2 3.0ms"]
@@ -0,0 +1,90 @@
+# core/throttling.py
+"""
+Token-bucket throttles for the API, keyed by user (signed in) or client IP.
+
+Each scope's rate, "N/period" as in DRF's DEFAULT_THROTTLE_RATES, describes a bucket
+holding N tokens that refills at N per period: a client may burst up to N requests,
+then continues at the steady rate. Scopes:
+
+- search: list requests with ?search= (the catalogue/join search, the costly query)
+- list: every other API request
+- auth: api/login/ attempts, keyed by IP
+
+Buckets live in the default cache, so limits hold across gunicorn workers when it is
+shared (DJANGO_CACHE_URL); with the local-memory default each worker has its own. The
+read-modify-write is not atomic across workers, so simultaneous requests from one
+client on different workers can each spend the same token: a bounded overshoot, the
+same trade-off as DRF's built-in throttles. Throttled requests get 429 with
+Retry-After (set by DRF from wait()).
+"""
+
+from rest_framework.throttling import SimpleRateThrottle
+
+from core.metrics import counter
+
+throttle_decisions = counter(
+    "http_throttle_decisions_total", "API requests checked by a token-bucket throttle, by scope and result."
+)
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    def __init__(self):
+        super().__init__()
+        self.refill_rate = self.num_requests / self.duration  # tokens per second
+        self._wait = None
+
+    def applies_to(self, request, view):
+        return True
+
+    def get_cache_key(self, request, view):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            ident = f"user-{user.pk}"
+        else:
+            ident = f"ip-{self.get_ident(request)}"
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None or not self.applies_to(request, view):
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = self.timer()
+        tokens, updated = self.cache.get(self.key, (self.num_requests, now))
+        tokens = min(self.num_requests, tokens + (now - updated) * self.refill_rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        else:
+            self._wait = (1 - tokens) / self.refill_rate
+        # Once the bucket has had time to refill completely the entry carries no state.
+        self.cache.set(self.key, (tokens, now), self.duration + 1)
+        throttle_decisions.inc(scope=self.scope, result="allowed" if allowed else "throttled")
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class SearchThrottle(TokenBucketThrottle):
+    scope = "search"
+
+    def applies_to(self, request, view):
+        return bool(request.query_params.get("search"))
+
+
+class ListThrottle(TokenBucketThrottle):
+    scope = "list"
+
+    def applies_to(self, request, view):
+        return not request.query_params.get("search")
+
+
+class LoginThrottle(TokenBucketThrottle):
+    scope = "auth"
+
+    def get_cache_key(self, request, view):
+        # Keyed by IP whoever is signed in: these are credential guesses.
+        return self.cache_format % {"scope": self.scope, "ident": f"ip-{self.get_ident(request)}"}
@@ -0,0 +1,310 @@
+# core/tracing.py
+"""
+Minimal request tracing, exported as OTLP/JSON.
+
+TracingMiddleware opens a root span per sampled request; inside it `span()` opens child
+spans (database queries, serializer rendering, Fernet decrypts, template rendering are
+instrumented), so a slow /routes/vendors/ shows where its time went. The trace id is
+derived from the request id (X-Request-ID, see core/logging.py): a UUID request id is
+used as is, anything else is hashed. Sampling is decided from the trace id, so every
+service handling the same request id makes the same choice.
+
+Finished traces are handed to a background thread and written as one OTLP
+ExportTraceServiceRequest per line, either appended to a file (the format of the
+OpenTelemetry collector's otlpjsonfile receiver) or POSTed to an OTLP/HTTP endpoint
+such as a local collector (`manage.py trace_collector` is a stand-in):
+
+    DJANGO_TRACE_SAMPLE_RATE=1 DJANGO_TRACE_EXPORT=/tmp/traces.jsonl
+    DJANGO_TRACE_SAMPLE_RATE=0.1 DJANGO_TRACE_EXPORT=http://localhost:4318/v1/traces
+
+Outside a sampled request `span()` costs one context-variable lookup.
+"""
+
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates
+
+from core.logging import current_request_id
+from core.metrics import counter
+from core.middleware import HybridMiddleware
+
+logger = logging.getLogger(__name__)
+
+exported_traces = counter("trace_exports_total", "Sampled traces handed to the exporter, by result.")
+
+# OTLP span kinds
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+STATUS_OK, STATUS_ERROR = 1, 2
+STATEMENT_MAX_LENGTH = 2000
+
+_trace = contextvars.ContextVar("trace", default=None)
+_span = contextvars.ContextVar("span", default=None)
+
+
+def trace_id_for(request_id):
+    """32 hex digits: the request id itself when it is a UUID, else a hash of it."""
+    digits = request_id.replace("-", "").lower()
+    if len(digits) == 32 and all(c in "0123456789abcdef" for c in digits):
+        return digits
+    return hashlib.sha256(request_id.encode()).hexdigest()[:32]
+
+
+def is_sampled(trace_id, rate):
+    return rate > 0 and int(trace_id[:8], 16) < rate * 0x1_0000_0000
+
+
+class Span:
+    def __init__(self, trace, name, kind, parent, attributes):
+        self.trace = trace
+        self.name = name
+        self.kind = kind
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else ""
+        self.attributes = dict(attributes)
+        self.status = STATUS_OK
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def end(self):
+        self.end_ns = time.time_ns()
+
+    def to_otlp(self):
+        return {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": self.status},
+        }
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}  # int64 is a string in OTLP/JSON
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Trace:
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.spans = []
+        self.dropped = 0
+        self._lock = threading.Lock()  # sync views run in other threads under ASGI
+
+    def start_span(self, name, kind, parent, attributes):
+        with self._lock:
+            if len(self.spans) >= settings.TRACE_MAX_SPANS:
+                self.dropped += 1
+                return None
+            span = Span(self, name, kind, parent, attributes)
+            self.spans.append(span)
+            return span
+
+    def to_otlp(self):
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [_attribute("service.name", settings.TRACE_SERVICE_NAME)]},
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [span.to_otlp() for span in self.spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+
+@contextmanager
+def span(name, attributes=(), kind=INTERNAL):
+    """A child of the current span, if this request is being traced (else yields None)."""
+    trace = _trace.get()
+    if trace is None:
+        yield None
+        return
+    current = trace.start_span(name, kind, _span.get(), attributes)
+    if current is None:
+        yield None
+        return
+    token = _span.set(current)
+    try:
+        yield current
+    except BaseException:
+        current.status = STATUS_ERROR
+        raise
+    finally:
+        _span.reset(token)
+        current.end()
+
+
+# --- Instrumentation ---------------------------------------------------------------
+
+
+def trace_query(execute, sql, params, many, context):
+    if _trace.get() is None:
+        return execute(sql, params, many, context)
+    connection = context["connection"]
+    attributes = {
+        "db.system": connection.vendor,
+        "db.name": connection.alias,
+        "db.statement": sql[:STATEMENT_MAX_LENGTH],
+    }
+    if many:
+        attributes["db.executemany"] = True
+    with span("db.query", attributes, kind=CLIENT):
+        return execute(sql, params, many, context)
+
+
+def install_query_tracing(connection, **kwargs):
+    if trace_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(trace_query)
+
+
+connection_created.connect(install_query_tracing)
+
+
+class _TracedTemplate:
+    def __init__(self, template):
+        self.template = template
+        self.origin = template.origin
+
+    def render(self, context=None, request=None):
+        with span("template.render", {"template.name": self.origin.template_name or "<string>"}):
+            return self.template.render(context, request)
+
+
+class TracedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with a span per template rendered."""
+
+    def from_string(self, template_code):
+        return _TracedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TracedTemplate(super().get_template(template_name))
+
+
+# --- Export ------------------------------------------------------------------------
+
+
+class Exporter:
+    """Writes traces from a bounded queue on a background thread; drops them when full."""
+
+    def __init__(self, target, queue_size=1000):
+        self.target = target
+        self.queue = queue.Queue(queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, trace):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+        try:
+            self.queue.put_nowait(trace)
+            exported_traces.inc(result="queued")
+        except queue.Full:
+            exported_traces.inc(result="dropped")
+
+    def flush(self):
+        self.queue.join()
+
+    def _run(self):
+        while True:
+            trace = self.queue.get()
+            try:
+                self.write(json.dumps(trace.to_otlp(), separators=(",", ":")))
+            except Exception:
+                exported_traces.inc(result="failed")
+                logger.exception("trace export to %s failed", self.target)
+            finally:
+                self.queue.task_done()
+
+    def write(self, line):
+        if self.target.startswith(("http://", "https://")):
+            request = urllib.request.Request(
+                self.target, data=line.encode(), headers={"Content-Type": "application/json"}
+            )
+            urllib.request.urlopen(request, timeout=5).close()
+        else:
+            with open(self.target, "a") as f:
+                f.write(line + "\n")
+
+
+_exporters = {}
+
+
+def get_exporter():
+    target = settings.TRACE_EXPORT
+    if target not in _exporters:
+        _exporters[target] = Exporter(target)
+    return _exporters[target]
+
+
+class TracingMiddleware(HybridMiddleware):
+    """
+    Roots a trace at each sampled request. Place it after RequestContextMiddleware,
+    which sets the request id the trace id comes from.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        for connection in connections.all():
+            install_query_tracing(connection)
+
+    def process_request(self, request):
+        request._trace_tokens = None
+        if settings.TRACE_SAMPLE_RATE <= 0 or not settings.TRACE_EXPORT:
+            return
+        trace_id = trace_id_for(current_request_id() or os.urandom(16).hex())
+        if not is_sampled(trace_id, settings.TRACE_SAMPLE_RATE):
+            return
+        trace = Trace(trace_id)
+        root = trace.start_span(
+            f"{request.method} {request.path}",
+            SERVER,
+            None,
+            {"http.method": request.method, "http.target": request.get_full_path()},
+        )
+        request._trace_tokens = (_trace.set(trace), _span.set(root))
+
+    def process_response(self, request, response):
+        tokens = getattr(request, "_trace_tokens", None)
+        if tokens is None:
+            return response
+        trace, root = _trace.get(), _span.get()
+        _trace.reset(tokens[0])
+        _span.reset(tokens[1])
+        root.attributes["http.status_code"] = response.status_code
+        match = getattr(request, "resolver_match", None)
+        if match is not None:
+            root.attributes["http.route"] = match.route
+        if trace.dropped:
+            root.attributes["trace.dropped_spans"] = trace.dropped
+        if response.status_code >= 500:
+            root.status = STATUS_ERROR
+        root.end()
+        response["traceparent"] = f"00-{trace.trace_id}-{root.span_id}-01"
+        get_exporter().submit(trace)
+        return response
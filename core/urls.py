@@ -2,7 +2,7 @@
 
 from django.contrib import admin
 from django.urls import path, include, re_path
-from .views import login_view, logout_view, ProtectedTestView, SetCsrfTokenView, get_csrf, healthz
+from .views import login_view, logout_view, ProtectedTestView, SetCsrfTokenView, get_csrf, healthz, metrics
 from rest_framework_simplejwt.views import TokenRefreshView
 from drf_spectacular.views import (
     SpectacularAPIView,
@@ -19,6 +19,7 @@ urlpatterns = [
     path("set-csrf/", SetCsrfTokenView.as_view(), name="set_csrf"),
     path("get-csrf/", get_csrf, name="get_csrf"),
     re_path(r"^healthz/?$", healthz, name="healthz"),
+    re_path(r"^metrics/?$", metrics, name="metrics"),
 
     # --- OpenAPI schema & docs ---
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
@@ -9,6 +9,7 @@ from django.http import JsonResponse
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 
+import hmac
 import logging
 from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.http import HttpResponseNotAllowed
@@ -22,12 +23,15 @@ from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_protect
 from django.contrib.auth import authenticate, login
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, throttle_classes
 from rest_framework.response import Response
 from django.contrib.auth import logout
 from rest_framework import serializers
 from drf_spectacular.utils import extend_schema, inline_serializer, OpenApiResponse
 
+from .metrics import registry as metrics_registry
+from .throttling import LoginThrottle
+
 logger = logging.getLogger(__name__)
 
 @extend_schema(
@@ -45,15 +49,16 @@ logger = logging.getLogger(__name__)
     },
 )
 @api_view(["POST"])
+@throttle_classes([LoginThrottle])
 @csrf_protect
 def login_view(request):
-    logger.debug(f"Request Data: {request.data}")
-    logger.debug(f"Request Headers: {request.headers}")
-    logger.debug(f"Origin Header: {request.headers.get('Origin')}")
+    logger.debug("Request Data: %s", request.data)
+    logger.debug("Request Headers: %s", request.headers)
+    logger.debug("Origin Header: %s", request.headers.get("Origin"))
 
     # Log CSRF token details
     csrf_token = request.META.get("CSRF_COOKIE")
-    logger.debug(f"CSRF Token from request: {csrf_token}")
+    logger.debug("CSRF Token from request: %s", csrf_token)
 
     # Existing code for username, password retrieval and authentication
     username = request.data.get("username")
@@ -61,14 +66,14 @@ def login_view(request):
     user = authenticate(request, username=username, password=password)
 
     csrf_token = request.META.get("CSRF_COOKIE")
-    logger.debug(f"CSRF Token from request: {csrf_token}")
+    logger.debug("CSRF Token from request: %s", csrf_token)
 
     if user is not None:
         login(request, user)
-        logger.debug(f"User {username} logged in successfully")
+        logger.debug("User %s logged in successfully", username)
         return Response({"detail": "Login successful"}, status=status.HTTP_200_OK)
     else:
-        logger.warning(f"Login failed for user {username}")
+        logger.warning("Login failed for user %s", username)
         return Response(
             {"detail": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED
         )
@@ -80,12 +85,12 @@ class ProtectedTestView(APIView):
     def get(self, request):
         # Log the request details
         user = request.user
-        logger.debug(f"Protected endpoint accessed by user: {user.username}")
+        logger.debug("Protected endpoint accessed by user: %s", user.username)
 
         # Log the authoization header (token)
         auth_header = request.META.get("HTTP_AUTHORIZATION")
         if auth_header:
-            logger.debug(f"Authorization header: {auth_header}")
+            logger.debug("Authorization header: %s", auth_header)
 
         return Response({"message": "This is a protected endpoint"})
 
@@ -94,7 +99,7 @@ class ProtectedTestView(APIView):
 def logout_view(request):
     # log the CSRF token from the request
     csrf_token = request.META.get("CSRF_COOKIE")
-    logger.debug(f"CSRF token from request: {csrf_token}")
+    logger.debug("CSRF token from request: %s", csrf_token)
     logout(request)
     return Response({"detail": "Logout successful"})
 
@@ -114,4 +119,20 @@ def healthz(request):
     Liveness probe: just proves the app can serve requests.
     Returns 200 with a tiny JSON payload.
     """
-    return JsonResponse({"status": "ok"})
\ No newline at end of file
+    return JsonResponse({"status": "ok"})
+
+
+@require_http_methods(["GET"])
+def metrics(request):
+    """
+    Prometheus scrape endpoint (core/metrics.py). Open to staff sessions, or to
+    `Authorization: Bearer <METRICS_TOKEN>` when that setting is non-empty.
+    """
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get("Authorization", "")
+    allowed = request.user.is_staff or (
+        token and hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode())
+    )
+    if not allowed:
+        return HttpResponse(status=403)
+    return HttpResponse(metrics_registry.render(), content_type="text/plain; version=0.0.4")